@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 14:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['client', 'source_ip', 'detected_at'], name='alerts_aler_client__068cc0_idx'),
+        ),
+    ]
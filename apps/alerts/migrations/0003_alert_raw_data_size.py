@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-16 14:19
+
+import json
+
+from django.db import migrations, models
+
+
+def fill_raw_data_size(apps, schema_editor):
+    """Backfill raw_data_size for existing alerts."""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "UPDATE alerts_alert SET raw_data_size = length(raw_data::text) "
+            "WHERE raw_data IS NOT NULL AND raw_data NOT IN ('{}'::jsonb, '[]'::jsonb, 'null'::jsonb)"
+        )
+        return
+
+    Alert = apps.get_model('alerts', 'Alert')
+    batch = []
+    for alert in Alert.objects.only('id', 'raw_data').iterator(chunk_size=2000):
+        alert.raw_data_size = len(json.dumps(alert.raw_data, default=str, ensure_ascii=False)) if alert.raw_data else 0
+        batch.append(alert)
+        if len(batch) >= 2000:
+            Alert.objects.bulk_update(batch, ['raw_data_size'])
+            batch = []
+    if batch:
+        Alert.objects.bulk_update(batch, ['raw_data_size'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0002_alert_client_source_detected_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='alert',
+            name='raw_data_size',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_raw_data_size, migrations.RunPython.noop),
+    ]
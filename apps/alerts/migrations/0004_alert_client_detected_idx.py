@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 14:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0003_alert_raw_data_size'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(fields=['client', 'detected_at'], name='alerts_aler_client__2dc8cc_idx'),
+        ),
+    ]
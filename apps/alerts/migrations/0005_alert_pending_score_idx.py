@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 14:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('alerts', '0004_alert_client_detected_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='alert',
+            index=models.Index(condition=models.Q(('risk_score', 0.0)), fields=['id'], name='alert_pending_score_idx'),
+        ),
+    ]
@@ -1,6 +1,8 @@
 """
 Models for the alerts application.
 """
+import json
+
 from django.db import models
 from django.db.models.signals import post_save
 from django.dispatch import receiver
@@ -8,6 +10,11 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from apps.accounts.models import Client, User
 
 
+def compute_raw_data_size(raw_data) -> int:
+    """Length of raw_data serialized as JSON (0 when empty)."""
+    return len(json.dumps(raw_data, default=str, ensure_ascii=False)) if raw_data else 0
+
+
 class Alert(models.Model):
     """Model representing a security alert."""
     
@@ -56,6 +63,7 @@ class Alert(models.Model):
     # Additional metadata
     source_system = models.CharField(max_length=100, blank=True)  # SIEM, Firewall, etc.
     raw_data = models.JSONField(default=dict, blank=True)
+    raw_data_size = models.PositiveIntegerField(default=0, editable=False)  # JSON length of raw_data, set on save
     tags = models.JSONField(default=list, blank=True)
     
     # Timestamps
@@ -90,11 +98,25 @@ class Alert(models.Model):
             models.Index(fields=['client', 'alert_type']),
             models.Index(fields=['detected_at']),
             models.Index(fields=['risk_score']),
+            # Same-source frequency counts in risk scoring
+            models.Index(fields=['client', 'source_ip', 'detected_at']),
+            # Time-windowed dashboard statistics per client
+            models.Index(fields=['client', 'detected_at']),
+            # Alerts still waiting for a risk score (calculate_risk_scores)
+            models.Index(fields=['id'], name='alert_pending_score_idx', condition=models.Q(risk_score=0.0)),
         ]
     
     def __str__(self):
         return f"{self.alert_id} - {self.title} ({self.get_severity_display()})"
     
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None or 'raw_data' in update_fields:
+            self.raw_data_size = compute_raw_data_size(self.raw_data)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'raw_data_size'}
+        super().save(*args, **kwargs)
+    
     def get_severity_color(self):
         """Return color code for severity level."""
         colors = {
@@ -204,6 +226,14 @@ class AlertRule(models.Model):
 
 
 # Signals for automatic processing
+@receiver(post_save, sender=Alert)
+def alert_saved_handler(sender, instance, **kwargs):
+    """Retire cached dashboard statistics covering this alert."""
+    from apps.analytics.services import invalidate_risk_stats_cache
+    
+    invalidate_risk_stats_cache(instance.client_id)
+
+
 @receiver(post_save, sender=Alert)
 def alert_created_handler(sender, instance, created, **kwargs):
     """Handle alert creation - trigger automatic processing."""
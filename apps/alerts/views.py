@@ -284,7 +284,7 @@ def assign_alert(request, pk):
             try:
                 assigned_user = User.objects.get(id=assigned_to_id)
                 alert.assigned_to = assigned_user
-                alert.save()
+                alert.save(update_fields=['assigned_to', 'updated_at'])
                 return Response({'message': 'Alert assigned successfully'})
             except User.DoesNotExist:
                 return Response({'error': 'User not found'}, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,11 @@
+"""
+Buffered ingestion of AnalyticsEvent rows (see exeo_portal.ingest).
+"""
+from exeo_portal.ingest import BufferedWriter
+
+from .models import AnalyticsEvent
+
+writer = BufferedWriter(AnalyticsEvent, threshold=1000, interval=2.0)
+
+emit = writer.emit
+flush = writer.flush
@@ -0,0 +1,61 @@
+from django.db import migrations, models
+
+
+def merge_template_config(apps, schema_editor):
+    """Fold template_config / data_sources / filters into the single config column."""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            "UPDATE analytics_reporttemplate SET config = jsonb_build_object("
+            "'template', template_config, 'data_sources', data_sources, 'filters', filters)"
+        )
+        return
+
+    ReportTemplate = apps.get_model('analytics', 'ReportTemplate')
+    templates = list(ReportTemplate.objects.only('id', 'template_config', 'data_sources', 'filters'))
+    for template in templates:
+        template.config = {
+            'template': template.template_config,
+            'data_sources': template.data_sources,
+            'filters': template.filters,
+        }
+    ReportTemplate.objects.bulk_update(templates, ['config'], batch_size=500)
+
+
+def split_template_config(apps, schema_editor):
+    ReportTemplate = apps.get_model('analytics', 'ReportTemplate')
+    templates = list(ReportTemplate.objects.only('id', 'config'))
+    for template in templates:
+        template.template_config = template.config.get('template', {})
+        template.data_sources = template.config.get('data_sources', [])
+        template.filters = template.config.get('filters', {})
+    ReportTemplate.objects.bulk_update(
+        templates, ['template_config', 'data_sources', 'filters'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reporttemplate',
+            name='config',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(merge_template_config, split_template_config),
+        migrations.RemoveField(
+            model_name='reporttemplate',
+            name='data_sources',
+        ),
+        migrations.RemoveField(
+            model_name='reporttemplate',
+            name='filters',
+        ),
+        migrations.RemoveField(
+            model_name='reporttemplate',
+            name='template_config',
+        ),
+    ]
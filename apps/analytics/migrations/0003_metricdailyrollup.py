@@ -0,0 +1,73 @@
+# Generated by Django 4.2.7 on 2026-10-16 14:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+POSTGRES_CREATE = [
+    """
+    CREATE MATERIALIZED VIEW metric_daily_rollup AS
+    SELECT row_number() OVER (ORDER BY client_id, name, date_trunc('day', period_end)) AS id,
+           client_id, name, date_trunc('day', period_end) AS day,
+           sum(value) AS sum_v, avg(value) AS avg_v, count(*) AS n
+    FROM analytics_metric
+    GROUP BY client_id, name, date_trunc('day', period_end)
+    """,
+    "CREATE UNIQUE INDEX metric_daily_rollup_key ON metric_daily_rollup (client_id, name, day)",
+]
+
+# Plain view for development databases (SQLite): same columns, computed on read.
+FALLBACK_CREATE = [
+    """
+    CREATE VIEW metric_daily_rollup AS
+    SELECT row_number() OVER (ORDER BY client_id, name, datetime(date(period_end))) AS id,
+           client_id, name, datetime(date(period_end)) AS day,
+           sum(value) AS sum_v, avg(value) AS avg_v, count(*) AS n
+    FROM analytics_metric
+    GROUP BY client_id, name, datetime(date(period_end))
+    """,
+]
+
+
+def create_rollup_view(apps, schema_editor):
+    statements = POSTGRES_CREATE if schema_editor.connection.vendor == 'postgresql' else FALLBACK_CREATE
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_rollup_view(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("DROP MATERIALIZED VIEW IF EXISTS metric_daily_rollup")
+    else:
+        schema_editor.execute("DROP VIEW IF EXISTS metric_daily_rollup")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('analytics', '0002_reporttemplate_config'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricDailyRollup',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('client', models.ForeignKey(on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='accounts.client')),
+                ('name', models.CharField(max_length=200)),
+                ('day', models.DateTimeField()),
+                ('sum_v', models.FloatField()),
+                ('avg_v', models.FloatField()),
+                ('n', models.IntegerField()),
+            ],
+            options={
+                'verbose_name': 'Agrégat journalier de métrique',
+                'verbose_name_plural': 'Agrégats journaliers de métriques',
+                'db_table': 'metric_daily_rollup',
+                'ordering': ['-day', 'name'],
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_rollup_view, drop_rollup_view),
+    ]
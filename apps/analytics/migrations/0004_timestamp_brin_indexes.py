@@ -0,0 +1,56 @@
+# Generated by Django 4.2.7 on 2026-10-16 14:01
+
+from django.db import migrations, models
+
+
+BRIN_INDEXES = [
+    ('analytics_event_created_brin', 'analytics_analyticsevent', 'created_at'),
+    ('analytics_riskscore_calculated_brin', 'analytics_riskscore', 'calculated_at'),
+    ('analytics_metric_calculated_brin', 'analytics_metric', 'calculated_at'),
+]
+
+
+def create_brin_indexes(apps, schema_editor):
+    # BRIN is PostgreSQL-only; other backends keep the composite B-tree indexes
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in BRIN_INDEXES:
+        schema_editor.execute(f"CREATE INDEX {name} ON {table} USING BRIN ({column})")
+
+
+def drop_brin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in BRIN_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0003_metricdailyrollup'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='analyticsevent',
+            name='analytics_a_created_546677_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='metric',
+            name='analytics_m_calcula_c0510b_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='riskscore',
+            name='analytics_r_calcula_5a959d_idx',
+        ),
+        migrations.AddIndex(
+            model_name='metric',
+            index=models.Index(fields=['client', '-calculated_at'], name='analytics_m_client__e9ead5_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='riskscore',
+            index=models.Index(fields=['client', '-calculated_at'], name='analytics_r_client__24a72b_idx'),
+        ),
+        migrations.RunPython(create_brin_indexes, drop_brin_indexes),
+    ]
@@ -11,11 +11,25 @@ from sklearn.feature_extraction.text import TfidfVectorizer
 from django.conf import settings
 import joblib
 import os
-from typing import Dict, List, Tuple, Any
+from functools import lru_cache
+from typing import Dict, List, Tuple, Any, Union
 import logging
 
+from apps.alerts.models import compute_raw_data_size
+
 logger = logging.getLogger(__name__)
 
+# Training/prediction inputs: a DataFrame (e.g. built from a values_list
+# query) or the equivalent list of row dictionaries
+FeatureRows = Union[pd.DataFrame, List[Dict]]
+
+
+def _as_frame(rows: FeatureRows) -> pd.DataFrame:
+    """Return rows as a DataFrame, without copying one that already is."""
+    if isinstance(rows, pd.DataFrame):
+        return rows
+    return pd.DataFrame(rows)
+
 
 class RiskScoringModel:
     """
@@ -24,6 +38,7 @@ class RiskScoringModel:
     
     def __init__(self):
         self.model = None
+        self.load_attempted = False
         self.scaler = StandardScaler()
         self.label_encoders = {}
         self.feature_names = []
@@ -34,17 +49,18 @@ class RiskScoringModel:
         # Create models directory if it doesn't exist
         os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
     
-    def prepare_features(self, alerts_data: List[Dict]) -> np.ndarray:
+    def prepare_features(self, alerts_data: FeatureRows, fit: bool = False) -> np.ndarray:
         """
         Prepare features for the risk scoring model.
         
         Args:
-            alerts_data: List of alert dictionaries
+            alerts_data: DataFrame or list of alert dictionaries
+            fit: Refit the label encoders (training) instead of reusing them
             
         Returns:
             numpy array of features
         """
-        df = pd.DataFrame(alerts_data)
+        df = _as_frame(alerts_data).copy()
         
         # Define feature columns
         feature_columns = [
@@ -60,7 +76,7 @@ class RiskScoringModel:
         
         # Convert alert type to numeric
         if 'alert_type' in df.columns:
-            if 'alert_type' not in self.label_encoders:
+            if fit or 'alert_type' not in self.label_encoders:
                 self.label_encoders['alert_type'] = LabelEncoder()
                 df['alert_type_numeric'] = self.label_encoders['alert_type'].fit_transform(df['alert_type'].fillna('unknown'))
             else:
@@ -76,13 +92,16 @@ class RiskScoringModel:
         
         # Text features
         df['description_length'] = df['description'].str.len().fillna(0)
-        df['tag_count'] = df['tags'].apply(lambda x: len(x) if isinstance(x, list) else 0)
-        df['raw_data_size'] = df['raw_data'].apply(lambda x: len(str(x)) if x else 0)
+        df['tag_count'] = df['tags'].map(lambda x: len(x) if isinstance(x, list) else 0)
+        if 'raw_data_size' in df.columns:
+            df['raw_data_size'] = df['raw_data_size'].fillna(0)
+        else:
+            df['raw_data_size'] = df['raw_data'].map(compute_raw_data_size)
         
         # Time features
         if 'detected_at' in df.columns:
-            df['detected_at'] = pd.to_datetime(df['detected_at'])
-            df['time_since_detection'] = (pd.Timestamp.now() - df['detected_at']).dt.total_seconds() / 3600  # hours
+            df['detected_at'] = pd.to_datetime(df['detected_at'], utc=True)
+            df['time_since_detection'] = (pd.Timestamp.now(tz='UTC') - df['detected_at']).dt.total_seconds() / 3600  # hours
         else:
             df['time_since_detection'] = 0
         
@@ -92,14 +111,16 @@ class RiskScoringModel:
         # Select and fill missing values
         features = df[feature_columns].fillna(0)
         
-        return features.values
+        # float32 end to end: the scaler preserves it and the tree ensembles
+        # convert their input to float32 anyway
+        return features.to_numpy(dtype=np.float32)
     
-    def train(self, alerts_data: List[Dict], risk_scores: List[float]) -> Dict[str, float]:
+    def train(self, alerts_data: FeatureRows, risk_scores: List[float]) -> Dict[str, float]:
         """
         Train the risk scoring model.
         
         Args:
-            alerts_data: List of alert dictionaries
+            alerts_data: DataFrame or list of alert dictionaries
             risk_scores: List of corresponding risk scores
             
         Returns:
@@ -107,7 +128,7 @@ class RiskScoringModel:
         """
         try:
             # Prepare features
-            X = self.prepare_features(alerts_data)
+            X = self.prepare_features(alerts_data, fit=True)
             y = np.array(risk_scores)
             
             # Split data
@@ -152,18 +173,19 @@ class RiskScoringModel:
             logger.error(f"Error training risk scoring model: {str(e)}")
             raise
     
-    def predict(self, alerts_data: List[Dict]) -> List[float]:
+    def predict(self, alerts_data: FeatureRows) -> List[float]:
         """
         Predict risk scores for alerts.
         
         Args:
-            alerts_data: List of alert dictionaries
+            alerts_data: DataFrame or list of alert dictionaries
             
         Returns:
             List of predicted risk scores
         """
         try:
-            if self.model is None:
+            # A missing model file is only looked up once
+            if self.model is None and not self.load_attempted:
                 self.load_model()
             
             if self.model is None:
@@ -199,9 +221,12 @@ class RiskScoringModel:
     
     def load_model(self):
         """Load the trained model and preprocessors."""
+        self.load_attempted = True
         try:
-            if os.path.exists(self.model_path):
-                self.model = joblib.load(self.model_path)
+            if not os.path.exists(self.model_path):
+                logger.info("No trained risk scoring model found, using defaults")
+                return
+            self.model = joblib.load(self.model_path)
             if os.path.exists(self.scaler_path):
                 self.scaler = joblib.load(self.scaler_path)
             if os.path.exists(self.encoders_path):
@@ -218,6 +243,7 @@ class ThreatClassificationModel:
     
     def __init__(self):
         self.model = None
+        self.load_attempted = False
         self.vectorizer = TfidfVectorizer(max_features=1000, stop_words='english')
         self.label_encoder = LabelEncoder()
         self.model_path = os.path.join(settings.BASE_DIR, 'ml_models', 'threat_classification_model.pkl')
@@ -227,32 +253,24 @@ class ThreatClassificationModel:
         # Create models directory if it doesn't exist
         os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
     
-    def prepare_features(self, threat_data: List[Dict]) -> np.ndarray:
+    def prepare_features(self, threat_data: FeatureRows) -> np.ndarray:
         """
         Prepare features for threat classification.
         
         Args:
-            threat_data: List of threat indicator dictionaries
+            threat_data: DataFrame or list of threat indicator dictionaries
             
         Returns:
             numpy array of features
         """
-        df = pd.DataFrame(threat_data)
-        
-        # Combine text features
-        text_features = []
-        for _, row in df.iterrows():
-            text_parts = []
-            if 'description' in row and pd.notna(row['description']):
-                text_parts.append(str(row['description']))
-            if 'threat_type' in row and pd.notna(row['threat_type']):
-                text_parts.append(str(row['threat_type']))
-            if 'malware_family' in row and pd.notna(row['malware_family']):
-                text_parts.append(str(row['malware_family']))
-            if 'actor' in row and pd.notna(row['actor']):
-                text_parts.append(str(row['actor']))
-            
-            text_features.append(' '.join(text_parts))
+        df = _as_frame(threat_data)
+        
+        # Combine text features, column by column (missing values contribute nothing)
+        text_features = pd.Series('', index=df.index)
+        for column in ('description', 'threat_type', 'malware_family', 'actor'):
+            if column in df.columns:
+                text_features = text_features + ' ' + df[column].fillna('').astype(str)
+        text_features = text_features.str.strip()
         
         # Vectorize text
         X_text = self.vectorizer.fit_transform(text_features)
@@ -275,12 +293,12 @@ class ThreatClassificationModel:
         
         return X
     
-    def train(self, threat_data: List[Dict], threat_types: List[str]) -> Dict[str, float]:
+    def train(self, threat_data: FeatureRows, threat_types: List[str]) -> Dict[str, float]:
         """
         Train the threat classification model.
         
         Args:
-            threat_data: List of threat indicator dictionaries
+            threat_data: DataFrame or list of threat indicator dictionaries
             threat_types: List of corresponding threat types
             
         Returns:
@@ -326,18 +344,19 @@ class ThreatClassificationModel:
             logger.error(f"Error training threat classification model: {str(e)}")
             raise
     
-    def predict(self, threat_data: List[Dict]) -> List[str]:
+    def predict(self, threat_data: FeatureRows) -> List[str]:
         """
         Predict threat types for indicators.
         
         Args:
-            threat_data: List of threat indicator dictionaries
+            threat_data: DataFrame or list of threat indicator dictionaries
             
         Returns:
             List of predicted threat types
         """
         try:
-            if self.model is None:
+            # A missing model file is only looked up once
+            if self.model is None and not self.load_attempted:
                 self.load_model()
             
             if self.model is None:
@@ -372,9 +391,12 @@ class ThreatClassificationModel:
     
     def load_model(self):
         """Load the trained model and preprocessors."""
+        self.load_attempted = True
         try:
-            if os.path.exists(self.model_path):
-                self.model = joblib.load(self.model_path)
+            if not os.path.exists(self.model_path):
+                logger.info("No trained threat classification model found, using defaults")
+                return
+            self.model = joblib.load(self.model_path)
             if os.path.exists(self.vectorizer_path):
                 self.vectorizer = joblib.load(self.vectorizer_path)
             if os.path.exists(self.encoder_path):
@@ -391,6 +413,7 @@ class AnomalyDetectionModel:
     
     def __init__(self):
         self.model = None
+        self.load_attempted = False
         self.scaler = StandardScaler()
         self.model_path = os.path.join(settings.BASE_DIR, 'ml_models', 'anomaly_detection_model.pkl')
         self.scaler_path = os.path.join(settings.BASE_DIR, 'ml_models', 'anomaly_scaler.pkl')
@@ -398,17 +421,17 @@ class AnomalyDetectionModel:
         # Create models directory if it doesn't exist
         os.makedirs(os.path.dirname(self.model_path), exist_ok=True)
     
-    def prepare_features(self, events_data: List[Dict]) -> np.ndarray:
+    def prepare_features(self, events_data: FeatureRows) -> np.ndarray:
         """
         Prepare features for anomaly detection.
         
         Args:
-            events_data: List of event dictionaries
+            events_data: DataFrame or list of event dictionaries
             
         Returns:
             numpy array of features
         """
-        df = pd.DataFrame(events_data)
+        df = _as_frame(events_data).copy()
         
         # Define feature columns
         feature_columns = [
@@ -420,11 +443,14 @@ class AnomalyDetectionModel:
         df['event_frequency'] = df.groupby('client_id')['client_id'].transform('count')
         df['unique_ips'] = df.groupby('client_id')['source_ip'].transform('nunique')
         df['unique_ports'] = df.groupby('client_id')['destination_port'].transform('nunique')
-        df['data_volume'] = df['raw_data'].apply(lambda x: len(str(x)) if x else 0)
+        if 'raw_data_size' in df.columns:
+            df['data_volume'] = df['raw_data_size'].fillna(0)
+        else:
+            df['data_volume'] = df['raw_data'].map(compute_raw_data_size)
         
         # Time-based features
         if 'detected_at' in df.columns:
-            df['detected_at'] = pd.to_datetime(df['detected_at'])
+            df['detected_at'] = pd.to_datetime(df['detected_at'], utc=True)
             df['time_variance'] = df.groupby('client_id')['detected_at'].transform('std').dt.total_seconds()
         else:
             df['time_variance'] = 0
@@ -438,14 +464,16 @@ class AnomalyDetectionModel:
         # Select and fill missing values
         features = df[feature_columns].fillna(0)
         
-        return features.values
+        # float32 end to end: the scaler preserves it and the tree ensembles
+        # convert their input to float32 anyway
+        return features.to_numpy(dtype=np.float32)
     
-    def train(self, events_data: List[Dict]) -> Dict[str, float]:
+    def train(self, events_data: FeatureRows) -> Dict[str, float]:
         """
         Train the anomaly detection model.
         
         Args:
-            events_data: List of event dictionaries
+            events_data: DataFrame or list of event dictionaries
             
         Returns:
             Dictionary with training metrics
@@ -467,13 +495,13 @@ class AnomalyDetectionModel:
             
             # Calculate anomaly scores
             scores = self.model.decision_function(X_scaled)
-            anomalies = self.model.predict(X_scaled)
+            anomalies = scores < 0  # Same labels as self.model.predict()
             
             # Save model and preprocessors
             self.save_model()
             
             metrics = {
-                'anomaly_rate': (anomalies == -1).mean(),
+                'anomaly_rate': anomalies.mean(),
                 'avg_anomaly_score': scores.mean(),
                 'training_samples': len(X_scaled)
             }
@@ -485,46 +513,65 @@ class AnomalyDetectionModel:
             logger.error(f"Error training anomaly detection model: {str(e)}")
             raise
     
-    def predict(self, events_data: List[Dict]) -> List[Dict]:
+    def decision_scores(self, events_data: FeatureRows) -> np.ndarray:
         """
-        Predict anomalies in events.
+        Anomaly scores of events (negative for anomalies).
         
         Args:
-            events_data: List of event dictionaries
+            events_data: DataFrame or list of event dictionaries
             
         Returns:
-            List of anomaly predictions with scores
+            numpy array of scores, zeros when no model is available or on error
         """
         try:
-            if self.model is None:
+            # A missing model file is only looked up once
+            if self.model is None and not self.load_attempted:
                 self.load_model()
             
             if self.model is None:
-                # Return default predictions if model not available
-                return [{'is_anomaly': False, 'anomaly_score': 0.0}] * len(events_data)
+                return np.zeros(len(events_data))
             
             # Prepare features
             X = self.prepare_features(events_data)
             X_scaled = self.scaler.transform(X)
             
-            # Make predictions
-            predictions = self.model.predict(X_scaled)
-            scores = self.model.decision_function(X_scaled)
-            
-            # Format results
-            results = []
-            for pred, score in zip(predictions, scores):
-                results.append({
-                    'is_anomaly': pred == -1,
-                    'anomaly_score': float(score)
-                })
-            
-            return results
+            # IsolationForest.predict() is decision_function() < 0, so one
+            # pass over the forest gives both the scores and the labels
+            return self.model.decision_function(X_scaled)
             
         except Exception as e:
             logger.error(f"Error predicting anomalies: {str(e)}")
-            # Return default predictions on error
-            return [{'is_anomaly': False, 'anomaly_score': 0.0}] * len(events_data)
+            return np.zeros(len(events_data))
+    
+    def predict_mask(self, events_data: FeatureRows) -> np.ndarray:
+        """
+        Boolean anomaly flag of each event.
+        
+        Args:
+            events_data: DataFrame or list of event dictionaries
+            
+        Returns:
+            numpy bool array, True for anomalies
+        """
+        return self.decision_scores(events_data) < 0
+    
+    def predict(self, events_data: FeatureRows) -> List[Dict]:
+        """
+        Predict anomalies in events.
+        
+        Args:
+            events_data: DataFrame or list of event dictionaries
+            
+        Returns:
+            List of anomaly predictions with scores
+        """
+        scores = self.decision_scores(events_data)
+        
+        # Format results
+        return [
+            {'is_anomaly': score < 0, 'anomaly_score': score}
+            for score in scores.tolist()
+        ]
     
     def save_model(self):
         """Save the trained model and preprocessors."""
@@ -537,9 +584,12 @@ class AnomalyDetectionModel:
     
     def load_model(self):
         """Load the trained model and preprocessors."""
+        self.load_attempted = True
         try:
-            if os.path.exists(self.model_path):
-                self.model = joblib.load(self.model_path)
+            if not os.path.exists(self.model_path):
+                logger.info("No trained anomaly detection model found, using defaults")
+                return
+            self.model = joblib.load(self.model_path)
             if os.path.exists(self.scaler_path):
                 self.scaler = joblib.load(self.scaler_path)
             logger.info("Anomaly detection model loaded successfully")
@@ -551,3 +601,29 @@ class AnomalyDetectionModel:
 risk_scoring_model = RiskScoringModel()
 threat_classification_model = ThreatClassificationModel()
 anomaly_detection_model = AnomalyDetectionModel()
+
+
+# Accessors loading each model from disk once per process
+@lru_cache(maxsize=1)
+def get_risk_model() -> RiskScoringModel:
+    risk_scoring_model.load_model()
+    return risk_scoring_model
+
+
+@lru_cache(maxsize=1)
+def get_threat_model() -> ThreatClassificationModel:
+    threat_classification_model.load_model()
+    return threat_classification_model
+
+
+@lru_cache(maxsize=1)
+def get_anomaly_model() -> AnomalyDetectionModel:
+    anomaly_detection_model.load_model()
+    return anomaly_detection_model
+
+
+def warm_models():
+    """Load all models now (e.g. when a worker process starts)."""
+    get_risk_model()
+    get_threat_model()
+    get_anomaly_model()
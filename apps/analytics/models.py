@@ -3,9 +3,19 @@ Models for the analytics application.
 """
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
+from django.utils.functional import cached_property
 from apps.accounts.models import Client, User
 
 
+# Risk levels by 2-point score band, lowest first
+RISK_LEVELS = ('MINIMAL', 'LOW', 'MEDIUM', 'HIGH', 'CRITICAL')
+
+
+def get_risk_level(score: float) -> str:
+    """Get risk level based on score (CRITICAL >= 8, HIGH >= 6, MEDIUM >= 4, LOW >= 2)."""
+    return RISK_LEVELS[max(0, min(int(score) // 2, 4))]
+
+
 class RiskScore(models.Model):
     """Model for storing calculated risk scores."""
     
@@ -52,11 +62,21 @@ class RiskScore(models.Model):
         indexes = [
             models.Index(fields=['client', 'score_type']),
             models.Index(fields=['entity_id', 'entity_type']),
-            models.Index(fields=['calculated_at']),
+            models.Index(fields=['client', '-calculated_at']),
+            # calculated_at alone is covered by a BRIN index (migration 0004)
         ]
     
     def __str__(self):
-        return f"{self.client.name} - {self.get_score_type_display()}: {self.score}"
+        return f"{self.client.name} - {self.score_type_display}: {self.score}"
+    
+    @cached_property
+    def risk_level(self):
+        """Risk level for the score, computed once per instance."""
+        return get_risk_level(self.score)
+    
+    @cached_property
+    def score_type_display(self):
+        return self.get_score_type_display()
 
 
 class DashboardWidget(models.Model):
@@ -149,7 +169,7 @@ class AnalyticsEvent(models.Model):
         indexes = [
             models.Index(fields=['client', 'event_type']),
             models.Index(fields=['user', 'created_at']),
-            models.Index(fields=['created_at']),
+            # created_at alone is covered by a BRIN index (migration 0004)
         ]
     
     def __str__(self):
@@ -174,10 +194,8 @@ class ReportTemplate(models.Model):
     description = models.TextField(blank=True)
     report_type = models.CharField(max_length=50, choices=REPORT_TYPES)
     
-    # Template configuration
-    template_config = models.JSONField(default=dict, blank=True)
-    data_sources = models.JSONField(default=list, blank=True)
-    filters = models.JSONField(default=dict, blank=True)
+    # Template configuration: {"template": {...}, "data_sources": [...], "filters": {...}}
+    config = models.JSONField(default=dict, blank=True)
     
     # Output settings
     output_format = models.CharField(max_length=20, default='pdf')  # pdf, excel, csv, html
@@ -197,6 +215,31 @@ class ReportTemplate(models.Model):
     
     def __str__(self):
         return f"{self.name} - {self.client.name}"
+    
+    # Backward-compatible accessors over the merged `config` column
+    @property
+    def template_config(self):
+        return self.config.get('template', {})
+    
+    @template_config.setter
+    def template_config(self, value):
+        self.config = {**self.config, 'template': value}
+    
+    @property
+    def data_sources(self):
+        return self.config.get('data_sources', [])
+    
+    @data_sources.setter
+    def data_sources(self, value):
+        self.config = {**self.config, 'data_sources': value}
+    
+    @property
+    def filters(self):
+        return self.config.get('filters', {})
+    
+    @filters.setter
+    def filters(self, value):
+        self.config = {**self.config, 'filters': value}
 
 
 class GeneratedReport(models.Model):
@@ -284,8 +327,33 @@ class Metric(models.Model):
         indexes = [
             models.Index(fields=['client', 'name']),
             models.Index(fields=['period_start', 'period_end']),
-            models.Index(fields=['calculated_at']),
+            models.Index(fields=['client', '-calculated_at']),
+            # calculated_at alone is covered by a BRIN index (migration 0004)
         ]
     
     def __str__(self):
         return f"{self.name}: {self.value} {self.unit}"
+
+
+class MetricDailyRollup(models.Model):
+    """Read-only daily rollup of Metric, backed by the metric_daily_rollup materialized view."""
+    
+    id = models.BigIntegerField(primary_key=True)
+    client = models.ForeignKey(Client, on_delete=models.DO_NOTHING, related_name='+')
+    name = models.CharField(max_length=200)
+    day = models.DateTimeField()
+    
+    # Aggregates over Metric.value
+    sum_v = models.FloatField()
+    avg_v = models.FloatField()
+    n = models.IntegerField()
+    
+    class Meta:
+        managed = False
+        db_table = 'metric_daily_rollup'
+        ordering = ['-day', 'name']
+        verbose_name = 'Agrégat journalier de métrique'
+        verbose_name_plural = 'Agrégats journaliers de métriques'
+    
+    def __str__(self):
+        return f"{self.name} ({self.day:%Y-%m-%d}): {self.sum_v}"
@@ -0,0 +1,21 @@
+"""
+Parsers for the analytics application.
+"""
+import msgspec
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class MsgspecJSONParser(BaseParser):
+    """
+    JSON parser backed by msgspec, the project-wide default JSON parser.
+    """
+
+    media_type = 'application/json'
+    decoder = msgspec.json.Decoder()
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return self.decoder.decode(stream.read())
+        except msgspec.DecodeError as exc:
+            raise ParseError(f'JSON parse error - {exc}')
@@ -0,0 +1,48 @@
+"""
+Renderers for the analytics application.
+"""
+import msgspec
+from django.db.models import QuerySet
+from django.utils.functional import Promise
+from rest_framework.renderers import BaseRenderer
+
+
+def _enc_hook(obj):
+    """
+    Fallback for values msgspec cannot encode natively (lazy strings,
+    ErrorDetail...), following DRF's JSONEncoder for the other types.
+    """
+    if isinstance(obj, (Promise, str)):
+        return str(obj)
+    if isinstance(obj, QuerySet):
+        return tuple(obj)
+    if hasattr(obj, 'tolist'):
+        # Numpy arrays and array scalars
+        return obj.tolist()
+    if hasattr(obj, '__getitem__'):
+        try:
+            return list(obj) if isinstance(obj, (list, tuple)) else dict(obj)
+        except Exception:
+            pass
+    elif hasattr(obj, '__iter__'):
+        return tuple(obj)
+    raise NotImplementedError(f"Objects of type {type(obj)} are not supported")
+
+
+class MsgspecJSONRenderer(BaseRenderer):
+    """
+    JSON renderer backed by msgspec, the project-wide default renderer.
+
+    Encodes msgspec.Struct rows (see serializers.RiskScoreOut / MetricOut)
+    directly, without going through per-row OrderedDicts.
+    """
+
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+    encoder = msgspec.json.Encoder(enc_hook=_enc_hook)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return self.encoder.encode(data)
@@ -1,8 +1,15 @@
 """
 Serializers for the analytics application.
 """
+from datetime import datetime
+from typing import Dict, Optional, Union
+
+import msgspec
 from rest_framework import serializers
-from .models import RiskScore, Metric, DashboardWidget, AnalyticsEvent, ReportTemplate, GeneratedReport
+from .models import (
+    RiskScore, Metric, DashboardWidget, AnalyticsEvent, ReportTemplate, GeneratedReport,
+    MetricDailyRollup, get_risk_level
+)
 
 
 class RiskScoreSerializer(serializers.ModelSerializer):
@@ -10,8 +17,8 @@ class RiskScoreSerializer(serializers.ModelSerializer):
     
     client_name = serializers.CharField(source='client.name', read_only=True)
     calculated_by_name = serializers.CharField(source='calculated_by.get_full_name', read_only=True)
-    score_type_display = serializers.CharField(source='get_score_type_display', read_only=True)
-    risk_level = serializers.SerializerMethodField()
+    score_type_display = serializers.CharField(read_only=True)
+    risk_level = serializers.CharField(read_only=True)
     
     class Meta:
         model = RiskScore
@@ -22,19 +29,6 @@ class RiskScoreSerializer(serializers.ModelSerializer):
             'risk_level'
         ]
         read_only_fields = ['id', 'calculated_at']
-    
-    def get_risk_level(self, obj):
-        """Get risk level based on score."""
-        if obj.score >= 8.0:
-            return 'CRITICAL'
-        elif obj.score >= 6.0:
-            return 'HIGH'
-        elif obj.score >= 4.0:
-            return 'MEDIUM'
-        elif obj.score >= 2.0:
-            return 'LOW'
-        else:
-            return 'MINIMAL'
 
 
 class MetricSerializer(serializers.ModelSerializer):
@@ -53,6 +47,15 @@ class MetricSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'calculated_at']
 
 
+class MetricDailyRollupSerializer(serializers.ModelSerializer):
+    """Serializer for MetricDailyRollup rows."""
+    
+    class Meta:
+        model = MetricDailyRollup
+        fields = ['client', 'name', 'day', 'sum_v', 'avg_v', 'n']
+        read_only_fields = fields
+
+
 class DashboardWidgetSerializer(serializers.ModelSerializer):
     """Serializer for DashboardWidget model."""
     
@@ -97,6 +100,11 @@ class ReportTemplateSerializer(serializers.ModelSerializer):
     created_by_name = serializers.CharField(source='created_by.get_full_name', read_only=True)
     report_type_display = serializers.CharField(source='get_report_type_display', read_only=True)
     
+    # Stored together in ReportTemplate.config
+    template_config = serializers.JSONField(required=False)
+    data_sources = serializers.JSONField(required=False)
+    filters = serializers.JSONField(required=False)
+    
     class Meta:
         model = ReportTemplate
         fields = [
@@ -153,3 +161,109 @@ class ThreatIntelligenceSerializer(serializers.Serializer):
     malware_family = serializers.DictField()
     threat_actor = serializers.DictField()
     campaign = serializers.DictField()
+
+
+# Read-only output structs for high-fanout list endpoints.
+# Write paths keep using the ModelSerializers above.
+
+SCORE_TYPE_DISPLAY = dict(RiskScore.SCORE_TYPES)
+METRIC_TYPE_DISPLAY = dict(Metric.METRIC_TYPES)
+
+
+class RiskScoreOut(msgspec.Struct, kw_only=True, omit_defaults=True):
+    """
+    Slot-based representation of a RiskScore row (mirrors RiskScoreSerializer).
+
+    Like the DRF serializer, calculated_by_name is left out when there is no calculated_by user.
+    """
+
+    id: int
+    client: int
+    client_name: str
+    score_type: str
+    score_type_display: str
+    entity_id: str
+    entity_type: str
+    score: float
+    confidence: float
+    factors: Dict
+    methodology: str
+    calculated_at: datetime
+    calculated_by: Optional[int]
+    calculated_by_name: Union[str, msgspec.UnsetType] = msgspec.UNSET
+    risk_level: str
+
+    VALUES = (
+        'id', 'client', 'client__name', 'score_type', 'entity_id', 'entity_type',
+        'score', 'confidence', 'factors', 'methodology', 'calculated_at',
+        'calculated_by', 'calculated_by__first_name', 'calculated_by__last_name',
+    )
+
+    @classmethod
+    def from_row(cls, row: Dict) -> 'RiskScoreOut':
+        """Build from a RiskScore.objects.values(*RiskScoreOut.VALUES) row."""
+        calculated_by_name = msgspec.UNSET
+        if row['calculated_by'] is not None:
+            calculated_by_name = f"{row['calculated_by__first_name']} {row['calculated_by__last_name']}".strip()
+        return cls(
+            id=row['id'],
+            client=row['client'],
+            client_name=row['client__name'],
+            score_type=row['score_type'],
+            score_type_display=SCORE_TYPE_DISPLAY.get(row['score_type'], row['score_type']),
+            entity_id=row['entity_id'],
+            entity_type=row['entity_type'],
+            score=row['score'],
+            confidence=row['confidence'],
+            factors=row['factors'],
+            methodology=row['methodology'],
+            calculated_at=row['calculated_at'],
+            calculated_by=row['calculated_by'],
+            calculated_by_name=calculated_by_name,
+            risk_level=get_risk_level(row['score']),
+        )
+
+
+class MetricOut(msgspec.Struct):
+    """Slot-based representation of a Metric row (mirrors MetricSerializer)."""
+
+    id: int
+    client: int
+    client_name: str
+    name: str
+    metric_type: str
+    metric_type_display: str
+    value: float
+    unit: str
+    period_start: datetime
+    period_end: datetime
+    dimensions: Dict
+    metadata: Dict
+    calculation_method: str
+    calculated_at: datetime
+
+    VALUES = (
+        'id', 'client', 'client__name', 'name', 'metric_type', 'value', 'unit',
+        'period_start', 'period_end', 'dimensions', 'metadata',
+        'calculation_method', 'calculated_at',
+    )
+
+    @classmethod
+    def from_row(cls, row: Dict) -> 'MetricOut':
+        """Build from a Metric.objects.values(*MetricOut.VALUES) row."""
+        return cls(
+            id=row['id'],
+            client=row['client'],
+            client_name=row['client__name'],
+            name=row['name'],
+            metric_type=row['metric_type'],
+            metric_type_display=METRIC_TYPE_DISPLAY.get(row['metric_type'], row['metric_type']),
+            value=row['value'],
+            unit=row['unit'],
+            period_start=row['period_start'],
+            period_end=row['period_end'],
+            dimensions=row['dimensions'],
+            metadata=row['metadata'],
+            calculation_method=row['calculation_method'],
+            calculated_at=row['calculated_at'],
+        )
@@ -2,20 +2,243 @@
 Professional Risk Scoring Service based on industry standards.
 References: NIST Cybersecurity Framework, MITRE ATT&CK, CVSS, ISO 27001
 """
+import hashlib
+import ipaddress
 import logging
-from typing import Dict, Tuple, List, Optional
+import re
+from bisect import bisect_left
+from functools import lru_cache
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, Iterable, Set, Tuple, List, Optional
 from datetime import datetime, timedelta
+from types import MappingProxyType
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 from django.utils import timezone
-from django.db.models import Count, Avg
+from django.db.models import Count, Avg, Q, prefetch_related_objects
 import numpy as np
 
-from .ml_models import risk_scoring_model
-from .models import RiskScore, Metric
+from .ml_models import get_risk_model
+from .models import RiskScore, Metric, RISK_LEVELS, get_risk_level
 from apps.alerts.models import Alert
 from apps.accounts.models import Client
+from apps.threat_intelligence.models import ThreatIndicator
 
 logger = logging.getLogger(__name__)
 
+class KeywordScanner:
+    """
+    Finds which of a fixed set of keywords occur in a string, in one pass.
+    
+    Uses a single regex alternation, which reports at most one keyword per
+    start position (the longest).
+    """
+    
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords = tuple(keywords)
+        alternation = '|'.join(re.escape(keyword) for keyword in sorted(self.keywords, key=len, reverse=True))
+        self._pattern = re.compile(f'(?=({alternation}))')
+    
+    def find(self, text: str) -> Set[str]:
+        """Keywords occurring in text (substring match)."""
+        return set(self._pattern.findall(text))
+
+
+def _port_array(ports) -> np.ndarray:
+    """Boolean array indexed by port number, for batch lookups."""
+    mask = np.zeros(65536, dtype=bool)
+    mask[list(ports)] = True
+    return mask
+
+
+# IPv4 networks treated as internal (RFC 1918, loopback, link-local)
+INTERNAL_NETWORKS = tuple(
+    ipaddress.IPv4Network(network)
+    for network in ('10.0.0.0/8', '172.16.0.0/12', '192.168.0.0/16', '127.0.0.0/8', '169.254.0.0/16')
+)
+
+
+@lru_cache(maxsize=100_000)
+def _ip_is_external(ip: str) -> bool:
+    """Whether an IP address is outside the internal networks (False for invalid addresses)."""
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    if address.version == 4:
+        return not any(address in network for network in INTERNAL_NETWORKS)
+    return address.is_global
+
+
+def _external_ip_mask(ips: List[Optional[str]]) -> np.ndarray:
+    """Vectorized _ip_is_external over a batch (False for missing addresses)."""
+    u32 = np.zeros(len(ips), dtype=np.uint32)
+    is_v4 = np.zeros(len(ips), dtype=bool)
+    external = np.zeros(len(ips), dtype=bool)
+    for i, ip in enumerate(ips):
+        if not ip:
+            continue
+        try:
+            u32[i] = int(ipaddress.IPv4Address(ip))
+            is_v4[i] = True
+        except ValueError:
+            external[i] = _ip_is_external(ip)
+    
+    internal = np.zeros(len(ips), dtype=bool)
+    for network in INTERNAL_NETWORKS:
+        internal |= (u32 & int(network.netmask)) == int(network.network_address)
+    
+    return np.where(is_v4, ~internal, external)
+
+
+@lru_cache(maxsize=4096)
+def _parse_iso(value: str) -> datetime:
+    """Parse an ISO 8601 timestamp, accepting a trailing 'Z' for UTC."""
+    if value.endswith('Z'):
+        value = value[:-1] + '+00:00'
+    return datetime.fromisoformat(value)
+
+
+def _ttl_bucket() -> int:
+    """Current threat intel cache period; the loaders below reload when it changes."""
+    return int(time.monotonic() // max(1, settings.RISK_SCORING_THREAT_INTEL_TTL))
+
+
+@lru_cache(maxsize=1)
+def _load_malicious_ips(bucket: int) -> frozenset:
+    """Active, non false-positive IP indicators plus RISK_SCORING_MALICIOUS_IPS."""
+    ips = {ip.strip() for ip in settings.RISK_SCORING_MALICIOUS_IPS if ip.strip()}
+    try:
+        ips.update(ThreatIndicator.objects.filter(
+            indicator_type='ip',
+            is_active=True,
+            is_false_positive=False
+        ).values_list('value', flat=True))
+    except Exception as e:
+        logger.error(f"Error loading malicious IPs from threat intelligence: {str(e)}")
+    return frozenset(ips)
+
+
+@lru_cache(maxsize=1)
+def _load_critical_assets(bucket: int) -> frozenset:
+    """Critical asset IPs from RISK_SCORING_CRITICAL_ASSETS."""
+    return frozenset(ip.strip() for ip in settings.RISK_SCORING_CRITICAL_ASSETS if ip.strip())
+
+
+def _finalize_scores(weighted: np.ndarray, large_payload: np.ndarray, tag_adjustment: np.ndarray) -> np.ndarray:
+    """Batch counterpart of RiskScoringService._finalize_score's numeric part."""
+    return np.clip(weighted + np.where(large_payload, 0.5, 0.0) + tag_adjustment, 0.0, 10.0)
+
+
+# Recommendation sets by score band (serialized as JSON lists)
+_RECOMMENDATIONS_CRITICAL = (
+    "IMMEDIATE investigation required",
+    "Consider incident escalation",
+    "Implement emergency containment measures"
+)
+_RECOMMENDATIONS_HIGH = (
+    "Priority investigation within 4 hours",
+    "Review and update security controls",
+    "Monitor for related activities"
+)
+_RECOMMENDATIONS_MEDIUM = (
+    "Investigate within 24 hours",
+    "Review security policies",
+    "Consider additional monitoring"
+)
+_RECOMMENDATIONS_ROUTINE = (
+    "Routine investigation",
+    "Monitor for patterns",
+    "Update threat intelligence"
+)
+
+_RISK_LEVELS_ARRAY = np.array(RISK_LEVELS)
+
+
+def _risk_levels(scores: np.ndarray) -> List[str]:
+    """Vectorized get_risk_level over a batch of scores."""
+    return _RISK_LEVELS_ARRAY[np.clip(scores.astype(np.int64) // 2, 0, 4)].tolist()
+
+
+class ScoreCache:
+    """
+    Bounded TTL cache of (score, factors) results keyed by alert fingerprint.
+    
+    Eviction follows the CLOCK (second chance) policy: entries read since
+    the last sweep get moved to the back instead of being dropped.
+    """
+    
+    def __init__(self, maxsize: int = 10_000, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()  # fingerprint -> [stored_at, referenced, value]
+        self._lock = threading.Lock()
+    
+    def get(self, fingerprint: bytes):
+        """Cached value for fingerprint, or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] >= self.ttl:
+                del self._entries[fingerprint]
+                return None
+            entry[1] = True
+            return entry[2]
+    
+    def set(self, fingerprint: bytes, value):
+        with self._lock:
+            self._entries[fingerprint] = [time.monotonic(), False, value]
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.maxsize:
+                oldest, entry = next(iter(self._entries.items()))
+                if entry[1]:
+                    entry[1] = False
+                    self._entries.move_to_end(oldest)
+                else:
+                    del self._entries[oldest]
+    
+    def invalidate(self, fingerprint: Optional[bytes] = None):
+        """Drop one cached entry, or all of them when no fingerprint is given."""
+        with self._lock:
+            if fingerprint is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(fingerprint, None)
+
+
+_score_cache = ScoreCache()
+
+
+def _risk_stats_generation_key(client_id: Optional[int]) -> str:
+    return f"riskstats:v1:gen:{client_id or 'all'}"
+
+
+def risk_stats_cache_key(prefix: str, client_id: Optional[int] = None) -> str:
+    """
+    Shared cache key of a dashboard statistics payload, for one client or
+    for all of them (client_id None).
+    
+    The key embeds a generation counter bumped by invalidate_risk_stats_cache,
+    so saving an alert retires the cached payloads without a key scan.
+    """
+    generation = cache.get_or_set(_risk_stats_generation_key(client_id), 0, None)
+    return f"{prefix}:v1:{client_id or 'all'}:{generation}"
+
+
+def invalidate_risk_stats_cache(client_id: Optional[int] = None):
+    """Retire the cached statistics of a client and the all-clients ones."""
+    keys = {_risk_stats_generation_key(client_id), _risk_stats_generation_key(None)}
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Never cached (or evicted): nothing to retire
+            pass
+
 
 class RiskScoringService:
     """
@@ -61,6 +284,45 @@ class RiskScoringService:
         'unknown': 1.0
     }
     
+    # Description keyword multipliers
+    KEYWORD_MULTIPLIERS = {
+        'critical': 1.2,
+        'urgent': 1.15,
+        'immediate': 1.1,
+        'suspicious': 1.05,
+        'anomaly': 1.03,
+        'normal': 0.9,
+        'false positive': 0.3
+    }
+    
+    # Threat tag multipliers (exact tag match)
+    TAG_MULTIPLIERS = {
+        'apt': 1.5,           # Advanced Persistent Threat
+        'ransomware': 1.8,    # Ransomware
+        'zero_day': 1.6,      # Zero-day exploit
+        'insider': 1.4,       # Insider threat
+        'nation_state': 1.7,  # Nation-state actor
+        'criminal': 1.3,      # Criminal organization
+        'hacktivist': 1.1,    # Hacktivist
+        'false_positive': 0.2 # False positive
+    }
+    
+    # Final score adjustments for tags containing these markers (first match wins)
+    TAG_ADJUSTMENTS = (
+        ('anomaly', 0.3),
+        ('correlation', 0.2),
+        ('escalation', 0.4),
+    )
+    
+    # One automaton over description keywords and tag markers
+    _KEYWORD_SCANNER = KeywordScanner({*KEYWORD_MULTIPLIERS, *(marker for marker, _ in TAG_ADJUSTMENTS)})
+    
+    # Integer codes into the tables above, for array lookups in score_many
+    _SEVERITY_CODES = {severity: code for code, severity in enumerate(SEVERITY_WEIGHTS)}
+    _SEVERITY_TABLE = np.array(list(SEVERITY_WEIGHTS.values()))
+    _ALERT_TYPE_CODES = {alert_type: code for code, alert_type in enumerate(ALERT_TYPE_MULTIPLIERS)}
+    _ALERT_TYPE_TABLE = np.array(list(ALERT_TYPE_MULTIPLIERS.values()))
+    
     # Network context risk factors (CVSS inspired)
     NETWORK_RISK_FACTORS = {
         'external_ip': 1.3,      # External IPs are riskier
@@ -72,97 +334,75 @@ class RiskScoringService:
         'encrypted_traffic': 0.9 # Encrypted traffic is slightly less risky
     }
     
+    SUSPICIOUS_PORTS = frozenset({23, 135, 139, 445, 1433, 3389, 5432, 6379})
+    HIGH_RISK_PORTS = frozenset({22, 23, 80, 443, 3389, 5900, 8080})
+    # Per-port network score (+1.0 suspicious, +0.5 high risk), for score_many
+    _PORT_SCORES = _port_array(SUSPICIOUS_PORTS) * 1.0 + _port_array(HIGH_RISK_PORTS) * 0.5
+    
+    # Weighted score components: (name, weight, description)
+    COMPONENTS = (
+        ('severity', 0.3, 'Base severity from NIST framework'),
+        ('alert_type', 0.25, 'MITRE ATT&CK based type risk'),
+        ('network_context', 0.2, 'Network context and IP reputation'),
+        ('temporal', 0.15, 'Time-based risk factors'),
+        ('client_context', 0.1, 'Client-specific business impact'),
+        ('ml_enhancement', 0.1, 'ML model prediction enhancement'),
+    )
+    COMPONENT_WEIGHTS = np.array([weight for _, weight, _ in COMPONENTS])
+    
+    # Alert columns read while scoring (see scoring_queryset)
+    SCORING_FIELDS = (
+        'id', 'client_id', 'client__name', 'severity', 'alert_type',
+        'source_ip', 'destination_ip', 'source_port', 'destination_port', 'protocol',
+        'description', 'tags', 'raw_data_size', 'detected_at',
+    )
+    _ML_COMPONENT = [name for name, _, _ in COMPONENTS].index('ml_enhancement')
+    
     def __init__(self):
-        self.ml_model = risk_scoring_model
+        self.ml_model = get_risk_model()
         self.logger = logger
     
     def calculate_alert_risk_score(self, alert: Alert) -> Tuple[float, Dict]:
         """
         Calculate comprehensive risk score for an alert.
         
+        Results are cached for a few minutes on the alert fingerprint (see
+        score_fingerprint), so repeated alerts skip the DB and ML work.
+        
         Args:
             alert: Alert instance to score
             
         Returns:
             Tuple of (score, factors_dict)
         """
+        now = timezone.now()
+        calculated_at = now.isoformat()
+        
         try:
-            # Initialize scoring factors
-            factors = {
-                'methodology': 'professional_hybrid_v1',
-                'calculated_at': timezone.now().isoformat(),
-                'components': {}
-            }
+            fingerprint = self.score_fingerprint(alert)
+            cached = _score_cache.get(fingerprint)
+            if cached is not None:
+                return self._refresh_cached(cached, calculated_at)
             
-            # 1. Base severity score (NIST/ISO 27001)
-            severity_score = self._calculate_severity_score(alert)
-            factors['components']['severity'] = {
-                'value': severity_score,
-                'weight': 0.3,
-                'description': 'Base severity from NIST framework'
-            }
-            
-            # 2. Alert type multiplier (MITRE ATT&CK)
-            type_multiplier = self._calculate_type_multiplier(alert)
-            factors['components']['alert_type'] = {
-                'value': type_multiplier,
-                'weight': 0.25,
-                'description': 'MITRE ATT&CK based type risk'
-            }
-            
-            # 3. Network context analysis (CVSS inspired)
-            network_score = self._calculate_network_context(alert)
-            factors['components']['network_context'] = {
-                'value': network_score,
-                'weight': 0.2,
-                'description': 'Network context and IP reputation'
-            }
-            
-            # 4. Temporal factors (CVSS temporal metrics)
-            temporal_score = self._calculate_temporal_factors(alert)
-            factors['components']['temporal'] = {
-                'value': temporal_score,
-                'weight': 0.15,
-                'description': 'Time-based risk factors'
-            }
+            tag_multiplier, tag_adjustment = self._scan_tags(alert.tags)
             
-            # 5. Client context (Business impact)
-            client_score = self._calculate_client_context(alert)
-            factors['components']['client_context'] = {
-                'value': client_score,
-                'weight': 0.1,
-                'description': 'Client-specific business impact'
-            }
-            
-            # 6. Machine Learning enhancement
-            ml_score = self._calculate_ml_enhancement(alert)
-            factors['components']['ml_enhancement'] = {
-                'value': ml_score,
-                'weight': 0.1,
-                'description': 'ML model prediction enhancement'
-            }
+            # Component values, in COMPONENTS order
+            values = np.array([
+                self._calculate_severity_score(alert),                                  # NIST/ISO 27001
+                self._calculate_type_multiplier(alert, tag_multiplier=tag_multiplier),  # MITRE ATT&CK
+                self._calculate_network_context(alert),                                 # CVSS inspired
+                self._calculate_temporal_factors(alert),                                # CVSS temporal metrics
+                self._calculate_client_context(alert, now=now),                         # Business impact
+                self._calculate_ml_enhancement(alert),
+            ])
             
             # Calculate final weighted score
-            final_score = (
-                severity_score * 0.3 +
-                type_multiplier * 0.25 +
-                network_score * 0.2 +
-                temporal_score * 0.15 +
-                client_score * 0.1 +
-                ml_score * 0.1
+            factors = self._build_factors(calculated_at, values.tolist())
+            final_score = self._finalize_score(
+                alert, float(values @ self.COMPONENT_WEIGHTS), factors, tag_adjustment
             )
             
-            # Apply additional risk factors
-            final_score = self._apply_additional_factors(alert, final_score, factors)
-            
-            # Ensure score is within bounds (0-10)
-            final_score = max(0.0, min(10.0, final_score))
-            
-            # Add confidence and metadata
-            factors['confidence'] = self._calculate_confidence(factors)
-            factors['risk_level'] = self._get_risk_level(final_score)
-            factors['recommendations'] = self._get_recommendations(final_score, factors)
-            
+            _score_cache.set(fingerprint, (final_score, factors))
             return final_score, factors
             
         except Exception as e:
@@ -171,62 +411,319 @@ class RiskScoringService:
             return 5.0, {
                 'error': str(e),
                 'methodology': 'error_fallback',
-                'calculated_at': timezone.now().isoformat()
+                'calculated_at': calculated_at
             }
     
+    def score_many(self, alerts: List[Alert], persist: bool = False,
+                   calculated_by=None) -> List[Tuple[float, Dict]]:
+        """
+        Calculate risk scores for a batch of alerts.
+        
+        Produces (score, factors) pairs shaped like calculate_alert_risk_score,
+        but table lookups and the weighted sum run over NumPy arrays and the
+        ML model is called once for the whole batch. Cached results are
+        reused and only the remaining alerts are scored.
+        
+        Args:
+            alerts: Alert instances to score
+            persist: Also save the scores on the alerts and record RiskScore
+                rows, in bulk (see _persist_scores)
+            calculated_by: User recorded on the RiskScore rows
+            
+        Returns:
+            List of (score, factors_dict), in the order of `alerts`
+        """
+        alerts = list(alerts)
+        if not alerts:
+            return []
+        
+        now = timezone.now()
+        calculated_at = now.isoformat()
+        fingerprints = [self._safe_fingerprint(alert) for alert in alerts]
+        cached = [_score_cache.get(fingerprint) if fingerprint is not None else None for fingerprint in fingerprints]
+        
+        scored = iter(self._score_batch(
+            [alert for alert, hit in zip(alerts, cached) if hit is None], now
+        ))
+        
+        results = []
+        for fingerprint, hit in zip(fingerprints, cached):
+            if hit is None:
+                result = next(scored)
+                if fingerprint is not None and 'error' not in result[1]:
+                    _score_cache.set(fingerprint, result)
+                results.append(result)
+            else:
+                results.append(self._refresh_cached(hit, calculated_at))
+        
+        if persist:
+            self._persist_scores(alerts, results, calculated_by)
+        
+        return results
+    
+    def scoring_queryset(self, queryset):
+        """
+        Shape an Alert queryset for scoring: join the client (its name is read
+        by the client context component) and load only SCORING_FIELDS.
+        
+        Alerts fetched without select_related('client') cost one extra query
+        each in calculate_alert_risk_score.
+        """
+        return queryset.select_related('client').only(*self.SCORING_FIELDS)
+    
+    def score_queryset(self, queryset, persist: bool = False, calculated_by=None) -> List[Tuple[Alert, float, Dict]]:
+        """
+        Fetch and score the alerts of a queryset with a constant number of
+        queries (see score_many).
+        
+        Returns:
+            List of (alert, score, factors_dict)
+        """
+        alerts = list(self.scoring_queryset(queryset))
+        scored = self.score_many(alerts, persist=persist, calculated_by=calculated_by)
+        return [(alert, score, factors) for alert, (score, factors) in zip(alerts, scored)]
+    
+    def _persist_scores(self, alerts: List[Alert], results: List[Tuple[float, Dict]], calculated_by=None):
+        """
+        Store scores on the alerts and record one RiskScore per alert, with
+        bulk_update/bulk_create in RISK_SCORE_BATCH_SIZE chunks.
+        """
+        batch_size = settings.RISK_SCORE_BATCH_SIZE
+        risk_scores = []
+        for alert, (score, factors) in zip(alerts, results):
+            alert.risk_score = score
+            alert.risk_factors = factors
+            risk_scores.append(RiskScore(
+                client_id=alert.client_id,
+                score_type='alert',
+                entity_id=str(alert.id),
+                entity_type='Alert',
+                score=score,
+                confidence=factors.get('confidence', 0.8),
+                factors=factors,
+                methodology=factors.get('methodology', 'professional_hybrid_v1'),
+                calculated_by=calculated_by
+            ))
+        
+        with transaction.atomic():
+            Alert.objects.bulk_update(alerts, ['risk_score', 'risk_factors'], batch_size=batch_size)
+            RiskScore.objects.bulk_create(risk_scores, batch_size=batch_size)
+        
+        # bulk_update sends no post_save signal
+        for client_id in {alert.client_id for alert in alerts}:
+            invalidate_risk_stats_cache(client_id)
+    
+    def _score_batch(self, alerts: List[Alert], now: datetime) -> List[Tuple[float, Dict]]:
+        """Vectorized scoring of alerts (no cache lookups), see score_many."""
+        if not alerts:
+            return []
+        
+        calculated_at = now.isoformat()
+        
+        try:
+            # Client names are read by the client context component
+            prefetch_related_objects(alerts, 'client')
+            
+            # Severity and type lookups over the whole batch
+            severity_base = self._table_lookup(
+                self._SEVERITY_CODES, self._SEVERITY_TABLE, [a.severity for a in alerts], 5.0
+            )
+            type_base = self._table_lookup(
+                self._ALERT_TYPE_CODES, self._ALERT_TYPE_TABLE, [a.alert_type for a in alerts], 1.0
+            )
+            description_mult = np.array([self._description_multiplier(a.description) for a in alerts])
+            tag_mult, tag_adjustments = np.array([self._scan_tags(a.tags) for a in alerts]).reshape(-1, 2).T
+            
+            components = np.empty((len(alerts), len(self.COMPONENTS)))
+            components[:, 0] = np.minimum(10.0, severity_base * description_mult)
+            components[:, 1] = np.minimum(10.0, type_base * tag_mult)
+            ports = np.array([(a.source_port or 0, a.destination_port or 0) for a in alerts], dtype=np.int64)
+            ports[(ports < 0) | (ports > 65535)] = 0
+            port_scores = self._PORT_SCORES[ports].sum(axis=1)
+            source_external = _external_ip_mask([a.source_ip for a in alerts])
+            components[:, 2] = [
+                self._calculate_network_context(a, port_score=p, source_external=e)
+                for a, p, e in zip(alerts, port_scores.tolist(), source_external.tolist())
+            ]
+            detected = [self._get_detected_at(a) for a in alerts]
+            recent_counts, client_counts = self._prefetch_context_counts(alerts, detected, now)
+            components[:, 3] = self._temporal_scores(detected, recent_counts)
+            components[:, 4] = [
+                self._calculate_client_context(a, client_alert_count=client_counts.get(a.client_id, 0))
+                for a in alerts
+            ]
+            components[:, 5] = self._predict_ml_scores(alerts)
+            
+            large_payload = np.fromiter(
+                (self._is_large_payload(a) for a in alerts), dtype=bool, count=len(alerts)
+            )
+            scores = _finalize_scores(components @ self.COMPONENT_WEIGHTS, large_payload, tag_adjustments)
+            confidences = self._compute_confidence_array(components, large_payload)
+            
+        except Exception as e:
+            self.logger.error(f"Error in batch risk scoring, falling back to per-alert scoring: {str(e)}")
+            return [self.calculate_alert_risk_score(alert) for alert in alerts]
+        
+        results = []
+        for values, score, is_large, confidence, risk_level in zip(
+            components.tolist(), scores.tolist(), large_payload.tolist(), confidences.tolist(), _risk_levels(scores)
+        ):
+            factors = self._build_factors(calculated_at, values)
+            if is_large:
+                self._add_large_payload_factor(factors)
+            self._complete_factors(score, factors, confidence, risk_level)
+            results.append((score, factors))
+        
+        return results
+    
+    def score_fingerprint(self, alert: Alert) -> bytes:
+        """
+        Content fingerprint of the alert fields that drive its score.
+        
+        Detection time is truncated to the hour; alert counts and ML
+        predictions are taken as stable for the cache TTL.
+        """
+        detected_at = self._get_detected_at(alert)
+        key = repr((
+            alert.client_id,
+            alert.severity,
+            alert.alert_type,
+            alert.source_ip,
+            alert.destination_ip,
+            alert.source_port,
+            alert.destination_port,
+            alert.protocol,
+            alert.description,
+            alert.tags,
+            self._is_large_payload(alert),
+            detected_at.replace(minute=0, second=0, microsecond=0).isoformat(),
+        ))
+        return hashlib.blake2b(key.encode(), digest_size=16).digest()
+    
+    def _safe_fingerprint(self, alert: Alert) -> Optional[bytes]:
+        """score_fingerprint, or None (not cached) when the alert fields cannot be read."""
+        try:
+            return self.score_fingerprint(alert)
+        except Exception:
+            return None
+    
+    @classmethod
+    def invalidate_cached_score(cls, alert: Optional[Alert] = None):
+        """Forget the cached score of an alert's fingerprint (all scores if alert is None)."""
+        _score_cache.invalidate(cls().score_fingerprint(alert) if alert is not None else None)
+    
+    @staticmethod
+    def _refresh_cached(cached: Tuple[float, Dict], calculated_at: str) -> Tuple[float, Dict]:
+        score, factors = cached
+        return score, {**factors, 'calculated_at': calculated_at}
+    
+    def _build_factors(self, calculated_at: str, values: List[float]) -> Dict:
+        """Factors dict for component values given in COMPONENTS order."""
+        return {
+            'methodology': 'professional_hybrid_v1',
+            'calculated_at': calculated_at,
+            'components': {
+                name: {'value': value, 'weight': weight, 'description': description}
+                for (name, weight, description), value in zip(self.COMPONENTS, values)
+            }
+        }
+    
+    def _finalize_score(self, alert: Alert, score: float, factors: Dict, tag_adjustment: float) -> float:
+        """Apply additional factors to a weighted score, clamp it and complete `factors`."""
+        score = self._apply_additional_factors(alert, score, factors, tag_adjustment=tag_adjustment)
+        
+        # Ensure score is within bounds (0-10)
+        score = max(0.0, min(10.0, score))
+        
+        self._complete_factors(score, factors)
+        return score
+    
+    def _complete_factors(self, score: float, factors: Dict, confidence: Optional[float] = None,
+                          risk_level: Optional[str] = None):
+        """
+        Add confidence, risk level and recommendations to `factors`.
+        
+        `confidence` and `risk_level` may be passed in when already computed
+        for a batch.
+        """
+        factors['confidence'] = self._calculate_confidence(factors) if confidence is None else confidence
+        factors['risk_level'] = risk_level or self._get_risk_level(score)
+        factors['recommendations'] = self._get_recommendations(score, factors)
+    
+    @staticmethod
+    def _table_lookup(codes: Dict[str, int], table: np.ndarray, keys: List[str], default: float) -> np.ndarray:
+        """Map keys to table values through their integer codes (`default` for unknown keys)."""
+        key_codes = np.fromiter((codes.get(key, -1) for key in keys), dtype=np.int8, count=len(keys))
+        return np.where(key_codes >= 0, table[key_codes.clip(0)], default)
+    
     def _calculate_severity_score(self, alert: Alert) -> float:
         """Calculate base severity score (NIST/ISO 27001)."""
         base_score = self.SEVERITY_WEIGHTS.get(alert.severity, 5.0)
         
         # Adjust based on description keywords
-        description = alert.description.lower() if alert.description else ""
-        keyword_multipliers = {
-            'critical': 1.2,
-            'urgent': 1.15,
-            'immediate': 1.1,
-            'suspicious': 1.05,
-            'anomaly': 1.03,
-            'normal': 0.9,
-            'false positive': 0.3
-        }
-        
+        return min(10.0, base_score * self._description_multiplier(alert.description))
+    
+    def _description_multiplier(self, description: Optional[str]) -> float:
+        """Multiplier from risk keywords found in the alert description."""
         multiplier = 1.0
-        for keyword, mult in keyword_multipliers.items():
-            if keyword in description:
-                multiplier *= mult
+        if description:
+            # Each keyword counts once, however many times it appears
+            found = self._KEYWORD_SCANNER.find(description.lower())
+            if found:
+                for keyword, mult in self.KEYWORD_MULTIPLIERS.items():
+                    if keyword in found:
+                        multiplier *= mult
         
-        return min(10.0, base_score * multiplier)
+        return multiplier
     
-    def _calculate_type_multiplier(self, alert: Alert) -> float:
+    def _calculate_type_multiplier(self, alert: Alert, tag_multiplier: Optional[float] = None) -> float:
         """Calculate alert type risk multiplier (MITRE ATT&CK)."""
         base_multiplier = self.ALERT_TYPE_MULTIPLIERS.get(alert.alert_type, 1.0)
         
         # Adjust based on tags
-        if alert.tags:
-            tag_multipliers = {
-                'apt': 1.5,           # Advanced Persistent Threat
-                'ransomware': 1.8,    # Ransomware
-                'zero_day': 1.6,      # Zero-day exploit
-                'insider': 1.4,       # Insider threat
-                'nation_state': 1.7,  # Nation-state actor
-                'criminal': 1.3,      # Criminal organization
-                'hacktivist': 1.1,    # Hacktivist
-                'false_positive': 0.2 # False positive
-            }
-            
-            for tag in alert.tags:
-                if isinstance(tag, str) and tag.lower() in tag_multipliers:
-                    base_multiplier *= tag_multipliers[tag.lower()]
+        if tag_multiplier is None:
+            tag_multiplier = self._scan_tags(alert.tags)[0]
+        return min(10.0, base_multiplier * tag_multiplier)
+    
+    def _scan_tags(self, tags) -> Tuple[float, float]:
+        """
+        Single pass over alert tags.
+        
+        Returns:
+            Tuple of (type multiplier from TAG_MULTIPLIERS, final score
+            adjustment from TAG_ADJUSTMENTS)
+        """
+        multiplier = 1.0
+        adjustment = 0.0
+        for tag in tags or ():
+            if not isinstance(tag, str):
+                continue
+            tag_lower = tag.lower()
+            multiplier *= self.TAG_MULTIPLIERS.get(tag_lower, 1.0)
+            found = self._KEYWORD_SCANNER.find(tag_lower)
+            if found:
+                for marker, value in self.TAG_ADJUSTMENTS:
+                    if marker in found:
+                        adjustment += value
+                        break
         
-        return min(10.0, base_multiplier)
+        return multiplier, adjustment
     
-    def _calculate_network_context(self, alert: Alert) -> float:
-        """Calculate network context risk (CVSS inspired)."""
+    def _calculate_network_context(self, alert: Alert, port_score: Optional[float] = None,
+                                   source_external: Optional[bool] = None) -> float:
+        """
+        Calculate network context risk (CVSS inspired).
+        
+        `port_score` and `source_external` can be passed in when already
+        computed for a batch (see score_many); otherwise they are checked here.
+        """
         score = 5.0  # Base score
         
         # Source IP analysis
         if alert.source_ip:
-            if self._is_external_ip(alert.source_ip):
+            if source_external is None:
+                source_external = self._is_external_ip(alert.source_ip)
+            if source_external:
                 score += 1.0
             if self._is_known_malicious_ip(alert.source_ip):
                 score += 2.0
@@ -237,17 +734,20 @@ class RiskScoringService:
                 score += 1.5
         
         # Port analysis
-        if alert.source_port:
-            if self._is_suspicious_port(alert.source_port):
-                score += 1.0
-            if self._is_high_risk_port(alert.source_port):
-                score += 0.5
-        
-        if alert.destination_port:
-            if self._is_suspicious_port(alert.destination_port):
-                score += 1.0
-            if self._is_high_risk_port(alert.destination_port):
-                score += 0.5
+        if port_score is not None:
+            score += port_score
+        else:
+            if alert.source_port:
+                if self._is_suspicious_port(alert.source_port):
+                    score += 1.0
+                if self._is_high_risk_port(alert.source_port):
+                    score += 0.5
+            
+            if alert.destination_port:
+                if self._is_suspicious_port(alert.destination_port):
+                    score += 1.0
+                if self._is_high_risk_port(alert.destination_port):
+                    score += 0.5
         
         # Protocol analysis
         if alert.protocol:
@@ -262,12 +762,7 @@ class RiskScoringService:
         """Calculate temporal risk factors (CVSS temporal)."""
         score = 5.0  # Base score
         
-        # Ensure detected_at is a datetime object
-        if isinstance(alert.detected_at, str):
-            from datetime import datetime
-            detected_at = datetime.fromisoformat(alert.detected_at.replace('Z', '+00:00'))
-        else:
-            detected_at = alert.detected_at
+        detected_at = self._get_detected_at(alert)
         
         # Time of day analysis
         hour = detected_at.hour
@@ -284,7 +779,7 @@ class RiskScoringService:
         # Frequency analysis (recent alerts from same source)
         recent_time = detected_at - timedelta(hours=24)
         recent_alerts = Alert.objects.filter(
-            client=alert.client,
+            client_id=alert.client_id,
             source_ip=alert.source_ip,
             detected_at__gte=recent_time
         ).count()
@@ -296,8 +791,81 @@ class RiskScoringService:
         
         return min(10.0, score)
     
-    def _calculate_client_context(self, alert: Alert) -> float:
-        """Calculate client-specific business impact."""
+    def _temporal_scores(self, detected: List[datetime], recent_counts: List[int]) -> np.ndarray:
+        """Vectorized _calculate_temporal_factors over a batch (see score_many)."""
+        hours = np.fromiter((d.hour for d in detected), dtype=np.int8, count=len(detected))
+        weekdays = np.fromiter((d.weekday() for d in detected), dtype=np.int8, count=len(detected))
+        recent = np.asarray(recent_counts)
+        
+        score = np.full(len(detected), 5.0)
+        score += np.where((hours >= 2) & (hours <= 6), 1.0, np.where((hours >= 9) & (hours <= 17), -0.5, 0.0))
+        score += np.where(weekdays >= 5, 0.5, 0.0)
+        score += np.where(recent > 5, 1.0, 0.0)
+        
+        return np.minimum(10.0, score)
+    
+    def _get_detected_at(self, alert: Alert) -> datetime:
+        """Return alert.detected_at as a datetime object."""
+        if isinstance(alert.detected_at, str):
+            return _parse_iso(alert.detected_at)
+        return alert.detected_at
+    
+    def _prefetch_context_counts(self, alerts: List[Alert], detected: Optional[List[datetime]] = None,
+                                 now: Optional[datetime] = None) -> Tuple[List[int], Dict[int, int]]:
+        """
+        Count the alerts needed by the temporal and client components for a
+        whole batch, in two queries instead of two per alert.
+        
+        Returns:
+            Tuple of (recent_counts, client_counts): recent_counts[i] is the
+            number of alerts from alerts[i]'s client and source IP since its
+            detection time minus 24h; client_counts maps client_id to the
+            number of alerts over the last 30 days.
+        """
+        if detected is None:
+            detected = [self._get_detected_at(alert) for alert in alerts]
+        now = now or timezone.now()
+        client_ids = {alert.client_id for alert in alerts}
+        source_ips = {alert.source_ip for alert in alerts}
+        
+        # Same-source detection times since the earliest window start in the batch
+        source_filter = Q(source_ip__in=[ip for ip in source_ips if ip is not None])
+        if None in source_ips:
+            source_filter |= Q(source_ip__isnull=True)
+        
+        times_by_source = defaultdict(list)
+        rows = Alert.objects.filter(
+            source_filter,
+            client_id__in=client_ids,
+            detected_at__gte=min(detected) - timedelta(hours=24)
+        ).values_list('client_id', 'source_ip', 'detected_at')
+        for client_id, source_ip, detected_at in rows:
+            times_by_source[(client_id, source_ip)].append(detected_at)
+        for times in times_by_source.values():
+            times.sort()
+        
+        recent_counts = []
+        for alert, detected_at in zip(alerts, detected):
+            times = times_by_source.get((alert.client_id, alert.source_ip), [])
+            recent_counts.append(len(times) - bisect_left(times, detected_at - timedelta(hours=24)))
+        
+        client_counts = dict(
+            Alert.objects.filter(
+                client_id__in=client_ids,
+                detected_at__gte=now - timedelta(days=30)
+            ).values('client_id').annotate(count=Count('id')).values_list('client_id', 'count')
+        )
+        
+        return recent_counts, client_counts
+    
+    def _calculate_client_context(self, alert: Alert, client_alert_count: Optional[int] = None,
+                                  now: Optional[datetime] = None) -> float:
+        """
+        Calculate client-specific business impact.
+        
+        `client_alert_count` can be passed in when already counted for a
+        batch; otherwise it is queried over the 30 days before `now`.
+        """
         score = 5.0  # Base score
         
         # Client criticality (could be enhanced with client metadata)
@@ -310,10 +878,11 @@ class RiskScoringService:
                 score += 0.5  # Important sectors
         
         # Client alert frequency (high frequency = higher risk)
-        client_alert_count = Alert.objects.filter(
-            client=alert.client,
-            detected_at__gte=timezone.now() - timedelta(days=30)
-        ).count()
+        if client_alert_count is None:
+            client_alert_count = Alert.objects.filter(
+                client_id=alert.client_id,
+                detected_at__gte=(now or timezone.now()) - timedelta(days=30)
+            ).count()
         
         if client_alert_count > 100:
             score += 1.0
@@ -324,55 +893,69 @@ class RiskScoringService:
     
     def _calculate_ml_enhancement(self, alert: Alert) -> float:
         """Calculate ML model enhancement score."""
+        return self._predict_ml_scores([alert])[0]
+    
+    def _predict_ml_scores(self, alerts: List[Alert]) -> List[float]:
+        """
+        ML scores for a list of alerts, from a single predict() call (5.0 on failure).
+        
+        Predictions are not cached separately: whole scoring results already
+        are (see ScoreCache).
+        """
         try:
-            # Prepare data for ML model
-            alert_data = [{
-                'severity': alert.severity,
-                'alert_type': alert.alert_type,
-                'source_ip': alert.source_ip,
-                'destination_ip': alert.destination_ip,
-                'source_port': alert.source_port,
-                'destination_port': alert.destination_port,
-                'description': alert.description,
-                'tags': alert.tags,
-                'raw_data': alert.raw_data,
-                'detected_at': alert.detected_at,
-                'client_id': alert.client_id
-            }]
-            
-            # Get ML prediction
-            ml_scores = self.ml_model.predict(alert_data)
-            return float(ml_scores[0]) if ml_scores else 5.0
+            ml_scores = self.ml_model.predict([self._ml_features(alert) for alert in alerts])
+            if len(ml_scores) != len(alerts):
+                return [5.0] * len(alerts)
+            return [float(score) for score in ml_scores]
             
         except Exception as e:
             self.logger.warning(f"ML model prediction failed: {str(e)}")
-            return 5.0
+            return [5.0] * len(alerts)
     
-    def _apply_additional_factors(self, alert: Alert, score: float, factors: Dict) -> float:
-        """Apply additional risk factors and adjustments."""
+    def _ml_features(self, alert: Alert) -> Dict:
+        """Alert fields consumed by the ML risk model."""
+        return {
+            'severity': alert.severity,
+            'alert_type': alert.alert_type,
+            'source_ip': alert.source_ip,
+            'destination_ip': alert.destination_ip,
+            'source_port': alert.source_port,
+            'destination_port': alert.destination_port,
+            'description': alert.description,
+            'tags': alert.tags,
+            'raw_data_size': alert.raw_data_size,
+            'detected_at': alert.detected_at,
+            'client_id': alert.client_id
+        }
+    
+    def _apply_additional_factors(self, alert: Alert, score: float, factors: Dict,
+                                  tag_adjustment: Optional[float] = None) -> float:
+        """
+        Apply additional risk factors and adjustments.
+        
+        `tag_adjustment` can be passed in when the tags were already scanned
+        (see _scan_tags).
+        """
         # Raw data size factor
-        if alert.raw_data:
-            data_size = len(str(alert.raw_data))
-            if data_size > 10000:  # Large data payload
-                score += 0.5
-                factors['components']['large_payload'] = {
-                    'value': 0.5,
-                    'description': 'Large data payload detected'
-                }
+        if self._is_large_payload(alert):
+            score += 0.5
+            self._add_large_payload_factor(factors)
         
         # Tag-based adjustments
-        if alert.tags:
-            for tag in alert.tags:
-                if isinstance(tag, str):
-                    tag_lower = tag.lower()
-                    if 'anomaly' in tag_lower:
-                        score += 0.3
-                    elif 'correlation' in tag_lower:
-                        score += 0.2
-                    elif 'escalation' in tag_lower:
-                        score += 0.4
+        if tag_adjustment is None:
+            tag_adjustment = self._scan_tags(alert.tags)[1]
         
-        return score
+        return score + tag_adjustment
+    
+    def _is_large_payload(self, alert: Alert) -> bool:
+        """Whether the alert carries a large raw data payload (over 10000 characters of JSON)."""
+        return alert.raw_data_size > 10000
+    
+    def _add_large_payload_factor(self, factors: Dict):
+        factors['components']['large_payload'] = {
+            'value': 0.5,
+            'description': 'Large data payload detected'
+        }
     
     def _calculate_confidence(self, factors: Dict) -> float:
         """Calculate confidence score for the risk assessment."""
@@ -387,91 +970,94 @@ class RiskScoringService:
         # Increase confidence if multiple factors agree
         component_values = [comp['value'] for comp in factors['components'].values()]
         if len(component_values) > 3:
-            variance = np.var(component_values)
+            # Plain Python is cheaper than NumPy for a handful of values
+            mean = sum(component_values) / len(component_values)
+            variance = sum((value - mean) * (value - mean) for value in component_values) / len(component_values)
             if variance < 2.0:  # Low variance = high agreement
                 confidence += 0.1
         
         return max(0.0, min(1.0, confidence))
     
+    def _compute_confidence_array(self, components: np.ndarray, large_payload: np.ndarray) -> np.ndarray:
+        """
+        Vectorized _calculate_confidence over a batch.
+        
+        Args:
+            components: (N, len(COMPONENTS)) component values
+            large_payload: (N,) rows whose factors also get the 0.5 large
+                payload component
+        """
+        variances = np.var(components, axis=1)
+        if large_payload.any():
+            with_payload = np.column_stack([components[large_payload], np.full(int(large_payload.sum()), 0.5)])
+            variances[large_payload] = np.var(with_payload, axis=1)
+        
+        ml_default = components[:, self._ML_COMPONENT] == 5.0  # Default value indicates ML failure
+        
+        confidence = np.full(len(components), 0.8)
+        confidence = np.where(ml_default, confidence - 0.2, confidence)
+        confidence = np.where(variances < 2.0, confidence + 0.1, confidence)
+        
+        return np.clip(confidence, 0.0, 1.0)
+    
     def _get_risk_level(self, score: float) -> str:
         """Get risk level based on score."""
-        if score >= 8.0:
-            return 'CRITICAL'
-        elif score >= 6.0:
-            return 'HIGH'
-        elif score >= 4.0:
-            return 'MEDIUM'
-        elif score >= 2.0:
-            return 'LOW'
-        else:
-            return 'MINIMAL'
+        return get_risk_level(score)
     
-    def _get_recommendations(self, score: float, factors: Dict) -> List[str]:
-        """Get recommendations based on risk score and factors."""
-        recommendations = []
-        
+    def _get_recommendations(self, score: float, factors: Dict) -> Tuple[str, ...]:
+        """Get recommendations based on risk score and factors (shared tuples, do not mutate)."""
         if score >= 8.0:
-            recommendations.extend([
-                "IMMEDIATE investigation required",
-                "Consider incident escalation",
-                "Implement emergency containment measures"
-            ])
+            return _RECOMMENDATIONS_CRITICAL
         elif score >= 6.0:
-            recommendations.extend([
-                "Priority investigation within 4 hours",
-                "Review and update security controls",
-                "Monitor for related activities"
-            ])
+            return _RECOMMENDATIONS_HIGH
         elif score >= 4.0:
-            recommendations.extend([
-                "Investigate within 24 hours",
-                "Review security policies",
-                "Consider additional monitoring"
-            ])
+            return _RECOMMENDATIONS_MEDIUM
         else:
-            recommendations.extend([
-                "Routine investigation",
-                "Monitor for patterns",
-                "Update threat intelligence"
-            ])
-        
-        return recommendations
+            return _RECOMMENDATIONS_ROUTINE
     
     # Helper methods for network analysis
     def _is_external_ip(self, ip: str) -> bool:
-        """Check if IP is external (simplified)."""
+        """Check if IP is external (outside INTERNAL_NETWORKS)."""
         if not ip:
             return False
-        # Simple heuristic - could be enhanced with proper IP range checking
-        return not (ip.startswith('192.168.') or ip.startswith('10.') or ip.startswith('172.'))
+        return _ip_is_external(ip)
     
     def _is_known_malicious_ip(self, ip: str) -> bool:
-        """Check if IP is known malicious (placeholder)."""
-        # This would integrate with threat intelligence feeds
-        malicious_ips = [
-            '1.1.1.1',  # Example - replace with real threat intel
-            '8.8.8.8'   # Example - replace with real threat intel
-        ]
-        return ip in malicious_ips
+        """Check if IP is known malicious (threat intelligence IP indicators)."""
+        return ip in _load_malicious_ips(_ttl_bucket())
     
     def _is_critical_asset(self, ip: str) -> bool:
-        """Check if IP is a critical asset (placeholder)."""
+        """Check if IP is a critical asset (RISK_SCORING_CRITICAL_ASSETS)."""
         # This would integrate with asset management system
-        critical_assets = [
-            '192.168.1.1',  # Example - replace with real critical assets
-            '192.168.1.10'  # Example - replace with real critical assets
-        ]
-        return ip in critical_assets
+        return ip in _load_critical_assets(_ttl_bucket())
+    
+    @classmethod
+    def refresh_threat_intel(cls):
+        """Reload malicious IPs and critical assets on next use."""
+        _load_malicious_ips.cache_clear()
+        _load_critical_assets.cache_clear()
     
     def _is_suspicious_port(self, port: int) -> bool:
         """Check if port is suspicious."""
-        suspicious_ports = [23, 135, 139, 445, 1433, 3389, 5432, 6379]
-        return port in suspicious_ports
+        return port in self.SUSPICIOUS_PORTS
     
     def _is_high_risk_port(self, port: int) -> bool:
         """Check if port is high risk."""
-        high_risk_ports = [22, 23, 80, 443, 3389, 5900, 8080]
-        return port in high_risk_ports
+        return port in self.HIGH_RISK_PORTS
+
+
+# Shared, read-only placeholder results for ThreatIntelligenceService
+_UNKNOWN_IP_REPUTATION = MappingProxyType({'status': 'unknown', 'reputation': 'neutral'})
+_CLEAN_IP_REPUTATION = MappingProxyType({
+    'status': 'checked',
+    'reputation': 'clean',  # or 'malicious', 'suspicious'
+    'confidence': 0.8,
+    'sources': ('internal_db',)
+})
+_UNKNOWN_DOMAIN_REPUTATION = MappingProxyType({'status': 'not_applicable', 'reputation': 'unknown'})
+_UNKNOWN_MALWARE_FAMILY = MappingProxyType({'family': 'unknown', 'confidence': 0.0})
+_UNKNOWN_THREAT_ACTOR = MappingProxyType({'actor': 'unknown', 'confidence': 0.0})
+_UNKNOWN_CAMPAIGN = MappingProxyType({'campaign': 'unknown', 'confidence': 0.0})
 
 
 class ThreatIntelligenceService:
@@ -505,40 +1091,23 @@ class ThreatIntelligenceService:
     def _check_ip_reputation(self, ip: str) -> Dict:
         """Check IP reputation (placeholder for real TI integration)."""
         if not ip:
-            return {'status': 'unknown', 'reputation': 'neutral'}
+            return _UNKNOWN_IP_REPUTATION
         
         # Placeholder logic - would integrate with VirusTotal, MISP, etc.
-        return {
-            'status': 'checked',
-            'reputation': 'clean',  # or 'malicious', 'suspicious'
-            'confidence': 0.8,
-            'sources': ['internal_db']
-        }
+        return _CLEAN_IP_REPUTATION
     
     def _check_domain_reputation(self, alert: Alert) -> Dict:
         """Check domain reputation (placeholder)."""
-        return {
-            'status': 'not_applicable',
-            'reputation': 'unknown'
-        }
+        return _UNKNOWN_DOMAIN_REPUTATION
     
     def _identify_malware_family(self, alert: Alert) -> Dict:
         """Identify malware family (placeholder)."""
-        return {
-            'family': 'unknown',
-            'confidence': 0.0
-        }
+        return _UNKNOWN_MALWARE_FAMILY
     
     def _identify_threat_actor(self, alert: Alert) -> Dict:
         """Identify threat actor (placeholder)."""
-        return {
-            'actor': 'unknown',
-            'confidence': 0.0
-        }
+        return _UNKNOWN_THREAT_ACTOR
     
     def _identify_campaign(self, alert: Alert) -> Dict:
         """Identify campaign (placeholder)."""
-        return {
-            'campaign': 'unknown',
-            'confidence': 0.0
-        }
+        return _UNKNOWN_CAMPAIGN
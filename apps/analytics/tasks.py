@@ -1,119 +1,188 @@
 """
 Celery tasks for analytics and ML operations.
 """
-from celery import shared_task
+from celery import chord, shared_task
+from celery.signals import worker_process_init
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Avg, Count, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Greatest
 from django.utils import timezone
 from datetime import timedelta
 import logging
+import pandas as pd
 
-from .ml_models import risk_scoring_model, threat_classification_model, anomaly_detection_model
+from .ml_models import get_risk_model, get_threat_model, get_anomaly_model, warm_models
 from .models import RiskScore, Metric
+from .services import invalidate_risk_stats_cache
 from apps.alerts.models import Alert
 from apps.threat_intelligence.models import ThreatIndicator
 
 logger = logging.getLogger(__name__)
 
+# Columns read by the ML feature extractors, fetched with values_list so the
+# models get one DataFrame instead of a model instance and dict per row
+RISK_FEATURE_FIELDS = (
+    'id', 'client_id', 'severity', 'alert_type', 'source_ip', 'destination_ip',
+    'source_port', 'destination_port', 'description', 'tags', 'raw_data_size',
+    'detected_at',
+)
+ANOMALY_FEATURE_FIELDS = (
+    'id', 'client_id', 'source_ip', 'destination_port', 'protocol',
+    'raw_data_size', 'detected_at',
+)
+INDICATOR_FEATURE_FIELDS = (
+    'id', 'description', 'threat_type', 'malware_family', 'actor',
+    'confidence', 'severity_score',
+)
+
+
+@worker_process_init.connect
+def load_ml_models(**kwargs):
+    """Load the ML models once per worker process rather than in the first task."""
+    warm_models()
+
+
+def _feature_frame(rows, columns):
+    """Build a DataFrame from values_list rows (a queryset or an iterator)."""
+    return pd.DataFrame.from_records(rows, columns=columns)
+
+
+def _chunked(items, size):
+    """Split a list into consecutive chunks of at most size items."""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
 
 @shared_task
 def calculate_risk_scores():
     """
     Calculate risk scores for all unprocessed alerts.
+    
+    Fans the pending alerts out to score_alerts_chunk tasks (a chord whose
+    callback, finalize_risk_scoring, logs the total).
     """
     try:
         # Get alerts without risk scores or with old scores
-        alerts = Alert.objects.filter(
-            risk_score=0.0
-        ).select_related('client')[:100]  # Process in batches
+        alert_ids = list(Alert.objects.filter(risk_score=0.0).order_by('id').values_list('id', flat=True))
         
-        if not alerts:
+        if not alert_ids:
             logger.info("No alerts to process for risk scoring")
             return
         
-        # Prepare data for ML model
-        alerts_data = []
-        for alert in alerts:
-            alerts_data.append({
-                'id': alert.id,
-                'severity': alert.severity,
-                'alert_type': alert.alert_type,
-                'source_ip': alert.source_ip,
-                'destination_ip': alert.destination_ip,
-                'source_port': alert.source_port,
-                'destination_port': alert.destination_port,
-                'description': alert.description,
-                'tags': alert.tags,
-                'raw_data': alert.raw_data,
-                'detected_at': alert.detected_at,
-                'client_id': alert.client_id
-            })
+        chunks = _chunked(alert_ids, settings.RISK_SCORING_CHUNK_SIZE)
+        chord(score_alerts_chunk.s(ids) for ids in chunks)(finalize_risk_scoring.s())
         
-        # Get predictions
-        risk_scores = risk_scoring_model.predict(alerts_data)
+        logger.info(f"Dispatched {len(alert_ids)} alerts for risk scoring in {len(chunks)} chunks")
+        return f"Dispatched {len(alert_ids)} alerts in {len(chunks)} chunks"
         
-        # Update alerts with new risk scores
-        for alert, score in zip(alerts, risk_scores):
-            alert.risk_score = score
-            alert.risk_factors = {
+    except Exception as e:
+        logger.error(f"Error dispatching risk scoring: {str(e)}")
+        raise
+
+
+@shared_task(queue='ml_predict')
+def score_alerts_chunk(alert_ids):
+    """
+    Calculate risk scores for a chunk of alerts, returns how many were scored.
+    
+    The alerts stay row-locked until their scores are written; rows locked
+    by another worker, or scored since the chunk was dispatched, are skipped.
+    """
+    try:
+        with transaction.atomic():
+            alerts_df = _feature_frame(Alert.objects.select_for_update(skip_locked=True).filter(
+                id__in=alert_ids,
+                risk_score=0.0
+            ).values_list(*RISK_FEATURE_FIELDS), RISK_FEATURE_FIELDS)
+            
+            if alerts_df.empty:
+                return 0
+            
+            # Get predictions
+            risk_scores = get_risk_model().predict(alerts_df)
+            
+            # Shared by every alert of the batch
+            now = timezone.now()
+            risk_factors = {
                 'ml_model': 'gradient_boosting_v1',
-                'calculated_at': timezone.now().isoformat(),
+                'calculated_at': now.isoformat(),
                 'confidence': 0.8  # Default confidence
             }
-            alert.save()
             
-            # Create risk score record
-            RiskScore.objects.create(
-                client=alert.client,
-                score_type='alert',
-                entity_id=str(alert.id),
-                entity_type='Alert',
-                score=score,
-                confidence=0.8,
-                factors=alert.risk_factors,
-                methodology='ml_model_v1'
-            )
+            # Update alerts with new risk scores
+            alerts = []
+            risk_records = []
+            for alert_id, client_id, score in zip(alerts_df['id'].tolist(), alerts_df['client_id'].tolist(), risk_scores):
+                alerts.append(Alert(id=alert_id, risk_score=score, risk_factors=risk_factors, updated_at=now))
+                
+                # Risk score record
+                risk_records.append(RiskScore(
+                    client_id=client_id,
+                    score_type='alert',
+                    entity_id=str(alert_id),
+                    entity_type='Alert',
+                    score=score,
+                    confidence=0.8,
+                    factors=risk_factors,
+                    methodology='ml_model_v1'
+                ))
+            
+            batch_size = settings.RISK_SCORE_BATCH_SIZE
+            Alert.objects.bulk_update(alerts, ['risk_score', 'risk_factors', 'updated_at'], batch_size=batch_size)
+            RiskScore.objects.bulk_create(risk_records, batch_size=batch_size)
+        
+        # bulk_update sends no post_save signal
+        for client_id in alerts_df['client_id'].unique().tolist():
+            invalidate_risk_stats_cache(client_id)
         
         logger.info(f"Calculated risk scores for {len(alerts)} alerts")
-        return f"Processed {len(alerts)} alerts"
+        return len(alerts)
         
     except Exception as e:
         logger.error(f"Error calculating risk scores: {str(e)}")
         raise
 
 
+@shared_task
+def finalize_risk_scoring(processed_counts):
+    """
+    Chord callback of calculate_risk_scores, once every chunk is scored.
+    """
+    processed = sum(processed_counts)
+    logger.info(f"Risk scoring run completed: {processed} alerts in {len(processed_counts)} chunks")
+    return f"Processed {processed} alerts"
+
+
 @shared_task
 def classify_threat_indicators():
     """
     Classify threat indicators using ML model.
+    
+    Concurrent runs work on disjoint batches: indicators row-locked by
+    another run are skipped.
     """
     try:
-        # Get unclassified threat indicators
-        indicators = ThreatIndicator.objects.filter(
-            threat_type__isnull=True
-        ).select_related('source')[:100]  # Process in batches
-        
-        if not indicators:
-            logger.info("No threat indicators to classify")
-            return
-        
-        # Prepare data for ML model
-        indicators_data = []
-        for indicator in indicators:
-            indicators_data.append({
-                'description': indicator.description,
-                'threat_type': indicator.threat_type,
-                'malware_family': indicator.malware_family,
-                'actor': indicator.actor,
-                'confidence': indicator.confidence,
-                'severity_score': indicator.severity_score
-            })
-        
-        # Get predictions
-        threat_types = threat_classification_model.predict(indicators_data)
-        
-        # Update indicators with classifications
-        for indicator, threat_type in zip(indicators, threat_types):
-            indicator.threat_type = threat_type
-            indicator.save()
+        with transaction.atomic():
+            # Get unclassified threat indicators
+            indicators_df = _feature_frame(ThreatIndicator.objects.select_for_update(skip_locked=True).filter(
+                threat_type__isnull=True
+            ).values_list(*INDICATOR_FEATURE_FIELDS)[:100], INDICATOR_FEATURE_FIELDS)  # Process in batches
+            
+            if indicators_df.empty:
+                logger.info("No threat indicators to classify")
+                return
+            
+            # Get predictions
+            threat_types = get_threat_model().predict(indicators_df)
+            
+            # Update indicators with classifications
+            now = timezone.now()
+            indicators = [
+                ThreatIndicator(id=indicator_id, threat_type=threat_type, updated_at=now)
+                for indicator_id, threat_type in zip(indicators_df['id'].tolist(), threat_types)
+            ]
+            ThreatIndicator.objects.bulk_update(indicators, ['threat_type', 'updated_at'], batch_size=500)
         
         logger.info(f"Classified {len(indicators)} threat indicators")
         return f"Classified {len(indicators)} indicators"
@@ -130,51 +199,60 @@ def detect_anomalies():
     """
     try:
         # Get recent alerts for anomaly detection
-        recent_time = timezone.now() - timedelta(hours=24)
-        alerts = Alert.objects.filter(
+        now = timezone.now()
+        recent_time = now - timedelta(hours=24)
+        events_df = _feature_frame(Alert.objects.filter(
             detected_at__gte=recent_time
-        ).select_related('client')[:1000]  # Process recent alerts
+        ).values_list(*ANOMALY_FEATURE_FIELDS)[:1000], ANOMALY_FEATURE_FIELDS)  # Process recent alerts
         
-        if not alerts:
+        if events_df.empty:
             logger.info("No recent alerts for anomaly detection")
             return
         
-        # Prepare data for ML model
-        events_data = []
-        for alert in alerts:
-            events_data.append({
-                'client_id': alert.client_id,
-                'source_ip': alert.source_ip,
-                'destination_port': alert.destination_port,
-                'protocol': alert.protocol,
-                'raw_data': alert.raw_data,
-                'detected_at': alert.detected_at
-            })
-        
         # Get anomaly predictions
-        anomalies = anomaly_detection_model.predict(events_data)
+        is_anomaly = get_anomaly_model().predict_mask(events_df)
         
         # Process results
-        anomaly_count = 0
-        for alert, anomaly_result in zip(alerts, anomalies):
-            if anomaly_result['is_anomaly']:
-                anomaly_count += 1
-                # Update alert with anomaly information
-                if not alert.tags:
-                    alert.tags = []
-                if 'anomaly' not in alert.tags:
-                    alert.tags.append('anomaly')
-                alert.risk_score = max(alert.risk_score, 7.0)  # Boost risk score for anomalies
-                alert.save()
+        anomalous_rows = events_df.loc[is_anomaly, ['id', 'client_id']]
+        anomalous = anomalous_rows['id'].tolist()
         
-        logger.info(f"Detected {anomaly_count} anomalies in {len(alerts)} alerts")
-        return f"Detected {anomaly_count} anomalies"
+        if anomalous:
+            # Update alerts with anomaly information, in the database
+            _flag_anomalies(anomalous, now)
+            for client_id in anomalous_rows['client_id'].unique().tolist():
+                invalidate_risk_stats_cache(client_id)
+        
+        logger.info(f"Detected {len(anomalous)} anomalies in {len(events_df)} alerts")
+        return f"Detected {len(anomalous)} anomalies"
         
     except Exception as e:
         logger.error(f"Error detecting anomalies: {str(e)}")
         raise
 
 
+def _flag_anomalies(alert_ids, now):
+    """Boost the risk score of anomalous alerts and tag them 'anomaly'."""
+    anomalous = Alert.objects.filter(id__in=alert_ids)
+    anomalous.update(
+        risk_score=Greatest('risk_score', Value(7.0)),  # Boost risk score for anomalies
+        updated_at=now
+    )
+    
+    if connection.vendor == 'postgresql':
+        # Append the tag server side, skipping alerts that already carry it
+        anomalous.exclude(tags__contains=['anomaly']).update(
+            tags=RawSQL("COALESCE(tags, '[]'::jsonb) || jsonb_build_array(%s)", ['anomaly'])
+        )
+        return
+    
+    tagged = []
+    for alert_id, tags in anomalous.values_list('id', 'tags'):
+        tags = tags or []
+        if 'anomaly' not in tags:
+            tagged.append(Alert(id=alert_id, tags=tags + ['anomaly']))
+    Alert.objects.bulk_update(tagged, ['tags'], batch_size=500)
+
+
 @shared_task
 def calculate_metrics():
     """
@@ -183,56 +261,49 @@ def calculate_metrics():
     try:
         from apps.accounts.models import Client
         
-        # Calculate metrics for each client
-        for client in Client.objects.filter(is_active=True):
-            # Alert metrics
-            total_alerts = Alert.objects.filter(client=client).count()
-            open_alerts = Alert.objects.filter(client=client, status='open').count()
-            high_severity_alerts = Alert.objects.filter(
-                client=client, severity__in=['high', 'critical']
-            ).count()
-            
-            # Risk score metrics
-            avg_risk_score = Alert.objects.filter(client=client).aggregate(
-                avg_score=models.Avg('risk_score')
-            )['avg_score'] or 0
-            
-            # Time-based metrics
-            now = timezone.now()
-            last_24h = now - timedelta(hours=24)
-            last_7d = now - timedelta(days=7)
-            
-            alerts_24h = Alert.objects.filter(
-                client=client, detected_at__gte=last_24h
-            ).count()
-            
-            alerts_7d = Alert.objects.filter(
-                client=client, detected_at__gte=last_7d
-            ).count()
-            
-            # Create or update metrics
+        # Time-based metrics
+        now = timezone.now()
+        last_24h = now - timedelta(hours=24)
+        last_7d = now - timedelta(days=7)
+        period_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        
+        # All alert metrics for every active client, in one GROUP BY query
+        clients = Client.objects.filter(is_active=True).annotate(
+            total_alerts=Count('alerts'),
+            open_alerts=Count('alerts', filter=Q(alerts__status='open')),
+            high_severity_alerts=Count('alerts', filter=Q(alerts__severity__in=['high', 'critical'])),
+            avg_risk_score=Avg('alerts__risk_score'),
+            alerts_24h=Count('alerts', filter=Q(alerts__detected_at__gte=last_24h)),
+            alerts_7d=Count('alerts', filter=Q(alerts__detected_at__gte=last_7d)),
+        ).values(
+            'id', 'total_alerts', 'open_alerts', 'high_severity_alerts',
+            'avg_risk_score', 'alerts_24h', 'alerts_7d'
+        )
+        
+        metrics = []
+        for stats in clients:
             metrics_data = [
-                ('total_alerts', total_alerts, 'count'),
-                ('open_alerts', open_alerts, 'count'),
-                ('high_severity_alerts', high_severity_alerts, 'count'),
-                ('avg_risk_score', avg_risk_score, 'average'),
-                ('alerts_24h', alerts_24h, 'count'),
-                ('alerts_7d', alerts_7d, 'count'),
+                ('total_alerts', stats['total_alerts'], 'count'),
+                ('open_alerts', stats['open_alerts'], 'count'),
+                ('high_severity_alerts', stats['high_severity_alerts'], 'count'),
+                ('avg_risk_score', stats['avg_risk_score'] or 0, 'average'),
+                ('alerts_24h', stats['alerts_24h'], 'count'),
+                ('alerts_7d', stats['alerts_7d'], 'count'),
             ]
             
             for name, value, metric_type in metrics_data:
-                Metric.objects.update_or_create(
-                    client=client,
+                metrics.append(Metric(
+                    client_id=stats['id'],
                     name=name,
-                    period_start=now.replace(hour=0, minute=0, second=0, microsecond=0),
+                    period_start=period_start,
                     period_end=now,
-                    defaults={
-                        'metric_type': metric_type,
-                        'value': value,
-                        'unit': 'count' if metric_type == 'count' else 'score',
-                        'calculation_method': 'direct'
-                    }
-                )
+                    metric_type=metric_type,
+                    value=value,
+                    unit='count' if metric_type == 'count' else 'score',
+                    calculation_method='direct'
+                ))
+        
+        Metric.objects.bulk_create(metrics, batch_size=500)
         
         logger.info("Calculated metrics for all clients")
         return "Metrics calculated successfully"
@@ -242,7 +313,7 @@ def calculate_metrics():
         raise
 
 
-@shared_task
+@shared_task(queue='ml_training')
 def train_ml_models():
     """
     Train all ML models with recent data.
@@ -250,77 +321,34 @@ def train_ml_models():
     try:
         # Get training data
         recent_time = timezone.now() - timedelta(days=30)
+        min_count = 100  # Need minimum data for training
         
-        # Prepare risk scoring training data
-        alerts = Alert.objects.filter(
+        # Risk scoring and anomaly detection data, built in a single streamed pass
+        columns = tuple(dict.fromkeys(RISK_FEATURE_FIELDS + ANOMALY_FEATURE_FIELDS + ('risk_score',)))
+        alerts_df = _feature_frame(Alert.objects.filter(
             detected_at__gte=recent_time,
             risk_score__gt=0
-        ).select_related('client')
+        ).values_list(*columns).iterator(chunk_size=2000), columns)
         
-        if alerts.count() > 100:  # Need minimum data for training
-            alerts_data = []
-            risk_scores = []
-            
-            for alert in alerts:
-                alerts_data.append({
-                    'severity': alert.severity,
-                    'alert_type': alert.alert_type,
-                    'source_ip': alert.source_ip,
-                    'destination_ip': alert.destination_ip,
-                    'source_port': alert.source_port,
-                    'destination_port': alert.destination_port,
-                    'description': alert.description,
-                    'tags': alert.tags,
-                    'raw_data': alert.raw_data,
-                    'detected_at': alert.detected_at,
-                    'client_id': alert.client_id
-                })
-                risk_scores.append(alert.risk_score)
-            
+        if len(alerts_df) > min_count:
             # Train risk scoring model
-            risk_metrics = risk_scoring_model.train(alerts_data, risk_scores)
+            risk_metrics = get_risk_model().train(alerts_df[list(RISK_FEATURE_FIELDS)], alerts_df['risk_score'].to_numpy())
             logger.info(f"Risk scoring model trained: {risk_metrics}")
         
         # Prepare threat classification training data
-        indicators = ThreatIndicator.objects.filter(
+        indicators_df = _feature_frame(ThreatIndicator.objects.filter(
             first_seen__gte=recent_time,
             threat_type__isnull=False
-        ).select_related('source')
+        ).values_list(*INDICATOR_FEATURE_FIELDS).iterator(chunk_size=2000), INDICATOR_FEATURE_FIELDS)
         
-        if indicators.count() > 50:  # Need minimum data for training
-            indicators_data = []
-            threat_types = []
-            
-            for indicator in indicators:
-                indicators_data.append({
-                    'description': indicator.description,
-                    'threat_type': indicator.threat_type,
-                    'malware_family': indicator.malware_family,
-                    'actor': indicator.actor,
-                    'confidence': indicator.confidence,
-                    'severity_score': indicator.severity_score
-                })
-                threat_types.append(indicator.threat_type)
-            
+        if len(indicators_df) > 50:  # Need minimum data for training
             # Train threat classification model
-            threat_metrics = threat_classification_model.train(indicators_data, threat_types)
+            threat_metrics = get_threat_model().train(indicators_df, indicators_df['threat_type'].tolist())
             logger.info(f"Threat classification model trained: {threat_metrics}")
         
-        # Prepare anomaly detection training data
-        events_data = []
-        for alert in alerts:
-            events_data.append({
-                'client_id': alert.client_id,
-                'source_ip': alert.source_ip,
-                'destination_port': alert.destination_port,
-                'protocol': alert.protocol,
-                'raw_data': alert.raw_data,
-                'detected_at': alert.detected_at
-            })
-        
-        if len(events_data) > 100:  # Need minimum data for training
+        if len(alerts_df) > min_count:
             # Train anomaly detection model
-            anomaly_metrics = anomaly_detection_model.train(events_data)
+            anomaly_metrics = get_anomaly_model().train(alerts_df[list(ANOMALY_FEATURE_FIELDS)])
             logger.info(f"Anomaly detection model trained: {anomaly_metrics}")
         
         logger.info("All ML models training completed")
@@ -329,3 +357,22 @@ def train_ml_models():
     except Exception as e:
         logger.error(f"Error training ML models: {str(e)}")
         raise
+
+
+@shared_task
+def refresh_metric_rollup():
+    """
+    Refresh the metric_daily_rollup materialized view backing the dashboard KPIs.
+    """
+    if connection.vendor != 'postgresql':
+        # Development databases use a plain view, nothing to refresh
+        return
+    
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY metric_daily_rollup")
+        logger.info("Refreshed metric_daily_rollup")
+        
+    except Exception as e:
+        logger.error(f"Error refreshing metric rollup: {str(e)}")
+        raise
@@ -0,0 +1,146 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.accounts.models import Client, User
+from apps.alerts.models import Alert
+from .ml_models import RiskScoringModel
+from .models import Metric, RiskScore
+from .services import RiskScoringService, _load_malicious_ips, _score_cache
+
+
+class ScoreQuerysetTests(TestCase):
+    """score_queryset runs a constant number of queries, whatever the number of alerts"""
+
+    def setUp(self):
+        self.client_obj = Client.objects.create(
+            name='Acme Bank', contact_email='soc@acme.test', contact_phone='+33123456789'
+        )
+        self.service = RiskScoringService()
+        _score_cache.invalidate()
+        _load_malicious_ips.cache_clear()
+
+    def _create_alerts(self, count):
+        now = timezone.now()
+        for i in range(count):
+            Alert.objects.create(
+                client=self.client_obj,
+                alert_id=f'SQ-{i}',
+                title='Suspicious login',
+                description='suspicious activity',
+                alert_type='intrusion',
+                severity='high',
+                source_ip=f'10.0.0.{i}',
+                destination_ip='192.168.1.1',
+                destination_port=3389,
+                detected_at=now - timedelta(minutes=i),
+            )
+
+    def _clear_caches(self):
+        # Scores computed by the post_save handler are not what is measured here
+        _score_cache.invalidate()
+        _load_malicious_ips.cache_clear()
+
+    def test_query_count_does_not_grow_with_alerts(self):
+        self._create_alerts(30)
+
+        for count in (3, 30):
+            with self.subTest(alerts=count):
+                self._clear_caches()
+                queryset = Alert.objects.filter(alert_id__in=[f'SQ-{i}' for i in range(count)])
+                # Alerts fetch, same-source counts, per-client counts, threat intel IPs
+                with self.assertNumQueries(4):
+                    results = self.service.score_queryset(queryset)
+                self.assertEqual(len(results), count)
+
+    def test_persist_query_count_does_not_grow_with_alerts(self):
+        self._create_alerts(30)
+
+        for count in (3, 30):
+            with self.subTest(alerts=count):
+                self._clear_caches()
+                queryset = Alert.objects.filter(alert_id__in=[f'SQ-{i}' for i in range(count)])
+                # Plus one bulk_update and one bulk_create, inside a savepoint
+                with self.assertNumQueries(8):
+                    results = self.service.score_queryset(queryset, persist=True)
+                self.assertEqual(len(results), count)
+
+
+class ModelLoadingTests(TestCase):
+    """A missing model file is looked up once, not on every prediction"""
+
+    def test_missing_model_is_loaded_once(self):
+        model = RiskScoringModel()
+        model.model_path = '/nonexistent/risk_scoring_model.pkl'
+
+        with mock.patch('apps.analytics.ml_models.joblib.load') as load, \
+                mock.patch.object(model, 'load_model', wraps=model.load_model) as load_model:
+            self.assertEqual(model.predict([{}]), [5.0])
+            self.assertEqual(model.predict([{}, {}]), [5.0, 5.0])
+
+        self.assertEqual(load_model.call_count, 1)
+        load.assert_not_called()
+
+
+class MetricRollupListViewTests(TestCase):
+    """Tests for the daily metric rollup endpoint"""
+
+    def setUp(self):
+        self.client_obj = Client.objects.create(
+            name='Acme Bank', contact_email='soc@acme.test', contact_phone='+33123456789'
+        )
+        now = timezone.now()
+        for value in (2.0, 4.0):
+            Metric.objects.create(
+                client=self.client_obj, name='alert_count', metric_type='count', value=value,
+                period_start=now - timedelta(hours=1), period_end=now
+            )
+        self.api = APIClient()
+        self.api.force_authenticate(User.objects.create_user(
+            username='analyst', email='analyst@exeo.test', password='x', role='soc_analyst'
+        ))
+
+    def test_rollup_rows_carry_the_client(self):
+        response = self.api.get('/api/analytics/metrics/daily-rollup/', {'days': 7})
+
+        self.assertEqual(response.status_code, 200)
+        rows = response.json()['results']
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['client'], self.client_obj.id)
+        self.assertEqual(rows[0]['sum_v'], 6.0)
+
+    def test_invalid_days_is_rejected(self):
+        response = self.api.get('/api/analytics/metrics/daily-rollup/', {'days': 'abc'})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class RiskScoreListViewTests(TestCase):
+    """The msgspec risk score rows match RiskScoreSerializer"""
+
+    def setUp(self):
+        client = Client.objects.create(
+            name='Acme Bank', contact_email='soc@acme.test', contact_phone='+33123456789'
+        )
+        self.analyst = User.objects.create_user(
+            username='analyst', email='analyst@exeo.test', password='x', role='soc_analyst',
+            first_name='Ada', last_name='Lovelace'
+        )
+        for entity_id, calculated_by in (('1', self.analyst), ('2', None)):
+            RiskScore.objects.create(
+                client=client, score_type='alert', entity_id=entity_id, entity_type='alert',
+                score=7.5, confidence=0.9, calculated_by=calculated_by
+            )
+        self.api = APIClient()
+        self.api.force_authenticate(self.analyst)
+
+    def test_calculated_by_name_is_omitted_without_user(self):
+        response = self.api.get('/api/analytics/risk-scores/')
+
+        rows = {row['entity_id']: row for row in response.json()['results']}
+        self.assertEqual(rows['1']['calculated_by_name'], 'Ada Lovelace')
+        self.assertIsNone(rows['2']['calculated_by'])
+        self.assertNotIn('calculated_by_name', rows['2'])
@@ -12,7 +12,9 @@ urlpatterns = [
     # Risk scoring endpoints
     path('risk-scores/', views.RiskScoreListView.as_view(), name='risk-score-list'),
     path('metrics/', views.MetricListView.as_view(), name='metric-list'),
+    path('metrics/daily-rollup/', views.MetricRollupListView.as_view(), name='metric-daily-rollup'),
     path('dashboard-widgets/', views.DashboardWidgetListView.as_view(), name='dashboard-widget-list'),
+    path('events/', views.track_event, name='track-event'),
     
     # Risk scoring actions
     path('calculate-risk-scores/', views.calculate_risk_scores, name='calculate-risk-scores'),
@@ -21,6 +23,7 @@ urlpatterns = [
     
     # ML model management
     path('train-ml-models/', views.train_ml_models, name='train-ml-models'),
+    path('train-ml-models/<str:task_id>/', views.train_ml_models_status, name='train-ml-models-status'),
     
     # Threat intelligence
     path('threat-intelligence/<int:alert_id>/', views.threat_intelligence_enrichment, name='threat-intelligence-enrichment'),
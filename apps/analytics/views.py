@@ -3,52 +3,123 @@ API views for analytics and risk scoring.
 """
 from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.utils import timezone
 from datetime import timedelta
-from django.db.models import Count, Avg, Max, Min
-from django.db import models
+from collections import Counter
+from django.db.models import Count, Avg, Max, Min, Q
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, models
 
-from .models import RiskScore, Metric, DashboardWidget
-from .services import RiskScoringService, ThreatIntelligenceService
-from .serializers import RiskScoreSerializer, MetricSerializer, DashboardWidgetSerializer
+from .models import RiskScore, Metric, DashboardWidget, MetricDailyRollup
+from .services import RiskScoringService, ThreatIntelligenceService, risk_stats_cache_key
+from .serializers import (
+    RiskScoreSerializer, MetricSerializer, DashboardWidgetSerializer,
+    MetricDailyRollupSerializer, AnalyticsEventSerializer, RiskScoreOut, MetricOut
+)
+from . import ingest
+from .renderers import MsgspecJSONRenderer
 from apps.alerts.models import Alert
 from apps.accounts.permissions import CanAccessClientData
 
 
-class RiskScoreListView(generics.ListAPIView):
+def _user_client_id(user):
+    """Client a client-role user is restricted to, None for everyone else."""
+    if user.role == 'client' and user.client_id:
+        return user.client_id
+    return None
+
+
+def _scope_to_client(queryset, user):
+    """Restrict a client-owned queryset to the user's client, if any."""
+    client_id = _user_client_id(user)
+    if client_id is not None:
+        queryset = queryset.filter(client_id=client_id)
+    return queryset
+
+
+class StructListMixin:
+    """
+    Serve list responses as msgspec structs built from a .values() queryset.
+    
+    Subclasses set `struct_class` (exposing VALUES and from_row); the
+    ModelSerializer stays in place for schema/ordering purposes.
+    """
+    
+    struct_class = None
+    renderer_classes = [MsgspecJSONRenderer]
+    
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = queryset.values(*self.struct_class.VALUES)
+        from_row = self.struct_class.from_row
+        
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response([from_row(row) for row in page])
+        
+        return Response([from_row(row) for row in rows])
+
+
+class RiskScoreListView(StructListMixin, generics.ListAPIView):
     """List risk scores for the authenticated user's client."""
     
     serializer_class = RiskScoreSerializer
+    struct_class = RiskScoreOut
     permission_classes = [IsAuthenticated, CanAccessClientData]
     
     def get_queryset(self):
         queryset = RiskScore.objects.all()
         
         # Filter by client if user is a client
-        if self.request.user.role == 'client' and self.request.user.client:
-            queryset = queryset.filter(client=self.request.user.client)
+        queryset = _scope_to_client(queryset, self.request.user)
         
         return queryset.order_by('-calculated_at')
 
 
-class MetricListView(generics.ListAPIView):
+class MetricListView(StructListMixin, generics.ListAPIView):
     """List metrics for the authenticated user's client."""
     
     serializer_class = MetricSerializer
+    struct_class = MetricOut
     permission_classes = [IsAuthenticated, CanAccessClientData]
     
     def get_queryset(self):
         queryset = Metric.objects.all()
         
         # Filter by client if user is a client
-        if self.request.user.role == 'client' and self.request.user.client:
-            queryset = queryset.filter(client=self.request.user.client)
+        queryset = _scope_to_client(queryset, self.request.user)
         
         return queryset.order_by('-calculated_at')
 
 
+class MetricRollupListView(generics.ListAPIView):
+    """Daily metric rollups for dashboard KPI panels."""
+    
+    serializer_class = MetricDailyRollupSerializer
+    permission_classes = [IsAuthenticated, CanAccessClientData]
+    
+    def get_queryset(self):
+        try:
+            days = int(self.request.query_params.get('days', 30))
+        except ValueError:
+            raise ValidationError({'days': 'Must be an integer'})
+        
+        queryset = MetricDailyRollup.objects.filter(day__gte=timezone.now() - timedelta(days=days))
+        
+        # Filter by client if user is a client
+        queryset = _scope_to_client(queryset, self.request.user)
+        
+        name = self.request.query_params.get('name')
+        if name:
+            queryset = queryset.filter(name=name)
+        
+        return queryset.order_by('-day', 'name')
+
+
 class DashboardWidgetListView(generics.ListAPIView):
     """List dashboard widgets for the authenticated user's client."""
     
@@ -59,12 +130,31 @@ class DashboardWidgetListView(generics.ListAPIView):
         queryset = DashboardWidget.objects.filter(is_visible=True)
         
         # Filter by client if user is a client
-        if self.request.user.role == 'client' and self.request.user.client:
-            queryset = queryset.filter(client=self.request.user.client)
+        queryset = _scope_to_client(queryset, self.request.user)
         
         return queryset.order_by('position_y', 'position_x')
 
 
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def track_event(request):
+    """
+    Record a user interaction event. Events are buffered and written in batches.
+    """
+    data = request.data.copy()
+    data['user'] = request.user.id
+    client_id = _user_client_id(request.user)
+    if client_id is not None:
+        data['client'] = client_id
+    
+    serializer = AnalyticsEventSerializer(data=data)
+    if not serializer.is_valid():
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+    
+    ingest.emit(**serializer.validated_data)
+    return Response({'queued': True}, status=status.HTTP_202_ACCEPTED)
+
+
 @api_view(['POST'])
 @permission_classes([IsAuthenticated, CanAccessClientData])
 def calculate_risk_scores(request):
@@ -78,49 +168,25 @@ def calculate_risk_scores(request):
         alerts = Alert.objects.filter(risk_score=0.0)
         
         # Filter by client if user is a client
-        if request.user.role == 'client' and request.user.client:
-            alerts = alerts.filter(client=request.user.client)
+        alerts = _scope_to_client(alerts, request.user)
         
-        # Limit to 100 alerts per request
-        alerts = alerts[:100]
+        errors = []
         
-        if not alerts:
+        # Limit to 100 alerts per request
+        try:
+            processed_count = len(scoring_service.score_queryset(
+                alerts[:100], persist=True, calculated_by=request.user
+            ))
+        except Exception as e:
+            errors.append(str(e))
+            processed_count = 0
+        
+        if not processed_count and not errors:
             return Response({
                 'message': 'No alerts found for risk score calculation',
                 'processed': 0
             })
         
-        processed_count = 0
-        errors = []
-        
-        for alert in alerts:
-            try:
-                score, factors = scoring_service.calculate_alert_risk_score(alert)
-                
-                # Update alert
-                alert.risk_score = score
-                alert.risk_factors = factors
-                alert.save(update_fields=['risk_score', 'risk_factors'])
-                
-                # Create risk score record
-                RiskScore.objects.create(
-                    client=alert.client,
-                    score_type='alert',
-                    entity_id=str(alert.id),
-                    entity_type='Alert',
-                    score=score,
-                    confidence=factors.get('confidence', 0.8),
-                    factors=factors,
-                    methodology=factors.get('methodology', 'professional_hybrid_v1'),
-                    calculated_by=request.user
-                )
-                
-                processed_count += 1
-                
-            except Exception as e:
-                errors.append(f"Alert {alert.id}: {str(e)}")
-                continue
-        
         return Response({
             'message': f'Risk scores calculated for {processed_count} alerts',
             'processed': processed_count,
@@ -133,6 +199,32 @@ def calculate_risk_scores(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _top_risk_factors(queryset, limit=10):
+    """
+    Most frequent risk_factors components among the alerts of queryset,
+    as (component, count) pairs.
+    """
+    if connection.vendor == 'postgresql':
+        # Count the components server side instead of shipping the JSON documents
+        sql, params = queryset.order_by().values('risk_factors').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT component, COUNT(*) AS occurrences "
+                f"FROM ({sql}) AS high_risk, "
+                f"jsonb_object_keys(high_risk.risk_factors -> 'components') AS component "
+                f"WHERE jsonb_typeof(high_risk.risk_factors -> 'components') = 'object' "
+                f"GROUP BY component ORDER BY occurrences DESC, component LIMIT %s",
+                [*params, limit]
+            )
+            return [tuple(row) for row in cursor.fetchall()]
+    
+    risk_factors = Counter()
+    for factors in queryset.values_list('risk_factors', flat=True).iterator():
+        if factors and isinstance(factors.get('components'), dict):
+            risk_factors.update(factors['components'].keys())
+    return risk_factors.most_common(limit)
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated, CanAccessClientData])
 def risk_score_statistics(request):
@@ -140,12 +232,15 @@ def risk_score_statistics(request):
     Get risk score statistics for dashboard.
     """
     try:
-        # Base queryset
-        queryset = Alert.objects.all()
+        # Base queryset, filtered by client if user is a client
+        client_id = _user_client_id(request.user)
+        queryset = _scope_to_client(Alert.objects.all(), request.user)
         
-        # Filter by client if user is a client
-        if request.user.role == 'client' and request.user.client:
-            queryset = queryset.filter(client=request.user.client)
+        # Dashboards poll this endpoint, serve recent results from the cache
+        cache_key = risk_stats_cache_key('riskstats', client_id)
+        statistics = cache.get(cache_key)
+        if statistics is not None:
+            return Response(statistics)
         
         # Time filters
         now = timezone.now()
@@ -153,49 +248,35 @@ def risk_score_statistics(request):
         last_7d = now - timedelta(days=7)
         last_30d = now - timedelta(days=30)
         
-        # Risk score statistics
+        # Overall, risk level and time-based statistics in a single scan
+        in_24h = Q(detected_at__gte=last_24h)
+        in_7d = Q(detected_at__gte=last_7d)
         risk_stats = queryset.aggregate(
             avg_risk_score=Avg('risk_score'),
             max_risk_score=Max('risk_score'),
             min_risk_score=Min('risk_score'),
-            total_alerts=Count('id')
+            total_alerts=Count('id'),
+            critical=Count('id', filter=Q(risk_score__gte=8.0)),
+            high=Count('id', filter=Q(risk_score__gte=6.0, risk_score__lt=8.0)),
+            medium=Count('id', filter=Q(risk_score__gte=4.0, risk_score__lt=6.0)),
+            low=Count('id', filter=Q(risk_score__gte=2.0, risk_score__lt=4.0)),
+            minimal=Count('id', filter=Q(risk_score__lt=2.0)),
+            avg_score_24h=Avg('risk_score', filter=in_24h),
+            max_score_24h=Max('risk_score', filter=in_24h),
+            count_24h=Count('id', filter=in_24h),
+            avg_score_7d=Avg('risk_score', filter=in_7d),
+            max_score_7d=Max('risk_score', filter=in_7d),
+            count_7d=Count('id', filter=in_7d)
         )
         
         # Risk level distribution
         risk_levels = {
-            'critical': queryset.filter(risk_score__gte=8.0).count(),
-            'high': queryset.filter(risk_score__gte=6.0, risk_score__lt=8.0).count(),
-            'medium': queryset.filter(risk_score__gte=4.0, risk_score__lt=6.0).count(),
-            'low': queryset.filter(risk_score__gte=2.0, risk_score__lt=4.0).count(),
-            'minimal': queryset.filter(risk_score__lt=2.0).count()
+            level: risk_stats[level]
+            for level in ('critical', 'high', 'medium', 'low', 'minimal')
         }
         
-        # Time-based risk statistics
-        risk_24h = queryset.filter(detected_at__gte=last_24h).aggregate(
-            avg_score=Avg('risk_score'),
-            max_score=Max('risk_score'),
-            count=Count('id')
-        )
-        
-        risk_7d = queryset.filter(detected_at__gte=last_7d).aggregate(
-            avg_score=Avg('risk_score'),
-            max_score=Max('risk_score'),
-            count=Count('id')
-        )
-        
         # Top risk factors
-        high_risk_alerts = queryset.filter(risk_score__gte=7.0)
-        risk_factors = {}
-        
-        for alert in high_risk_alerts[:50]:  # Sample for performance
-            if alert.risk_factors and 'components' in alert.risk_factors:
-                for component, data in alert.risk_factors['components'].items():
-                    if component not in risk_factors:
-                        risk_factors[component] = 0
-                    risk_factors[component] += 1
-        
-        # Sort risk factors by frequency
-        top_risk_factors = sorted(risk_factors.items(), key=lambda x: x[1], reverse=True)[:10]
+        top_risk_factors = _top_risk_factors(queryset.filter(risk_score__gte=7.0))
         
         statistics = {
             'overall': {
@@ -207,19 +288,20 @@ def risk_score_statistics(request):
             'risk_levels': risk_levels,
             'time_based': {
                 'last_24h': {
-                    'avg_score': round(risk_24h['avg_score'] or 0, 2),
-                    'max_score': round(risk_24h['max_score'] or 0, 2),
-                    'count': risk_24h['count']
+                    'avg_score': round(risk_stats['avg_score_24h'] or 0, 2),
+                    'max_score': round(risk_stats['max_score_24h'] or 0, 2),
+                    'count': risk_stats['count_24h']
                 },
                 'last_7d': {
-                    'avg_score': round(risk_7d['avg_score'] or 0, 2),
-                    'max_score': round(risk_7d['max_score'] or 0, 2),
-                    'count': risk_7d['count']
+                    'avg_score': round(risk_stats['avg_score_7d'] or 0, 2),
+                    'max_score': round(risk_stats['max_score_7d'] or 0, 2),
+                    'count': risk_stats['count_7d']
                 }
             },
             'top_risk_factors': top_risk_factors
         }
         
+        cache.set(cache_key, statistics, settings.RISK_STATS_CACHE_TTL)
         return Response(statistics)
         
     except Exception as e:
@@ -235,29 +317,46 @@ def risk_score_distribution(request):
     Get risk score distribution for charts.
     """
     try:
-        # Base queryset
-        queryset = Alert.objects.all()
+        # Base queryset, filtered by client if user is a client
+        client_id = _user_client_id(request.user)
+        queryset = _scope_to_client(Alert.objects.all(), request.user)
+        
+        # Dashboards poll this endpoint, serve recent results from the cache
+        cache_key = risk_stats_cache_key('riskdist', client_id)
+        distribution_data = cache.get(cache_key)
+        if distribution_data is not None:
+            return Response(distribution_data)
+        
+        # Score ranges and severity distribution in a single scan
+        score_ranges = {
+            '0-2': Q(risk_score__gte=0, risk_score__lt=2),
+            '2-4': Q(risk_score__gte=2, risk_score__lt=4),
+            '4-6': Q(risk_score__gte=4, risk_score__lt=6),
+            '6-8': Q(risk_score__gte=6, risk_score__lt=8),
+            '8-10': Q(risk_score__gte=8, risk_score__lte=10)
+        }
+        severities = ['low', 'medium', 'high', 'critical']
         
-        # Filter by client if user is a client
-        if request.user.role == 'client' and request.user.client:
-            queryset = queryset.filter(client=request.user.client)
+        aggregates = {
+            f'range_{i}': Count('id', filter=condition)
+            for i, condition in enumerate(score_ranges.values())
+        }
+        for severity in severities:
+            aggregates[f'{severity}_avg_score'] = Avg('risk_score', filter=Q(severity=severity))
+            aggregates[f'{severity}_count'] = Count('id', filter=Q(severity=severity))
+        stats = queryset.aggregate(**aggregates)
         
         # Get distribution by score ranges
-        distribution = {
-            '0-2': queryset.filter(risk_score__gte=0, risk_score__lt=2).count(),
-            '2-4': queryset.filter(risk_score__gte=2, risk_score__lt=4).count(),
-            '4-6': queryset.filter(risk_score__gte=4, risk_score__lt=6).count(),
-            '6-8': queryset.filter(risk_score__gte=6, risk_score__lt=8).count(),
-            '8-10': queryset.filter(risk_score__gte=8, risk_score__lte=10).count()
-        }
+        distribution = {label: stats[f'range_{i}'] for i, label in enumerate(score_ranges)}
         
         # Get distribution by severity
-        severity_distribution = {}
-        for severity in ['low', 'medium', 'high', 'critical']:
-            severity_distribution[severity] = queryset.filter(severity=severity).aggregate(
-                avg_score=Avg('risk_score'),
-                count=Count('id')
-            )
+        severity_distribution = {
+            severity: {
+                'avg_score': stats[f'{severity}_avg_score'],
+                'count': stats[f'{severity}_count']
+            }
+            for severity in severities
+        }
         
         # Get distribution by alert type
         type_distribution = {}
@@ -272,11 +371,14 @@ def risk_score_distribution(request):
                 'avg_score': round(alert_type['avg_score'] or 0, 2)
             }
         
-        return Response({
+        distribution_data = {
             'score_ranges': distribution,
             'severity_distribution': severity_distribution,
             'type_distribution': type_distribution
-        })
+        }
+        
+        cache.set(cache_key, distribution_data, settings.RISK_STATS_CACHE_TTL)
+        return Response(distribution_data)
         
     except Exception as e:
         return Response({
@@ -293,13 +395,41 @@ def train_ml_models(request):
     try:
         from .tasks import train_ml_models as train_task
         
-        # Trigger training (synchronous for now)
-        result = train_task()
+        # Training runs on the ml_training Celery queue, poll train_ml_models_status for the outcome
+        async_result = train_task.delay()
         
         return Response({
-            'message': 'ML models training completed',
-            'result': result
-        })
+            'message': 'ML models training queued',
+            'task_id': async_result.id,
+            'status': 'queued'
+        }, status=status.HTTP_202_ACCEPTED)
+        
+    except Exception as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated, CanAccessClientData])
+def train_ml_models_status(request, task_id):
+    """
+    Get the state of a queued ML models training task.
+    """
+    try:
+        from celery.result import AsyncResult
+        
+        async_result = AsyncResult(task_id)
+        data = {
+            'task_id': task_id,
+            'status': async_result.state
+        }
+        if async_result.successful():
+            data['result'] = async_result.result
+        elif async_result.failed():
+            data['error'] = str(async_result.result)
+        
+        return Response(data)
         
     except Exception as e:
         return Response({
@@ -318,7 +448,7 @@ def threat_intelligence_enrichment(request, alert_id):
         alert = Alert.objects.get(id=alert_id)
         
         # Check permissions
-        if request.user.role == 'client' and request.user.client != alert.client:
+        if request.user.role == 'client' and request.user.client_id != alert.client_id:
             return Response({
                 'error': 'Access denied'
             }, status=status.HTTP_403_FORBIDDEN)
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-16 15:02
+
+from django.db import migrations
+
+
+GIN_INDEXES = [
+    ('incidents_incident_tags_gin', 'incidents_incident', 'tags'),
+    ('incidents_incident_affected_systems_gin', 'incidents_incident', 'affected_systems'),
+    ('incidents_incident_custom_fields_gin', 'incidents_incident', 'custom_fields'),
+    ('incidents_timeline_metadata_gin', 'incidents_incidenttimeline', 'metadata'),
+    ('incidents_escalation_priority_levels_gin', 'incidents_escalationrule', 'priority_levels'),
+    ('incidents_escalation_categories_gin', 'incidents_escalationrule', 'categories'),
+]
+
+
+def create_gin_indexes(apps, schema_editor):
+    # GIN over jsonb is PostgreSQL-only; other backends have no containment lookups to index
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in GIN_INDEXES:
+        schema_editor.execute(f"CREATE INDEX {name} ON {table} USING GIN ({column})")
+
+
+def drop_gin_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in GIN_INDEXES:
+        schema_editor.execute(f"DROP INDEX IF EXISTS {name}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_gin_indexes, drop_gin_indexes),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-16 15:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('incidents', '0002_jsonb_gin_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(condition=models.Q(('status__in', ['new', 'assigned', 'in_progress'])), fields=['client', '-reported_at'], name='incidents_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='incident',
+            index=models.Index(condition=models.Q(('priority', 'critical')), fields=['client', '-reported_at'], name='incidents_critical_idx'),
+        ),
+    ]
@@ -1,7 +1,10 @@
 """
 Models for the incidents application.
 """
+from django.core.cache import cache
 from django.db import models
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.core.validators import MinValueValidator, MaxValueValidator
 from apps.accounts.models import Client, User
 from apps.alerts.models import Alert
@@ -37,6 +40,22 @@ class Incident(models.Model):
         ('other', 'Autre'),
     ]
     
+    PRIORITY_COLORS = {
+        'low': '#28a745',
+        'medium': '#ffc107',
+        'high': '#fd7e14',
+        'critical': '#dc3545',
+    }
+    
+    STATUS_COLORS = {
+        'new': '#dc3545',
+        'assigned': '#ffc107',
+        'in_progress': '#17a2b8',
+        'on_hold': '#6c757d',
+        'resolved': '#28a745',
+        'closed': '#6c757d',
+    }
+    
     client = models.ForeignKey(Client, on_delete=models.CASCADE, related_name='incidents')
     incident_id = models.CharField(max_length=50, unique=True)
     title = models.CharField(max_length=200)
@@ -99,6 +118,18 @@ class Incident(models.Model):
             models.Index(fields=['client', 'category']),
             models.Index(fields=['reported_at']),
             models.Index(fields=['impact_score']),
+            # Open and critical incident counters of the dashboard
+            models.Index(
+                fields=['client', '-reported_at'],
+                name='incidents_open_idx',
+                condition=models.Q(status__in=['new', 'assigned', 'in_progress'])
+            ),
+            models.Index(
+                fields=['client', '-reported_at'],
+                name='incidents_critical_idx',
+                condition=models.Q(priority='critical')
+            ),
+            # tags, affected_systems and custom_fields have GIN indexes on PostgreSQL (migration 0002)
         ]
     
     def __str__(self):
@@ -106,25 +137,11 @@ class Incident(models.Model):
     
     def get_priority_color(self):
         """Return color code for priority level."""
-        colors = {
-            'low': '#28a745',
-            'medium': '#ffc107',
-            'high': '#fd7e14',
-            'critical': '#dc3545',
-        }
-        return colors.get(self.priority, '#6c757d')
+        return self.PRIORITY_COLORS.get(self.priority, '#6c757d')
     
     def get_status_color(self):
         """Return color code for status."""
-        colors = {
-            'new': '#dc3545',
-            'assigned': '#ffc107',
-            'in_progress': '#17a2b8',
-            'on_hold': '#6c757d',
-            'resolved': '#28a745',
-            'closed': '#6c757d',
-        }
-        return colors.get(self.status, '#6c757d')
+        return self.STATUS_COLORS.get(self.status, '#6c757d')
 
 
 class IncidentComment(models.Model):
@@ -236,3 +253,35 @@ class EscalationRule(models.Model):
     
     def __str__(self):
         return f"{self.name} - {self.client.name}"
+
+
+def _incident_stats_generation_key(client_id):
+    return f"incstats:v1:gen:{client_id or 'all'}"
+
+
+def incident_stats_cache_key(client_id, days):
+    """
+    Cache key of the incident dashboard statistics of a client, or of all
+    clients (client_id None), over the last days.
+    
+    Bumping the generation counter retires every window of the client at once.
+    """
+    generation = cache.get_or_set(_incident_stats_generation_key(client_id), 0, None)
+    return f"incstats:v1:{client_id or 'all'}:{days}:{generation}"
+
+
+def invalidate_incident_stats_cache(client_id):
+    """Retire the cached dashboard statistics of a client and the all-clients ones."""
+    for key in (_incident_stats_generation_key(client_id), _incident_stats_generation_key(None)):
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Never cached (or evicted): nothing to retire
+            pass
+
+
+@receiver(post_save, sender=Incident)
+@receiver(post_delete, sender=Incident)
+def incident_changed_handler(sender, instance, **kwargs):
+    """Retire cached dashboard statistics covering this incident."""
+    invalidate_incident_stats_cache(instance.client_id)
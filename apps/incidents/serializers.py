@@ -1,6 +1,8 @@
 """
 Serializers for the incidents application.
 """
+import uuid
+
 from rest_framework import serializers
 from .models import (
     Incident, 
@@ -24,10 +26,10 @@ class IncidentSerializer(serializers.ModelSerializer):
     priority_color = serializers.CharField(source='get_priority_color', read_only=True)
     status_color = serializers.CharField(source='get_status_color', read_only=True)
     
-    # Related objects
-    comments_count = serializers.SerializerMethodField()
-    attachments_count = serializers.SerializerMethodField()
-    timeline_events_count = serializers.SerializerMethodField()
+    # Related objects, annotated by IncidentViewSet.get_queryset
+    comments_count = serializers.IntegerField(read_only=True)
+    attachments_count = serializers.IntegerField(read_only=True)
+    timeline_events_count = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Incident
@@ -43,24 +45,19 @@ class IncidentSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['incident_id', 'reported_at', 'updated_at']
     
-    def get_comments_count(self, obj):
-        return obj.comments.count()
-    
-    def get_attachments_count(self, obj):
-        return obj.attachments.count()
-    
-    def get_timeline_events_count(self, obj):
-        return obj.timeline.count()
-    
     def create(self, validated_data):
         """Generate incident ID and set default values"""
-        # Generate incident ID
+        # Generate incident ID, the random suffix keeps concurrent creates
+        # within the same second from colliding on the unique column
         from datetime import datetime
         timestamp = datetime.now().strftime('%Y%m%d%H%M%S')
         client_id = validated_data['client'].id
-        validated_data['incident_id'] = f"INC-{client_id}-{timestamp}"
+        validated_data['incident_id'] = f"INC-{client_id}-{timestamp}-{uuid.uuid4().hex[:6].upper()}"
         
-        return super().create(validated_data)
+        incident = super().create(validated_data)
+        # A new incident has no related objects yet
+        incident.comments_count = incident.attachments_count = incident.timeline_events_count = 0
+        return incident
 
 
 class IncidentCommentSerializer(serializers.ModelSerializer):
@@ -157,7 +154,7 @@ class IncidentSummarySerializer(serializers.ModelSerializer):
     class Meta:
         model = Incident
         fields = [
-            'id', 'incident_id', 'title', 'category', 'priority', 'status',
+            'id', 'incident_id', 'title', 'description', 'category', 'priority', 'status',
             'client_name', 'assigned_to_name', 'impact_score', 'affected_users',
             'detected_at', 'reported_at', 'resolved_at',
             'priority_display', 'status_display', 'category_display',
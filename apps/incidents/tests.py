@@ -0,0 +1,112 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.accounts.models import Client, User
+from .models import Incident, IncidentTimeline
+from .views import _trend_data
+
+
+class IncidentTestMixin:
+    """Two clients, a SOC analyst and a client user"""
+
+    def setUp(self):
+        cache.clear()
+        self.acme = Client.objects.create(
+            name='Acme', contact_email='soc@acme.test', contact_phone='+33123456789'
+        )
+        self.globex = Client.objects.create(
+            name='Globex', contact_email='soc@globex.test', contact_phone='+33123456780'
+        )
+        self.analyst = User.objects.create_user(
+            username='analyst', email='analyst@exeo.test', password='x', role='soc_analyst'
+        )
+        self.acme_user = User.objects.create_user(
+            username='acme', email='user@acme.test', password='x', role='client', client=self.acme
+        )
+        self.api = APIClient()
+
+    def _incident(self, client, incident_id, status='new', reported_at=None):
+        incident = Incident.objects.create(
+            client=client,
+            incident_id=incident_id,
+            title='Brute force',
+            description='Multiple failed logins',
+            category='malware',
+            priority='high',
+            status=status,
+            detected_at=timezone.now(),
+        )
+        if reported_at is not None:
+            Incident.objects.filter(pk=incident.pk).update(reported_at=reported_at)
+        return incident
+
+    def _bulk_change_status(self, user, incident_ids, new_status):
+        self.api.force_authenticate(user)
+        return self.api.post(
+            '/api/incidents/incidents/bulk_change_status/',
+            {'incident_ids': incident_ids, 'status': new_status},
+            format='json'
+        )
+
+
+class BulkChangeStatusTests(IncidentTestMixin, TestCase):
+    """Tests for IncidentViewSet.bulk_change_status"""
+
+    def test_client_cannot_change_other_client_incidents(self):
+        own = self._incident(self.acme, 'INC-1')
+        other = self._incident(self.globex, 'INC-2')
+
+        response = self._bulk_change_status(self.acme_user, [own.id, other.id], 'resolved')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['incident_ids'], [own.id])
+        other.refresh_from_db()
+        self.assertEqual(other.status, 'new')
+        self.assertFalse(IncidentTimeline.objects.filter(incident=other).exists())
+
+    def test_one_timeline_event_per_changed_incident(self):
+        changed = [self._incident(self.acme, f'INC-{i}') for i in range(3)]
+        unchanged = self._incident(self.acme, 'INC-9', status='resolved')
+
+        response = self._bulk_change_status(
+            self.analyst, [incident.id for incident in changed] + [unchanged.id], 'resolved'
+        )
+
+        self.assertEqual(response.json()['updated'], 3)
+        events = IncidentTimeline.objects.filter(event_type='status_changed')
+        self.assertEqual(
+            sorted(events.values_list('incident_id', flat=True)),
+            sorted(incident.id for incident in changed)
+        )
+        self.assertEqual(events.first().metadata, {'old_status': 'new', 'new_status': 'resolved'})
+
+    def test_dashboard_stats_reflect_bulk_change(self):
+        incident = self._incident(self.acme, 'INC-1')
+        self.api.force_authenticate(self.acme_user)
+        stats = self.api.get('/api/incidents/incidents/dashboard_stats/').json()
+        self.assertEqual(stats['resolved_incidents'], 0)
+
+        self._bulk_change_status(self.acme_user, [incident.id], 'resolved')
+
+        stats = self.api.get('/api/incidents/incidents/dashboard_stats/').json()
+        self.assertEqual(stats['resolved_incidents'], 1)
+
+
+class TrendDataTests(IncidentTestMixin, TestCase):
+    """Tests for the daily incident trend of the dashboard"""
+
+    def test_trend_is_zero_filled_over_the_window(self):
+        now = timezone.now()
+        self._incident(self.acme, 'INC-1', reported_at=now - timedelta(days=3))
+        self._incident(self.acme, 'INC-2', reported_at=now)
+
+        trend = _trend_data(Incident.objects.all(), now - timedelta(days=7))
+
+        self.assertEqual(len(trend), 8)
+        self.assertEqual(sum(day['count'] for day in trend), 2)
+        self.assertEqual(trend[-1]['count'], 1)
+        self.assertEqual(trend[-4]['count'], 1)
@@ -1,20 +1,148 @@
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.shortcuts import render
-from django.db.models import Q, Count, Avg
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q, Count, Avg, DurationField, ExpressionWrapper, F
+from django.db.models.functions import TruncDay
 from django.utils import timezone
-from datetime import timedelta
-from .models import Incident, IncidentComment, IncidentAttachment, IncidentTimeline
+from datetime import datetime, time, timedelta
+from .models import (
+    Incident,
+    IncidentComment,
+    IncidentAttachment,
+    IncidentTimeline,
+    incident_stats_cache_key,
+    invalidate_incident_stats_cache
+)
 from .serializers import (
     IncidentSerializer, 
+    IncidentSummarySerializer,
     IncidentCommentSerializer, 
     IncidentAttachmentSerializer,
     IncidentTimelineSerializer
 )
 from apps.accounts.permissions import IsClientOwner, IsAdminOrAnalyst
 
+# Roles that see the incidents of every client
+ALL_CLIENTS_ROLES = {'admin', 'soc_analyst'}
+
+# Columns read by IncidentSummarySerializer on the incident list
+INCIDENT_SUMMARY_FIELDS = (
+    'id', 'incident_id', 'title', 'description', 'category', 'priority', 'status',
+    'client', 'client__name', 'assigned_to', 'assigned_to__email', 'impact_score',
+    'affected_users', 'detected_at', 'reported_at', 'resolved_at',
+)
+
+
+def _scope_incidents(user):
+    """Incidents visible to the user, based on role and client"""
+    if user.role in ALL_CLIENTS_ROLES:
+        return Incident.objects.all()
+    elif user.role == 'client':
+        # client_id, so the Client row is not loaded
+        return Incident.objects.filter(client_id=user.client_id)
+    return Incident.objects.none()
+
+
+def cached_incident_dashboard_stats(user, days):
+    """
+    incident_dashboard_stats over the incidents visible to user, cached for
+    INCIDENT_STATS_CACHE_TTL seconds per client and window.
+    """
+    if user.role in ALL_CLIENTS_ROLES:
+        key = incident_stats_cache_key(None, days)
+    elif user.role == 'client' and user.client_id:
+        key = incident_stats_cache_key(user.client_id, days)
+    else:
+        return incident_dashboard_stats(_scope_incidents(user), days)
+    
+    stats = cache.get(key)
+    if stats is None:
+        stats = incident_dashboard_stats(_scope_incidents(user), days)
+        cache.set(key, stats, settings.INCIDENT_STATS_CACHE_TTL)
+    return stats
+
+
+def incident_dashboard_stats(queryset, days):
+    """
+    Dashboard statistics for the incidents reported in the last days.
+    
+    The counters and the average resolution time come from a single
+    aggregate; the breakdowns and the trend are one GROUP BY each, the
+    trend holding one row per day of the window, days without incidents
+    included.
+    """
+    start_date = timezone.now() - timedelta(days=days)
+    queryset = queryset.filter(reported_at__gte=start_date)
+    
+    resolved = Q(status='resolved', resolved_at__isnull=False)
+    totals = queryset.aggregate(
+        total=Count('id'),
+        open=Count('id', filter=Q(status__in=['new', 'assigned', 'in_progress'])),
+        resolved=Count('id', filter=Q(status='resolved')),
+        closed=Count('id', filter=Q(status='closed')),
+        critical=Count('id', filter=Q(priority='critical')),
+        high=Count('id', filter=Q(priority='high')),
+        avg_resolution=Avg(
+            ExpressionWrapper(F('resolved_at') - F('detected_at'), output_field=DurationField()),
+            filter=resolved
+        )
+    )
+    avg_resolution = totals['avg_resolution']
+    
+    return {
+        'total_incidents': totals['total'],
+        'open_incidents': totals['open'],
+        'resolved_incidents': totals['resolved'],
+        'closed_incidents': totals['closed'],
+        'critical_incidents': totals['critical'],
+        'high_priority_incidents': totals['high'],
+        # Average resolution time in hours
+        'avg_resolution_time': round(avg_resolution.total_seconds() / 3600, 2) if avg_resolution else 0,
+        'incidents_by_category': _count_by(queryset, 'category'),
+        'incidents_by_priority': _count_by(queryset, 'priority'),
+        'incidents_by_status': _count_by(queryset, 'status'),
+        'trend_data': _trend_data(queryset, start_date)
+    }
+
+
+def _count_by(queryset, field):
+    """Incident count per value of field, largest first"""
+    return list(queryset.values(field).annotate(count=Count('id')).order_by('-count'))
+
+
+def _trend_data(queryset, start_date):
+    """Daily incident counts from start_date to today, zero-filled"""
+    per_day = queryset.annotate(day=TruncDay('reported_at')).values('day').annotate(count=Count('id')).order_by()
+    first_day = datetime.combine(timezone.localtime(start_date).date(), time.min)
+    last_day = datetime.combine(timezone.localdate(), time.min)
+    
+    if connection.vendor == 'postgresql':
+        # TruncDay yields local midnights without time zone, joined against the whole window
+        sql, params = per_day.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT days.day, COALESCE(per_day.count, 0) "
+                "FROM generate_series(%s::timestamp, %s::timestamp, interval '1 day') AS days(day) "
+                f"LEFT JOIN ({sql}) per_day ON per_day.day = days.day "
+                "ORDER BY days.day",
+                [first_day, last_day, *params]
+            )
+            return [{'day': timezone.make_aware(day), 'count': count} for day, count in cursor.fetchall()]
+    
+    counts = {row['day']: row['count'] for row in per_day}
+    trend_data = []
+    for offset in range((last_day - first_day).days + 1):
+        day = timezone.make_aware(first_day + timedelta(days=offset))
+        trend_data.append({'day': day, 'count': counts.get(day, 0)})
+    return trend_data
+
 
 class IncidentViewSet(viewsets.ModelViewSet):
     """
@@ -29,11 +157,29 @@ class IncidentViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         """Filter incidents based on user role and client"""
-        if self.request.user.role in ['admin', 'soc_analyst']:
-            return Incident.objects.all()
-        elif self.request.user.role == 'client':
-            return Incident.objects.filter(client=self.request.user.client)
-        return Incident.objects.none()
+        if self.action == 'list':
+            return self._scoped_queryset().select_related(
+                'client', 'assigned_to'
+            ).only(*INCIDENT_SUMMARY_FIELDS)
+        
+        # Related object counts for IncidentSerializer, in the same query
+        return self._scoped_queryset().select_related(
+            'client', 'assigned_to', 'assigned_by'
+        ).annotate(
+            comments_count=Count('comments', distinct=True),
+            attachments_count=Count('attachments', distinct=True),
+            timeline_events_count=Count('timeline', distinct=True)
+        )
+    
+    def get_serializer_class(self):
+        """Summary representation on the list, full one elsewhere"""
+        if self.action == 'list':
+            return IncidentSummarySerializer
+        return IncidentSerializer
+    
+    def _scoped_queryset(self):
+        """Incidents visible to the requesting user, without annotations"""
+        return _scope_incidents(self.request.user)
     
     def get_permissions(self):
         """Set permissions based on action"""
@@ -46,26 +192,9 @@ class IncidentViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def dashboard_stats(self, request):
         """Get dashboard statistics for incidents"""
-        queryset = self.get_queryset()
-        
         # Filter by date range if provided
         days = int(request.query_params.get('days', 30))
-        start_date = timezone.now() - timedelta(days=days)
-        queryset = queryset.filter(reported_at__gte=start_date)
-        
-        stats = {
-            'total_incidents': queryset.count(),
-            'open_incidents': queryset.filter(status__in=['new', 'assigned', 'in_progress']).count(),
-            'resolved_incidents': queryset.filter(status='resolved').count(),
-            'closed_incidents': queryset.filter(status='closed').count(),
-            'critical_incidents': queryset.filter(priority='critical').count(),
-            'high_priority_incidents': queryset.filter(priority='high').count(),
-            'avg_resolution_time': self._calculate_avg_resolution_time(queryset),
-            'incidents_by_category': self._get_incidents_by_category(queryset),
-            'incidents_by_priority': self._get_incidents_by_priority(queryset),
-            'incidents_by_status': self._get_incidents_by_status(queryset),
-            'trend_data': self._get_trend_data(queryset, days)
-        }
+        stats = cached_incident_dashboard_stats(request.user, days)
         
         return Response(stats)
     
@@ -76,18 +205,19 @@ class IncidentViewSet(viewsets.ModelViewSet):
         serializer = IncidentCommentSerializer(data=request.data)
         
         if serializer.is_valid():
-            comment = serializer.save(
-                incident=incident,
-                author=request.user
-            )
-            
-            # Create timeline event
-            IncidentTimeline.objects.create(
-                incident=incident,
-                event_type='comment_added',
-                description=f'Commentaire ajouté par {request.user.email}',
-                user=request.user
-            )
+            with transaction.atomic():
+                comment = serializer.save(
+                    incident=incident,
+                    author=request.user
+                )
+                
+                # Create timeline event
+                IncidentTimeline.objects.create(
+                    incident=incident,
+                    event_type='comment_added',
+                    description=f'Commentaire ajouté par {request.user.email}',
+                    user=request.user
+                )
             
             return Response(IncidentCommentSerializer(comment).data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -105,17 +235,19 @@ class IncidentViewSet(viewsets.ModelViewSet):
             )
         
         old_status = incident.status
-        incident.status = new_status
-        incident.save()
-        
-        # Create timeline event
-        IncidentTimeline.objects.create(
-            incident=incident,
-            event_type='status_changed',
-            description=f'Statut changé de {old_status} à {new_status}',
-            user=request.user,
-            metadata={'old_status': old_status, 'new_status': new_status}
-        )
+        with transaction.atomic():
+            incident.status = new_status
+            incident.save()
+            
+            # Create timeline event
+            IncidentTimeline.objects.create(
+                incident=incident,
+                event_type='status_changed',
+                description=f'Statut changé de {old_status} à {new_status}',
+                user=request.user,
+                metadata={'old_status': old_status, 'new_status': new_status}
+            )
+        incident.timeline_events_count += 1
         
         return Response(IncidentSerializer(incident).data)
     
@@ -134,18 +266,20 @@ class IncidentViewSet(viewsets.ModelViewSet):
         try:
             from apps.accounts.models import User
             assigned_user = User.objects.get(id=assigned_to_id)
-            incident.assigned_to = assigned_user
-            incident.assigned_by = request.user
-            incident.status = 'assigned'
-            incident.save()
-            
-            # Create timeline event
-            IncidentTimeline.objects.create(
-                incident=incident,
-                event_type='assigned',
-                description=f'Incident assigné à {assigned_user.email}',
-                user=request.user
-            )
+            with transaction.atomic():
+                incident.assigned_to = assigned_user
+                incident.assigned_by = request.user
+                incident.status = 'assigned'
+                incident.save()
+                
+                # Create timeline event
+                IncidentTimeline.objects.create(
+                    incident=incident,
+                    event_type='assigned',
+                    description=f'Incident assigné à {assigned_user.email}',
+                    user=request.user
+                )
+            incident.timeline_events_count += 1
             
             return Response(IncidentSerializer(incident).data)
         except User.DoesNotExist:
@@ -154,50 +288,60 @@ class IncidentViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
     
-    def _calculate_avg_resolution_time(self, queryset):
-        """Calculate average resolution time in hours"""
-        resolved_incidents = queryset.filter(
-            status='resolved',
-            resolved_at__isnull=False
-        )
-        
-        if not resolved_incidents.exists():
-            return 0
+    @action(detail=False, methods=['post'])
+    def bulk_change_status(self, request):
+        """Change the status of several incidents at once"""
+        incident_ids = request.data.get('incident_ids')
+        new_status = request.data.get('status')
         
-        total_hours = 0
-        count = 0
+        if not incident_ids or not isinstance(incident_ids, list):
+            return Response(
+                {'error': 'incident_ids must be a non-empty list'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if new_status not in dict(Incident.STATUS_CHOICES):
+            return Response(
+                {'error': 'Invalid status'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        for incident in resolved_incidents:
-            if incident.resolved_at and incident.detected_at:
-                resolution_time = incident.resolved_at - incident.detected_at
-                total_hours += resolution_time.total_seconds() / 3600
-                count += 1
+        now = timezone.now()
+        with transaction.atomic():
+            incidents = self._scoped_queryset().select_for_update().filter(
+                id__in=incident_ids
+            ).exclude(status=new_status)
+            rows = list(incidents.values_list('id', 'status', 'client_id'))
+            old_statuses = {incident_id: old_status for incident_id, old_status, _ in rows}
+            
+            Incident.objects.filter(id__in=old_statuses).update(status=new_status, updated_at=now)
+            
+            # Create timeline events
+            IncidentTimeline.objects.bulk_create([
+                IncidentTimeline(
+                    incident_id=incident_id,
+                    event_type='status_changed',
+                    description=f'Statut changé de {old_status} à {new_status}',
+                    user=request.user,
+                    metadata={'old_status': old_status, 'new_status': new_status}
+                )
+                for incident_id, old_status in old_statuses.items()
+            ], batch_size=500)
         
-        return round(total_hours / count, 2) if count > 0 else 0
-    
-    def _get_incidents_by_category(self, queryset):
-        """Get incident count by category"""
-        return list(queryset.values('category').annotate(count=Count('id')).order_by('-count'))
-    
-    def _get_incidents_by_priority(self, queryset):
-        """Get incident count by priority"""
-        return list(queryset.values('priority').annotate(count=Count('id')).order_by('-count'))
-    
-    def _get_incidents_by_status(self, queryset):
-        """Get incident count by status"""
-        return list(queryset.values('status').annotate(count=Count('id')).order_by('-count'))
-    
-    def _get_trend_data(self, queryset, days):
-        """Get incident trend data over time"""
-        from django.db.models.functions import TruncDay
+        # update() sends no post_save signal
+        for client_id in {client_id for _, _, client_id in rows}:
+            invalidate_incident_stats_cache(client_id)
         
-        trend_data = list(
-            queryset.annotate(day=TruncDay('reported_at'))
-            .values('day')
-            .annotate(count=Count('id'))
-            .order_by('day')
-        )
-        return trend_data
+        return Response({'updated': len(old_statuses), 'incident_ids': list(old_statuses)})
+
+
+def _save_for_incident(serializer, incident_id, **kwargs):
+    """Save a related object by incident id, the FK constraint checks the incident exists"""
+    try:
+        incident_id = Incident._meta.pk.to_python(incident_id)
+        with transaction.atomic():
+            serializer.save(incident_id=incident_id, **kwargs)
+    except (DjangoValidationError, IntegrityError):
+        raise NotFound('Incident not found')
 
 
 class IncidentCommentViewSet(viewsets.ModelViewSet):
@@ -207,12 +351,10 @@ class IncidentCommentViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         incident_id = self.kwargs.get('incident_pk')
-        return IncidentComment.objects.filter(incident_id=incident_id)
+        return IncidentComment.objects.filter(incident_id=incident_id).select_related('author')
     
     def perform_create(self, serializer):
-        incident_id = self.kwargs.get('incident_pk')
-        incident = Incident.objects.get(id=incident_id)
-        serializer.save(incident=incident, author=self.request.user)
+        _save_for_incident(serializer, self.kwargs.get('incident_pk'), author=self.request.user)
 
 
 class IncidentAttachmentViewSet(viewsets.ModelViewSet):
@@ -222,12 +364,10 @@ class IncidentAttachmentViewSet(viewsets.ModelViewSet):
     
     def get_queryset(self):
         incident_id = self.kwargs.get('incident_pk')
-        return IncidentAttachment.objects.filter(incident_id=incident_id)
+        return IncidentAttachment.objects.filter(incident_id=incident_id).select_related('uploaded_by')
     
     def perform_create(self, serializer):
-        incident_id = self.kwargs.get('incident_pk')
-        incident = Incident.objects.get(id=incident_id)
-        serializer.save(incident=incident, uploaded_by=self.request.user)
+        _save_for_incident(serializer, self.kwargs.get('incident_pk'), uploaded_by=self.request.user)
 
 
 class IncidentTimelineViewSet(viewsets.ReadOnlyModelViewSet):
@@ -237,42 +377,15 @@ class IncidentTimelineViewSet(viewsets.ReadOnlyModelViewSet):
     
     def get_queryset(self):
         incident_id = self.kwargs.get('incident_pk')
-        return IncidentTimeline.objects.filter(incident_id=incident_id)
+        return IncidentTimeline.objects.filter(incident_id=incident_id).select_related('user')
 
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def dashboard_stats_view(request):
     """Simple view for dashboard stats"""
-    from django.db.models import Q, Count, Avg
-    from django.utils import timezone
-    from datetime import timedelta
-    
-    # Get incidents based on user role
-    if request.user.role in ['admin', 'soc_analyst']:
-        queryset = Incident.objects.all()
-    elif request.user.role == 'client':
-        queryset = Incident.objects.filter(client=request.user.client)
-    else:
-        queryset = Incident.objects.none()
-    
     # Filter by date range if provided
     days = int(request.GET.get('days', 30))
-    start_date = timezone.now() - timedelta(days=days)
-    queryset = queryset.filter(reported_at__gte=start_date)
-    
-    stats = {
-        'total_incidents': queryset.count(),
-        'open_incidents': queryset.filter(status__in=['new', 'assigned', 'in_progress']).count(),
-        'resolved_incidents': queryset.filter(status='resolved').count(),
-        'closed_incidents': queryset.filter(status='closed').count(),
-        'critical_incidents': queryset.filter(priority='critical').count(),
-        'high_priority_incidents': queryset.filter(priority='high').count(),
-        'avg_resolution_time': 0,  # Simplified for now
-        'incidents_by_category': [],
-        'incidents_by_priority': [],
-        'incidents_by_status': [],
-        'trend_data': []
-    }
+    stats = cached_incident_dashboard_stats(request.user, days)
     
     return Response(stats)
@@ -1,6 +1,15 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
 from django.contrib import admin
+from django.utils import timezone
 from django.utils.html import format_html
-from .models import ClientIntegration, IntegrationLog, AlertMappingTemplate
+from .models import ClientIntegration, IntegrationLog, AlertMappingTemplate, invalidate_integration_token_cache
+
+
+def _is_changelist(request):
+    """Vrai pour la page liste (les formulaires d'édition ont besoin de toutes les colonnes)"""
+    return bool(request.resolver_match and request.resolver_match.url_name.endswith('_changelist'))
 
 
 @admin.register(ClientIntegration)
@@ -18,7 +27,7 @@ class ClientIntegrationAdmin(admin.ModelAdmin):
             'fields': ('client', 'name', 'integration_type', 'endpoint_url', 'api_token')
         }),
         ('Mapping', {
-            'fields': ('mapping_config',)
+            'fields': ('mapping_config', 'store_raw_payload')
         }),
         ('Status', {
             'fields': ('is_active', 'status', 'error_message')
@@ -35,24 +44,65 @@ class ClientIntegrationAdmin(admin.ModelAdmin):
     
     actions = ['test_connections', 'activate_integrations', 'deactivate_integrations']
     
+    def get_queryset(self, request):
+        """Optimize queryset with select_related; skip mapping_config and api_token on the list page."""
+        queryset = super().get_queryset(request).select_related('client')
+        if _is_changelist(request):
+            queryset = queryset.only(
+                'id', 'name', 'integration_type', 'status', 'is_active', 'last_sync',
+                'alerts_received_24h', 'error_count_24h', 'client__name'
+            )
+        return queryset
+    
+    # Tests de connexion lancés en parallèle, et délai max de chacun (secondes)
+    CONNECTION_TEST_WORKERS = 16
+    CONNECTION_TEST_TIMEOUT = 10
+    
+    @classmethod
+    def _probe_one(cls, integration):
+        """Teste une intégration, retourne (intégration, message d'erreur ou None)"""
+        # Les webhooks reçoivent les alertes : pas d'URL à tester
+        if not integration.endpoint_url:
+            return integration, None
+        headers = {'Authorization': f'Bearer {integration.api_token}'} if integration.api_token else {}
+        try:
+            response = requests.get(integration.endpoint_url, headers=headers, timeout=cls.CONNECTION_TEST_TIMEOUT)
+            response.raise_for_status()
+            return integration, None
+        except Exception as e:
+            return integration, str(e)
+    
     def test_connections(self, request, queryset):
-        """Teste les connexions des intégrations sélectionnées"""
-        for integration in queryset:
-            try:
-                # TODO: Implémenter le test de connexion
-                integration.update_sync_status(success=True)
+        """Teste les connexions des intégrations sélectionnées (en parallèle)"""
+        # Charger les colonnes lues par les threads, qui ne touchent pas la base
+        integrations = list(queryset.select_related('client').only(
+            'id', 'name', 'integration_type', 'endpoint_url', 'api_token', 'client__name'
+        ))
+        with ThreadPoolExecutor(max_workers=self.CONNECTION_TEST_WORKERS) as executor:
+            results = list(executor.map(self._probe_one, integrations))
+        
+        now = timezone.now()
+        for integration, error_message in results:
+            integration.last_sync = now
+            integration.status = 'error' if error_message else 'active'
+            integration.error_message = error_message
+            if error_message:
+                self.message_user(request, f"Test échoué pour {integration}: {error_message}")
+            else:
                 self.message_user(request, f"Test réussi pour {integration}")
-            except Exception as e:
-                integration.update_sync_status(success=False, error_message=str(e))
-                self.message_user(request, f"Test échoué pour {integration}: {str(e)}")
+        ClientIntegration.objects.bulk_update(
+            integrations, ['last_sync', 'status', 'error_message'], batch_size=100
+        )
     
     def activate_integrations(self, request, queryset):
         """Active les intégrations sélectionnées"""
+        invalidate_integration_token_cache(*queryset.values_list('api_token', flat=True))
         count = queryset.update(is_active=True, status='active')
         self.message_user(request, f"{count} intégrations activées")
     
     def deactivate_integrations(self, request, queryset):
         """Désactive les intégrations sélectionnées"""
+        invalidate_integration_token_cache(*queryset.values_list('api_token', flat=True))
         count = queryset.update(is_active=False, status='inactive')
         self.message_user(request, f"{count} intégrations désactivées")
 
@@ -65,6 +115,10 @@ class IntegrationLogAdmin(admin.ModelAdmin):
     readonly_fields = ['id', 'timestamp']
     date_hierarchy = 'timestamp'
     
+    def get_queryset(self, request):
+        """Optimize queryset with select_related."""
+        return super().get_queryset(request).select_related('integration__client')
+    
     def has_add_permission(self, request):
         return False  # Les logs sont créés automatiquement
 
@@ -75,3 +129,10 @@ class AlertMappingTemplateAdmin(admin.ModelAdmin):
     list_filter = ['system_type', 'is_active', 'created_at']
     search_fields = ['name', 'description']
     readonly_fields = ['created_at']
+    
+    def get_queryset(self, request):
+        """Skip mapping_config on the list page."""
+        queryset = super().get_queryset(request)
+        if _is_changelist(request):
+            queryset = queryset.only('id', 'name', 'system_type', 'is_active', 'created_at')
+        return queryset
@@ -5,3 +5,7 @@ class IntegrationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.integrations'
     verbose_name = 'Client Integrations'
+    
+    def ready(self):
+        """Register the system checks when the app is ready."""
+        import apps.integrations.checks
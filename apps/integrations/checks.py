@@ -0,0 +1,27 @@
+"""
+System checks for client integrations.
+"""
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Backends whose values are private to each process
+PROCESS_LOCAL_CACHE_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+
+
+@register()
+def check_log_sampling_cache(app_configs, **kwargs):
+    """Log sampling counts skipped logs in the cache; the rollup task must see every process's counters."""
+    if settings.INTEGRATION_LOG_SAMPLE_RATE <= 1:
+        return []
+    if settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHE_BACKENDS:
+        return []
+    return [
+        Error(
+            'INTEGRATION_LOG_SAMPLE_RATE > 1 requires a cache shared between processes.',
+            hint='Set CACHE_BACKEND to a shared backend such as Redis, or INTEGRATION_LOG_SAMPLE_RATE=1.',
+            id='integrations.E001',
+        )
+    ]
@@ -0,0 +1,34 @@
+"""
+Model fields for the integrations application.
+"""
+import json
+
+import msgspec
+from django.db import models
+from django.db.models.fields.json import KeyTransform
+
+_decoder = msgspec.json.Decoder()
+
+
+class MsgspecJSONField(models.JSONField):
+    """
+    JSONField decoding database values with msgspec instead of json.loads.
+    
+    Encoding is unchanged. Values msgspec rejects (e.g. integers beyond 64
+    bits) fall back to json.loads, so reads return the same Python values.
+    """
+    
+    def from_db_value(self, value, expression, connection):
+        if value is None or self.decoder is not None:
+            return super().from_db_value(value, expression, connection)
+        # Some backends (SQLite at least) extract non-string values in their
+        # SQL datatypes.
+        if isinstance(expression, KeyTransform) and not isinstance(value, str):
+            return value
+        try:
+            return _decoder.decode(value)
+        except msgspec.DecodeError:
+            try:
+                return json.loads(value)
+            except json.JSONDecodeError:
+                return value
@@ -0,0 +1,12 @@
+"""
+Buffered writes of IntegrationLog rows (see exeo_portal.ingest).
+"""
+from exeo_portal.ingest import BufferedWriter
+
+from .models import IntegrationLog
+
+writer = BufferedWriter(IntegrationLog, threshold=500, interval=0.25)
+
+emit = writer.emit
+aemit = writer.aemit
+flush = writer.flush
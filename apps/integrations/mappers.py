@@ -1,26 +1,80 @@
 import json
 import logging
+import re
 from datetime import datetime
 from typing import Dict, Any, Optional
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from .models import ClientIntegration, IntegrationLog
 
 logger = logging.getLogger(__name__)
 
+# Valeur absente (None est une valeur valide d'un champ)
+_MISSING = object()
+
+# Formats de timestamp texte reconnus, distingués en un seul match :
+# ISO 8601 (validé par parse_datetime), epoch Unix en secondes ou en millisecondes
+_TIMESTAMP_RE = re.compile(
+    r'\s*(?:(?P<iso>\d{4}-\d{2}-\d{2}.*?)|(?P<unix>\d{10}(?:\.\d+)?)|(?P<unix_ms>\d{13}))\s*$'
+)
+
+# Durée de vie des compteurs d'alertes traitées, le temps d'être agrégés
+PROCESSED_COUNTER_TTL = 3600
+
+
+def processed_counter_key(integration_id, minute: datetime) -> str:
+    """Clé du compteur d'alertes traitées d'une intégration pour une minute"""
+    return f"integrlog:v1:processed:{integration_id}:{minute:%Y%m%d%H%M}"
+
 
 class ClientAlertMapper:
-    """Mapper pour convertir les données clients vers le format EXEO"""
+    """
+    Mapper pour convertir les données clients vers le format EXEO
+    
+    Les logs d'intégration sont mis en tampon et écrits en une seule requête
+    par flush_logs().
+    """
+    
+    # Taille des lots d'INSERT des logs
+    LOG_BATCH_SIZE = 1000
+    
+    # Valeurs de sévérité reçues (en minuscules) vers les sévérités EXEO
+    SEVERITY_MAPPING = {
+        '1': 'critical', '2': 'high', '3': 'medium', '4': 'low',
+        'critical': 'critical', 'high': 'high', 'medium': 'medium', 'low': 'low',
+        'info': 'low', 'warning': 'medium', 'error': 'high', 'fatal': 'critical',
+        'urgent': 'critical', 'important': 'high', 'normal': 'medium', 'minor': 'low'
+    }
     
     def __init__(self, integration: ClientIntegration):
         self.integration = integration
         self.mapping_config = integration.mapping_config or {}
+        self._compiled_paths = self._compile_paths(self.mapping_config)
+        self._extractors = {}
+        self._pending_logs = []
     
-    def map_alert(self, raw_data: Dict[str, Any]) -> Dict[str, Any]:
+    @staticmethod
+    def _compile_paths(mapping_config: Dict[str, Any]) -> Dict[str, tuple]:
+        """
+        Découpe une seule fois les chemins de mapping_config
+        ({'title': {'path': 'event.title'}} -> {'title': ('event', 'title')})
+        """
+        return {
+            target: tuple(str(spec['path']).split('.'))
+            for target, spec in mapping_config.items()
+            if isinstance(spec, dict) and spec.get('path')
+        }
+    
+    def map_alert(self, raw_data: Dict[str, Any], keep_logs: Optional[bool] = None) -> Dict[str, Any]:
         """
         Mappe les données brutes vers le format Alert EXEO
         
         Args:
             raw_data: Données brutes reçues du système client
+            keep_logs: Décision d'échantillonnage déjà prise pour cette alerte
+                (voir sample_alert_logs) ; prise ici si None
             
         Returns:
             Dict mappé pour créer un objet Alert
@@ -57,18 +111,20 @@ class ClientAlertMapper:
             mapped_data['detected_at'] = self._map_timestamp(raw_data)
             
             # Mapping des tags
-            mapped_data['tags'] = self._extract_field(raw_data, 'tags', 'labels', 'categories', default=[])
-            if isinstance(mapped_data['tags'], str):
-                mapped_data['tags'] = [mapped_data['tags']]
+            tags = self._extract_field(raw_data, 'tags', 'labels', 'categories', default=[])
+            mapped_data['tags'] = [tags] if type(tags) is str else (tags or [])
             
-            # Données brutes pour debugging
-            mapped_data['raw_data'] = raw_data
+            # Données brutes pour debugging (désactivable par intégration)
+            mapped_data['raw_data'] = raw_data if self.integration.store_raw_payload else {}
             
             # Client (obligatoire) - passer l'ID au lieu de l'objet
-            mapped_data['client'] = self.integration.client.id
+            mapped_data['client'] = self.integration.client_id
             
             # Log de l'alerte mappée
-            self._log_alert_processed(mapped_data)
+            if keep_logs is None:
+                keep_logs = self.sample_alert_logs()
+            if keep_logs:
+                self._log_alert_processed(mapped_data)
             
             return mapped_data
             
@@ -78,23 +134,38 @@ class ClientAlertMapper:
             self._log_error(error_msg, raw_data)
             raise
     
+    def _extractor_paths(self, field_names: tuple) -> tuple:
+        """
+        Chemins essayés pour une liste de noms, calculés une fois par mapper
+        
+        Ordre : chaque nom comme clé simple, puis les noms pointés comme
+        chemins JSON (ex: "event.details.title"), puis en dernier recours le
+        chemin configuré dans mapping_config pour le premier nom (le champ
+        cible), sans sa table 'mapping'.
+        """
+        paths = self._extractors.get(field_names)
+        if paths is None:
+            configured = self._compiled_paths.get(field_names[0]) if field_names else None
+            paths = (
+                tuple((field_name,) for field_name in field_names)
+                + tuple(tuple(field_name.split('.')) for field_name in field_names if '.' in field_name)
+                + ((configured,) if configured else ())
+            )
+            self._extractors[field_names] = paths
+        return paths
+    
     def _extract_field(self, data: Dict[str, Any], *field_names: str, default: Any = None) -> Any:
         """Extrait un champ en essayant plusieurs noms possibles"""
-        for field_name in field_names:
-            if field_name in data:
-                return data[field_name]
-        
-        # Essayer avec des chemins JSON (ex: "event.details.title")
-        for field_name in field_names:
-            if '.' in field_name:
+        for path in self._extractor_paths(field_names):
+            value = data
+            for key in path:
                 try:
-                    keys = field_name.split('.')
-                    value = data
-                    for key in keys:
-                        value = value[key]
-                    return value
-                except (KeyError, TypeError):
-                    continue
+                    value = value[key]
+                except (KeyError, TypeError, IndexError):
+                    value = _MISSING
+                    break
+            if value is not _MISSING:
+                return value
         
         return default
     
@@ -114,15 +185,7 @@ class ClientAlertMapper:
                 return 'low'
         
         # Mapping des chaînes
-        severity_str = str(severity).lower()
-        severity_mapping = {
-            '1': 'critical', '2': 'high', '3': 'medium', '4': 'low',
-            'critical': 'critical', 'high': 'high', 'medium': 'medium', 'low': 'low',
-            'info': 'low', 'warning': 'medium', 'error': 'high', 'fatal': 'critical',
-            'urgent': 'critical', 'important': 'high', 'normal': 'medium', 'minor': 'low'
-        }
-        
-        return severity_mapping.get(severity_str, 'medium')
+        return self.SEVERITY_MAPPING.get(str(severity).lower(), 'medium')
     
     def _map_timestamp(self, data: Dict[str, Any]) -> datetime:
         """Mappe le timestamp vers un objet datetime"""
@@ -135,27 +198,27 @@ class ClientAlertMapper:
         if isinstance(timestamp, datetime):
             return timestamp
         
-        # Si c'est une chaîne, essayer de la parser
+        # Si c'est une chaîne, reconnaître le format en un seul match puis
+        # appeler le parser correspondant
         if isinstance(timestamp, str):
+            match = _TIMESTAMP_RE.match(timestamp)
+            parsed = None
             try:
-                # Formats ISO courants
-                for fmt in [
-                    '%Y-%m-%dT%H:%M:%S.%fZ',
-                    '%Y-%m-%dT%H:%M:%SZ',
-                    '%Y-%m-%d %H:%M:%S',
-                    '%Y-%m-%dT%H:%M:%S.%f',
-                    '%Y-%m-%dT%H:%M:%S'
-                ]:
-                    try:
-                        return datetime.strptime(timestamp, fmt)
-                    except ValueError:
-                        continue
-                
-                # Parser ISO avec timezone
-                return datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+                if match is None:
+                    pass
+                elif match.group('iso'):
+                    # Le suffixe Z et les décalages horaires sont conservés
+                    parsed = parse_datetime(match.group('iso'))
+                elif match.group('unix'):
+                    parsed = datetime.fromtimestamp(float(match.group('unix')), tz=timezone.utc)
+                else:
+                    parsed = datetime.fromtimestamp(int(match.group('unix_ms')) / 1000, tz=timezone.utc)
             except ValueError:
+                parsed = None
+            if parsed is None:
                 logger.warning(f"Impossible de parser le timestamp: {timestamp}")
                 return timezone.now()
+            return parsed
         
         # Si c'est un timestamp Unix
         if isinstance(timestamp, (int, float)):
@@ -163,10 +226,47 @@ class ClientAlertMapper:
         
         return timezone.now()
     
+    def add_log(self, log_type: str, message: str, details: Optional[Dict[str, Any]] = None):
+        """Ajoute un log d'intégration au tampon"""
+        self._pending_logs.append(IntegrationLog(
+            integration=self.integration,
+            log_type=log_type,
+            message=message,
+            details=details or {}
+        ))
+    
+    def flush_logs(self) -> int:
+        """Écrit les logs en attente, retourne leur nombre"""
+        logs, self._pending_logs = self._pending_logs, []
+        if logs:
+            IntegrationLog.objects.bulk_create(logs, batch_size=self.LOG_BATCH_SIZE)
+        return len(logs)
+    
+    def sample_alert_logs(self) -> bool:
+        """
+        Compte une alerte reçue et indique si ses logs par alerte sont écrits
+        
+        Les alertes sont comptées par intégration et par minute dans le cache ;
+        seule une alerte sur INTEGRATION_LOG_SAMPLE_RATE garde ses logs, le
+        total est agrégé par la tâche rollup_processed_alert_logs. Les logs
+        d'erreur ne sont jamais échantillonnés.
+        """
+        sample_rate = settings.INTEGRATION_LOG_SAMPLE_RATE
+        if sample_rate <= 1:
+            return True
+        
+        key = processed_counter_key(self.integration.pk, timezone.now())
+        cache.add(key, 0, PROCESSED_COUNTER_TTL)
+        try:
+            count = cache.incr(key)
+        except ValueError:
+            # Compteur expiré entre add et incr : garder ces logs
+            count = 1
+        return count % sample_rate == 1
+    
     def _log_alert_processed(self, mapped_data: Dict[str, Any]):
         """Log une alerte traitée avec succès"""
-        IntegrationLog.objects.create(
-            integration=self.integration,
+        self.add_log(
             log_type='alert_processed',
             message=f"Alerte mappée: {mapped_data['alert_id']}",
             details={
@@ -180,13 +280,13 @@ class ClientAlertMapper:
     
     def _log_error(self, error_message: str, raw_data: Dict[str, Any]):
         """Log une erreur de mapping"""
-        IntegrationLog.objects.create(
-            integration=self.integration,
+        self.add_log(
             log_type='error',
             message=error_message,
             details={
                 'raw_data_keys': list(raw_data.keys()) if raw_data else [],
-                'mapping_config': self.mapping_config
+                # La configuration complète reste lisible sur l'intégration
+                'mapping_config_keys': list(self.mapping_config.keys())
             }
         )
 
@@ -194,59 +294,63 @@ class ClientAlertMapper:
 class MappingConfigGenerator:
     """Générateur de configurations de mapping pour différents systèmes"""
     
-    @staticmethod
-    def get_default_mapping(system_type: str) -> Dict[str, Any]:
-        """Retourne une configuration de mapping par défaut pour un type de système"""
-        
-        mappings = {
-            'splunk': {
-                'id': {'path': 'event_id', 'type': 'string'},
-                'title': {'path': 'event_title', 'type': 'string'},
-                'description': {'path': 'message', 'type': 'string'},
-                'severity': {
-                    'path': 'priority',
-                    'mapping': {'1': 'critical', '2': 'high', '3': 'medium', '4': 'low'}
-                },
-                'source_ip': {'path': 'src_ip', 'type': 'ip'},
-                'destination_ip': {'path': 'dst_ip', 'type': 'ip'},
-                'timestamp': {'path': 'timestamp', 'format': 'iso8601'}
+    # Configurations par défaut par type de système, construites une seule fois
+    DEFAULT_MAPPINGS = {
+        'splunk': {
+            'id': {'path': 'event_id', 'type': 'string'},
+            'title': {'path': 'event_title', 'type': 'string'},
+            'description': {'path': 'message', 'type': 'string'},
+            'severity': {
+                'path': 'priority',
+                'mapping': {'1': 'critical', '2': 'high', '3': 'medium', '4': 'low'}
             },
-            'qradar': {
-                'id': {'path': 'event_id', 'type': 'string'},
-                'title': {'path': 'event_name', 'type': 'string'},
-                'description': {'path': 'description', 'type': 'string'},
-                'severity': {
-                    'path': 'severity',
-                    'mapping': {'1': 'critical', '2': 'high', '3': 'medium', '4': 'low'}
-                },
-                'source_ip': {'path': 'sourceip', 'type': 'ip'},
-                'destination_ip': {'path': 'destinationip', 'type': 'ip'},
-                'timestamp': {'path': 'starttime', 'format': 'iso8601'}
+            'source_ip': {'path': 'src_ip', 'type': 'ip'},
+            'destination_ip': {'path': 'dst_ip', 'type': 'ip'},
+            'timestamp': {'path': 'timestamp', 'format': 'iso8601'}
+        },
+        'qradar': {
+            'id': {'path': 'event_id', 'type': 'string'},
+            'title': {'path': 'event_name', 'type': 'string'},
+            'description': {'path': 'description', 'type': 'string'},
+            'severity': {
+                'path': 'severity',
+                'mapping': {'1': 'critical', '2': 'high', '3': 'medium', '4': 'low'}
             },
-            'fortinet': {
-                'id': {'path': 'logid', 'type': 'string'},
-                'title': {'path': 'action', 'type': 'string'},
-                'description': {'path': 'msg', 'type': 'string'},
-                'severity': {
-                    'path': 'level',
-                    'mapping': {'emergency': 'critical', 'alert': 'high', 'critical': 'high', 'error': 'medium', 'warning': 'medium', 'notice': 'low', 'info': 'low'}
-                },
-                'source_ip': {'path': 'srcip', 'type': 'ip'},
-                'destination_ip': {'path': 'dstip', 'type': 'ip'},
-                'timestamp': {'path': 'time', 'format': 'iso8601'}
+            'source_ip': {'path': 'sourceip', 'type': 'ip'},
+            'destination_ip': {'path': 'destinationip', 'type': 'ip'},
+            'timestamp': {'path': 'starttime', 'format': 'iso8601'}
+        },
+        'fortinet': {
+            'id': {'path': 'logid', 'type': 'string'},
+            'title': {'path': 'action', 'type': 'string'},
+            'description': {'path': 'msg', 'type': 'string'},
+            'severity': {
+                'path': 'level',
+                'mapping': {'emergency': 'critical', 'alert': 'high', 'critical': 'high', 'error': 'medium', 'warning': 'medium', 'notice': 'low', 'info': 'low'}
             },
-            'paloalto': {
-                'id': {'path': 'serial_number', 'type': 'string'},
-                'title': {'path': 'action', 'type': 'string'},
-                'description': {'path': 'description', 'type': 'string'},
-                'severity': {
-                    'path': 'severity',
-                    'mapping': {'critical': 'critical', 'high': 'high', 'medium': 'medium', 'low': 'low', 'informational': 'low'}
-                },
-                'source_ip': {'path': 'src', 'type': 'ip'},
-                'destination_ip': {'path': 'dst', 'type': 'ip'},
-                'timestamp': {'path': 'receive_time', 'format': 'iso8601'}
-            }
+            'source_ip': {'path': 'srcip', 'type': 'ip'},
+            'destination_ip': {'path': 'dstip', 'type': 'ip'},
+            'timestamp': {'path': 'time', 'format': 'iso8601'}
+        },
+        'paloalto': {
+            'id': {'path': 'serial_number', 'type': 'string'},
+            'title': {'path': 'action', 'type': 'string'},
+            'description': {'path': 'description', 'type': 'string'},
+            'severity': {
+                'path': 'severity',
+                'mapping': {'critical': 'critical', 'high': 'high', 'medium': 'medium', 'low': 'low', 'informational': 'low'}
+            },
+            'source_ip': {'path': 'src', 'type': 'ip'},
+            'destination_ip': {'path': 'dst', 'type': 'ip'},
+            'timestamp': {'path': 'receive_time', 'format': 'iso8601'}
         }
+    }
+    
+    @staticmethod
+    def get_default_mapping(system_type: str) -> Dict[str, Any]:
+        """
+        Retourne une configuration de mapping par défaut pour un type de système
         
-        return mappings.get(system_type, {})
+        La configuration est partagée : la copier avant de la modifier.
+        """
+        return MappingConfigGenerator.DEFAULT_MAPPINGS.get(system_type, {})
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.7 on 2026-10-16 14:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='clientintegration',
+            index=models.Index(fields=['api_token'], name='integration_api_tok_11fcb8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clientintegration',
+            index=models.Index(fields=['client', 'is_active'], name='integration_client__7551b1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='clientintegration',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['status'], name='integr_active_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='integrationlog',
+            index=models.Index(fields=['-timestamp'], name='integration_timesta_6bc854_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='integrationlog',
+            index=models.Index(fields=['integration', 'log_type', '-timestamp'], name='integration_integra_6cd848_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='integrationlog',
+            index=models.Index(fields=['log_type', '-timestamp'], name='integration_log_typ_50abd0_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-16 14:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0002_integration_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clientintegration',
+            name='store_raw_payload',
+            field=models.BooleanField(default=True, help_text='Conserver le payload brut dans Alert.raw_data'),
+        ),
+    ]
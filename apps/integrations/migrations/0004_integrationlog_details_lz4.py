@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-16 15:20
+
+from django.db import migrations
+
+
+def set_lz4_compression(apps, schema_editor):
+    # Column compression methods need PostgreSQL 14+; other backends keep their default storage
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql' or connection.pg_version < 140000:
+        return
+    schema_editor.execute("ALTER TABLE integrations_integrationlog ALTER COLUMN details SET COMPRESSION lz4")
+
+
+def reset_compression(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'postgresql' or connection.pg_version < 140000:
+        return
+    schema_editor.execute("ALTER TABLE integrations_integrationlog ALTER COLUMN details SET COMPRESSION DEFAULT")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0003_client_integration_store_raw_payload'),
+    ]
+
+    operations = [
+        migrations.RunPython(set_lz4_compression, reset_compression),
+    ]
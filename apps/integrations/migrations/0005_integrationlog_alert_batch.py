@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-16 14:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0004_integrationlog_details_lz4'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='integrationlog',
+            name='log_type',
+            field=models.CharField(choices=[('alert_received', 'Alert Received'), ('alert_processed', 'Alert Processed'), ('alert_batch', 'Alert Batch Processed'), ('error', 'Error'), ('connection_test', 'Connection Test'), ('sync_started', 'Sync Started'), ('sync_completed', 'Sync Completed')], max_length=20),
+        ),
+    ]
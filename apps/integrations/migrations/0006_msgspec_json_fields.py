@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-16 14:57
+
+import apps.integrations.fields
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0005_integrationlog_alert_batch'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='alertmappingtemplate',
+            name='mapping_config',
+            field=apps.integrations.fields.MsgspecJSONField(help_text='Configuration de mapping par défaut'),
+        ),
+        migrations.AlterField(
+            model_name='clientintegration',
+            name='mapping_config',
+            field=apps.integrations.fields.MsgspecJSONField(default=dict, help_text='Configuration de mapping des champs'),
+        ),
+        migrations.AlterField(
+            model_name='integrationlog',
+            name='details',
+            field=apps.integrations.fields.MsgspecJSONField(blank=True, default=dict),
+        ),
+    ]
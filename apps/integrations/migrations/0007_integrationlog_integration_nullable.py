@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-16 15:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('integrations', '0006_msgspec_json_fields'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='integrationlog',
+            name='integration',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='logs', to='integrations.clientintegration'),
+        ),
+    ]
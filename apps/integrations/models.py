@@ -1,6 +1,13 @@
+from django.conf import settings
+from django.core.cache import cache
 from django.db import models
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.utils import timezone
 from apps.accounts.models import Client
+from .fields import MsgspecJSONField
+import hashlib
 import uuid
 
 
@@ -30,7 +37,8 @@ class ClientIntegration(models.Model):
     name = models.CharField(max_length=100, help_text="Nom de l'intégration")
     endpoint_url = models.URLField(blank=True, null=True, help_text="URL du système client")
     api_token = models.CharField(max_length=255, blank=True, null=True, help_text="Token d'authentification")
-    mapping_config = models.JSONField(default=dict, help_text="Configuration de mapping des champs")
+    mapping_config = MsgspecJSONField(default=dict, help_text="Configuration de mapping des champs")
+    store_raw_payload = models.BooleanField(default=True, help_text="Conserver le payload brut dans Alert.raw_data")
     is_active = models.BooleanField(default=False)
     last_sync = models.DateTimeField(null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='inactive')
@@ -46,10 +54,26 @@ class ClientIntegration(models.Model):
     class Meta:
         ordering = ['-created_at']
         unique_together = ['client', 'name']
+        indexes = [
+            # Token lookup of every webhook call
+            models.Index(fields=['api_token']),
+            models.Index(fields=['client', 'is_active']),
+            models.Index(fields=['status'], name='integr_active_status_idx', condition=models.Q(is_active=True)),
+        ]
+    
+    # Champs écrits à chaque appel de webhook, sans effet sur la recherche par token
+    SYNC_STATUS_FIELDS = frozenset({'last_sync', 'status', 'error_message'})
     
     def __str__(self):
         return f"{self.client.name} - {self.name} ({self.integration_type})"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Token chargé, pour invalider son entrée de cache s'il est changé
+        instance._loaded_api_token = instance.__dict__.get('api_token')
+        return instance
+    
     def update_sync_status(self, success=True, error_message=None):
         """Met à jour le statut de synchronisation"""
         self.last_sync = timezone.now()
@@ -61,16 +85,19 @@ class ClientIntegration(models.Model):
             self.error_message = error_message
         self.save(update_fields=['last_sync', 'status', 'error_message'])
     
-    def increment_alert_count(self):
-        """Incrémente le compteur d'alertes reçues"""
-        self.alerts_received_24h += 1
+    def increment_alert_count(self, count=1):
+        """Incrémente le compteur d'alertes reçues (UPDATE atomique en base)"""
         self.last_alert_received = timezone.now()
-        self.save(update_fields=['alerts_received_24h', 'last_alert_received'])
-    
-    def increment_error_count(self):
-        """Incrémente le compteur d'erreurs"""
-        self.error_count_24h += 1
-        self.save(update_fields=['error_count_24h'])
+        ClientIntegration.objects.filter(pk=self.pk).update(
+            alerts_received_24h=F('alerts_received_24h') + count,
+            last_alert_received=self.last_alert_received
+        )
+        self.alerts_received_24h += count
+    
+    def increment_error_count(self, count=1):
+        """Incrémente le compteur d'erreurs (UPDATE atomique en base)"""
+        ClientIntegration.objects.filter(pk=self.pk).update(error_count_24h=F('error_count_24h') + count)
+        self.error_count_24h += count
 
 
 class IntegrationLog(models.Model):
@@ -79,6 +106,7 @@ class IntegrationLog(models.Model):
     LOG_TYPES = [
         ('alert_received', 'Alert Received'),
         ('alert_processed', 'Alert Processed'),
+        ('alert_batch', 'Alert Batch Processed'),
         ('error', 'Error'),
         ('connection_test', 'Connection Test'),
         ('sync_started', 'Sync Started'),
@@ -86,14 +114,20 @@ class IntegrationLog(models.Model):
     ]
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    integration = models.ForeignKey(ClientIntegration, on_delete=models.CASCADE, related_name='logs')
+    # Nul pour les logs des connexions WebSocket, sans intégration associée
+    integration = models.ForeignKey(ClientIntegration, on_delete=models.CASCADE, null=True, blank=True, related_name='logs')
     log_type = models.CharField(max_length=20, choices=LOG_TYPES)
     message = models.TextField()
-    details = models.JSONField(default=dict, blank=True)
+    details = MsgspecJSONField(default=dict, blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['-timestamp']),
+            models.Index(fields=['integration', 'log_type', '-timestamp']),
+            models.Index(fields=['log_type', '-timestamp']),
+        ]
     
     def __str__(self):
         return f"{self.integration} - {self.log_type} - {self.timestamp}"
@@ -119,7 +153,7 @@ class AlertMappingTemplate(models.Model):
     
     name = models.CharField(max_length=100)
     system_type = models.CharField(max_length=50, choices=SYSTEM_TYPES)
-    mapping_config = models.JSONField(help_text="Configuration de mapping par défaut")
+    mapping_config = MsgspecJSONField(help_text="Configuration de mapping par défaut")
     description = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -129,3 +163,41 @@ class AlertMappingTemplate(models.Model):
     
     def __str__(self):
         return f"{self.name} ({self.system_type})"
+
+
+def _integration_token_cache_key(api_token):
+    digest = hashlib.blake2b(api_token.encode(), digest_size=16).hexdigest()
+    return f"integr:v1:token:{digest}"
+
+
+def get_active_integration_by_token(api_token):
+    """
+    Intégration active d'un token de webhook, avec son client
+    
+    Mise en cache INTEGRATION_TOKEN_CACHE_TTL secondes ; les tokens inconnus ne
+    sont pas mis en cache. Lève ClientIntegration.DoesNotExist.
+    """
+    key = _integration_token_cache_key(api_token)
+    integration = cache.get(key)
+    if integration is None:
+        integration = ClientIntegration.objects.select_related('client').get(
+            api_token=api_token,
+            is_active=True
+        )
+        cache.set(key, integration, settings.INTEGRATION_TOKEN_CACHE_TTL)
+    return integration
+
+
+def invalidate_integration_token_cache(*api_tokens):
+    """Retire les intégrations mises en cache pour ces tokens"""
+    cache.delete_many([_integration_token_cache_key(token) for token in api_tokens if token])
+
+
+@receiver(post_save, sender=ClientIntegration)
+@receiver(post_delete, sender=ClientIntegration)
+def integration_changed_handler(sender, instance, **kwargs):
+    """Retire l'intégration du cache des tokens (ancien et nouveau token)"""
+    update_fields = kwargs.get('update_fields')
+    if update_fields and update_fields <= ClientIntegration.SYNC_STATUS_FIELDS:
+        return
+    invalidate_integration_token_cache(instance.api_token, getattr(instance, '_loaded_api_token', None))
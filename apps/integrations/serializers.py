@@ -1,26 +1,27 @@
+from datetime import timezone
+
 from rest_framework import serializers
 from .models import ClientIntegration, IntegrationLog, AlertMappingTemplate
+from apps.alerts.serializers import AlertCreateSerializer
 
 
 class ClientIntegrationSerializer(serializers.ModelSerializer):
     client_name = serializers.CharField(source='client.name', read_only=True)
-    last_sync_formatted = serializers.SerializerMethodField()
+    # Formaté en UTC, comme la valeur stockée
+    last_sync_formatted = serializers.DateTimeField(
+        source='last_sync', format='%Y-%m-%d %H:%M:%S', default_timezone=timezone.utc, read_only=True
+    )
     
     class Meta:
         model = ClientIntegration
         fields = [
             'id', 'client', 'client_name', 'integration_type', 'name',
-            'endpoint_url', 'api_token', 'mapping_config', 'is_active',
+            'endpoint_url', 'api_token', 'mapping_config', 'store_raw_payload', 'is_active',
             'last_sync', 'last_sync_formatted', 'status', 'error_message',
             'alerts_received_24h', 'last_alert_received', 'error_count_24h',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'last_sync', 'alerts_received_24h', 'error_count_24h']
-    
-    def get_last_sync_formatted(self, obj):
-        if obj.last_sync:
-            return obj.last_sync.strftime('%Y-%m-%d %H:%M:%S')
-        return None
 
 
 class IntegrationLogSerializer(serializers.ModelSerializer):
@@ -46,6 +47,17 @@ class AlertMappingTemplateSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
+class WebhookMappedAlertSerializer(AlertCreateSerializer):
+    """
+    Validation d'une alerte mappée reçue par webhook
+    
+    Le client est celui de l'intégration, il n'est pas relu pour chaque alerte.
+    """
+    
+    class Meta(AlertCreateSerializer.Meta):
+        fields = [field for field in AlertCreateSerializer.Meta.fields if field != 'client']
+
+
 class WebhookAlertSerializer(serializers.Serializer):
     """Serializer pour les alertes reçues via webhook"""
     external_id = serializers.CharField(help_text="ID de l'alerte dans le système client")
@@ -1,12 +1,24 @@
-import json
+import asyncio
 import logging
+import msgspec
 from channels.generic.websocket import AsyncWebsocketConsumer
-from channels.db import database_sync_to_async
-from asgiref.sync import sync_to_async
-from .models import IntegrationLog
+from . import ingest
 
 logger = logging.getLogger(__name__)
 
+# Codec JSON des trames WebSocket (les trames restent envoyées en texte)
+_encoder = msgspec.json.Encoder()
+_decoder = msgspec.json.Decoder()
+
+
+def _dumps(data) -> str:
+    """Encode une trame en texte JSON"""
+    return _encoder.encode(data).decode()
+
+
+# Trames en attente d'envoi par connexion ; au-delà, le client est jugé trop lent et déconnecté
+OUTBOUND_QUEUE_SIZE = 1024
+
 
 class AlertStreamingConsumer(AsyncWebsocketConsumer):
     """Consumer WebSocket pour le streaming des alertes en temps réel"""
@@ -15,6 +27,10 @@ class AlertStreamingConsumer(AsyncWebsocketConsumer):
         """Connexion WebSocket"""
         self.room_group_name = 'alerts_stream'
         
+        # File de sortie vidée par une tâche dédiée : les handlers de groupe ne bloquent pas sur un client lent
+        self.out_q = asyncio.Queue(maxsize=OUTBOUND_QUEUE_SIZE)
+        self.writer = asyncio.create_task(self._writer())
+        
         # Rejoindre le groupe
         await self.channel_layer.group_add(
             self.room_group_name,
@@ -30,6 +46,10 @@ class AlertStreamingConsumer(AsyncWebsocketConsumer):
     
     async def disconnect(self, close_code):
         """Déconnexion WebSocket"""
+        writer = getattr(self, 'writer', None)
+        if writer is not None:
+            writer.cancel()
+        
         # Quitter le groupe
         await self.channel_layer.group_discard(
             self.room_group_name,
@@ -44,78 +64,86 @@ class AlertStreamingConsumer(AsyncWebsocketConsumer):
     async def receive(self, text_data):
         """Réception de messages du client"""
         try:
-            data = json.loads(text_data)
+            data = _decoder.decode(text_data)
             message_type = data.get('type')
             
             if message_type == 'ping':
-                await self.send(text_data=json.dumps({
+                await self.send(text_data=_dumps({
                     'type': 'pong',
                     'timestamp': self.get_timestamp()
                 }))
             elif message_type == 'subscribe':
                 # Le client peut s'abonner à des types d'alertes spécifiques
-                await self.send(text_data=json.dumps({
+                await self.send(text_data=_dumps({
                     'type': 'subscribed',
                     'message': 'Successfully subscribed to alerts'
                 }))
             else:
-                await self.send(text_data=json.dumps({
+                await self.send(text_data=_dumps({
                     'type': 'error',
                     'message': 'Unknown message type'
                 }))
                 
-        except json.JSONDecodeError:
-            await self.send(text_data=json.dumps({
+        except msgspec.DecodeError:
+            await self.send(text_data=_dumps({
                 'type': 'error',
                 'message': 'Invalid JSON'
             }))
         except Exception as e:
             logger.error(f"Error in WebSocket receive: {str(e)}")
-            await self.send(text_data=json.dumps({
+            await self.send(text_data=_dumps({
                 'type': 'error',
                 'message': 'Internal error'
             }))
     
+    async def _writer(self):
+        """Envoie au client, dans l'ordre, les trames mises en file par les handlers de groupe"""
+        while True:
+            frame = await self.out_q.get()
+            try:
+                await self.send(text_data=frame)
+            except Exception as e:
+                logger.error(f"Error sending WebSocket frame: {str(e)}")
+    
+    async def _enqueue(self, frame):
+        """Met une trame en file d'envoi ; ferme la connexion si le client ne suit plus"""
+        if self.writer.done():
+            return False
+        try:
+            self.out_q.put_nowait(frame)
+            return True
+        except asyncio.QueueFull:
+            logger.warning(f"WebSocket outbound queue full, closing: {self.channel_name}")
+            self.writer.cancel()
+            await self.close(code=1013)
+            return False
+    
     async def alert_notification(self, event):
-        """Envoi d'une notification d'alerte au client"""
+        """Envoi d'une notification d'alerte au client (trame déjà encodée par publish_alert)"""
         try:
-            # Préparer les données de l'alerte
-            alert_data = {
-                'type': 'alert',
-                'alert_id': event['alert_id'],
-                'client': event['client'],
-                'severity': event['severity'],
-                'risk_score': event['risk_score'],
-                'title': event['title'],
-                'alert_type': event['alert_type'],
-                'timestamp': event['timestamp'],
-                'source_ip': event.get('source_ip', ''),
-                'destination_ip': event.get('destination_ip', ''),
-            }
+            if await self._enqueue(event['frame']):
+                # Log de l'envoi
+                await self.log_alert_sent(event['alert_id'])
             
-            # Envoyer au client
-            await self.send(text_data=json.dumps(alert_data))
+        except Exception as e:
+            logger.error(f"Error sending alert notification: {str(e)}")
+    
+    async def alerts_batch(self, event):
+        """Envoi d'un lot d'alertes au client (trames déjà encodées par publish_alerts)"""
+        try:
+            for frame in event['frames']:
+                if not await self._enqueue(frame):
+                    return
             
-            # Log de l'envoi
-            await self.log_alert_sent(event['alert_id'])
+            await self.log_alert_sent(f"{len(event['frames'])} alerts")
             
         except Exception as e:
-            logger.error(f"Error sending alert notification: {str(e)}")
+            logger.error(f"Error sending alerts batch: {str(e)}")
     
     async def integration_status_update(self, event):
         """Envoi d'une mise à jour de statut d'intégration"""
         try:
-            status_data = {
-                'type': 'integration_status',
-                'integration_id': event['integration_id'],
-                'integration_name': event['integration_name'],
-                'client': event['client'],
-                'status': event['status'],
-                'message': event['message'],
-                'timestamp': event['timestamp']
-            }
-            
-            await self.send(text_data=json.dumps(status_data))
+            await self._enqueue(event['frame'])
             
         except Exception as e:
             logger.error(f"Error sending integration status update: {str(e)}")
@@ -123,7 +151,7 @@ class AlertStreamingConsumer(AsyncWebsocketConsumer):
     async def log_connection(self, action):
         """Log de connexion/déconnexion"""
         try:
-            await database_sync_to_async(IntegrationLog.objects.create)(
+            await ingest.aemit(
                 integration=None,  # Pas d'intégration spécifique pour les connexions WebSocket
                 log_type='connection_test',
                 message=f"WebSocket {action}",
@@ -135,7 +163,7 @@ class AlertStreamingConsumer(AsyncWebsocketConsumer):
     async def log_alert_sent(self, alert_id):
         """Log d'envoi d'alerte"""
         try:
-            await database_sync_to_async(IntegrationLog.objects.create)(
+            await ingest.aemit(
                 integration=None,
                 log_type='alert_processed',
                 message=f"Alert {alert_id} sent via WebSocket",
@@ -159,24 +187,20 @@ class AlertStreamingService:
         self.room_group_name = 'alerts_stream'
     
     async def publish_alert(self, alert):
-        """Publie une alerte via WebSocket"""
+        """
+        Publie une alerte via WebSocket
+        
+        La trame envoyée aux clients est encodée une seule fois ici, puis
+        relayée telle quelle par chaque consumer du groupe.
+        """
         try:
-            alert_data = {
-                'type': 'alert_notification',
-                'alert_id': alert.alert_id,
-                'client': alert.client.name,
-                'severity': alert.severity,
-                'risk_score': alert.risk_score,
-                'title': alert.title,
-                'alert_type': alert.alert_type,
-                'timestamp': alert.detected_at.isoformat(),
-                'source_ip': alert.source_ip or '',
-                'destination_ip': alert.destination_ip or '',
-            }
-            
             await self.channel_layer.group_send(
                 self.room_group_name,
-                alert_data
+                {
+                    'type': 'alert_notification',
+                    'alert_id': alert.alert_id,
+                    'frame': _dumps(self._alert_frame(alert))
+                }
             )
             
             logger.info(f"Alert {alert.alert_id} published via WebSocket")
@@ -184,11 +208,47 @@ class AlertStreamingService:
         except Exception as e:
             logger.error(f"Error publishing alert via WebSocket: {str(e)}")
     
+    async def publish_alerts(self, alerts):
+        """
+        Publie plusieurs alertes en un seul message de groupe
+        
+        Le client de chaque alerte doit déjà être chargé (aucune requête ici).
+        """
+        try:
+            await self.channel_layer.group_send(
+                self.room_group_name,
+                {
+                    'type': 'alerts_batch',
+                    'frames': [_dumps(self._alert_frame(alert)) for alert in alerts]
+                }
+            )
+            
+            logger.info(f"{len(alerts)} alerts published via WebSocket")
+            
+        except Exception as e:
+            logger.error(f"Error publishing alerts via WebSocket: {str(e)}")
+    
+    @staticmethod
+    def _alert_frame(alert):
+        """Trame d'une alerte telle que reçue par les clients WebSocket"""
+        return {
+            'type': 'alert',
+            'alert_id': alert.alert_id,
+            'client': alert.client.name,
+            'severity': alert.severity,
+            'risk_score': alert.risk_score,
+            'title': alert.title,
+            'alert_type': alert.alert_type,
+            'timestamp': alert.detected_at.isoformat(),
+            'source_ip': alert.source_ip or '',
+            'destination_ip': alert.destination_ip or '',
+        }
+    
     async def publish_integration_status(self, integration, status, message):
         """Publie une mise à jour de statut d'intégration"""
         try:
             status_data = {
-                'type': 'integration_status_update',
+                'type': 'integration_status',
                 'integration_id': str(integration.id),
                 'integration_name': integration.name,
                 'client': integration.client.name,
@@ -199,7 +259,10 @@ class AlertStreamingService:
             
             await self.channel_layer.group_send(
                 self.room_group_name,
-                status_data
+                {
+                    'type': 'integration_status_update',
+                    'frame': _dumps(status_data)
+                }
             )
             
             logger.info(f"Integration status update published: {integration.name}")
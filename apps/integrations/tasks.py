@@ -0,0 +1,74 @@
+"""
+Celery tasks for client integrations.
+"""
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from datetime import timedelta
+import logging
+
+from .mappers import processed_counter_key
+from .models import ClientIntegration, IntegrationLog
+
+logger = logging.getLogger(__name__)
+
+# Minutes looked back, so a late or skipped beat does not lose counters
+ROLLUP_LOOKBACK_MINUTES = 5
+
+
+@shared_task
+def rollup_processed_alert_logs():
+    """
+    Write one alert_batch IntegrationLog per integration and elapsed minute
+    from the counters kept by ClientAlertMapper._log_alert_processed.
+    
+    The counters live in the Django cache, so web processes and workers must
+    share a cache backend (Redis) for the rollup to see them.
+    """
+    if settings.INTEGRATION_LOG_SAMPLE_RATE <= 1:
+        # Sampling off: no counters are written
+        return 0
+    
+    try:
+        current_minute = timezone.now().replace(second=0, microsecond=0)
+        minutes = [current_minute - timedelta(minutes=offset) for offset in range(1, ROLLUP_LOOKBACK_MINUTES + 1)]
+        
+        keys = {}
+        for integration in ClientIntegration.objects.only('id', 'client_id'):
+            for minute in minutes:
+                keys[processed_counter_key(integration.pk, minute)] = (integration, minute)
+        
+        counts = cache.get_many(list(keys))
+        logs = []
+        for key, count in counts.items():
+            if not count:
+                continue
+            integration, minute = keys[key]
+            logs.append(IntegrationLog(
+                integration=integration,
+                log_type='alert_batch',
+                message=f"{count} alertes traitées à {minute:%H:%M}",
+                details={
+                    'count': count,
+                    'minute': minute.isoformat(),
+                    'sample_rate': settings.INTEGRATION_LOG_SAMPLE_RATE
+                }
+            ))
+        
+        if logs:
+            IntegrationLog.objects.bulk_create(logs)
+        
+        # Subtract what was rolled up instead of deleting the keys, so alerts
+        # counted between get_many and decr are kept for the next run
+        for key, count in counts.items():
+            if count:
+                try:
+                    cache.decr(key, count)
+                except ValueError:
+                    pass
+        return len(logs)
+    
+    except Exception as e:
+        logger.error(f"Error rolling up processed alert logs: {str(e)}")
+        raise
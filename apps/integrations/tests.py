@@ -0,0 +1,175 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from apps.accounts.models import Client
+from apps.alerts.models import Alert
+from .mappers import ClientAlertMapper, MappingConfigGenerator
+from .models import ClientIntegration, IntegrationLog
+from .tasks import rollup_processed_alert_logs
+
+
+class ClientAlertMapperTests(TestCase):
+    """Tests du mapping avec une configuration par défaut du générateur"""
+
+    def setUp(self):
+        client = Client.objects.create(
+            name='Acme', contact_email='soc@acme.test', contact_phone='+33123456789'
+        )
+        self.integration = ClientIntegration.objects.create(
+            client=client,
+            integration_type='fortinet',
+            name='Acme FortiGate',
+            mapping_config=MappingConfigGenerator.get_default_mapping('fortinet'),
+        )
+
+    def test_builtin_field_names_win_over_configured_paths(self):
+        mapped = ClientAlertMapper(self.integration).map_alert({
+            'level': 'emergency',
+            'severity': 'critical',
+            'title': 'Real title',
+            'action': 'blocked',
+            'time': '10:11:12',
+            'timestamp': '2024-01-02T03:04:05Z',
+        })
+
+        self.assertEqual(mapped['severity'], 'critical')
+        self.assertEqual(mapped['title'], 'Real title')
+        self.assertEqual(mapped['detected_at'].date().isoformat(), '2024-01-02')
+
+    def test_configured_paths_fill_missing_fields(self):
+        mapped = ClientAlertMapper(self.integration).map_alert({
+            'logid': '0100032001',
+            'action': 'blocked',
+            'msg': 'Administrator login failed',
+        })
+
+        self.assertEqual(mapped['alert_id'], '0100032001')
+        self.assertEqual(mapped['title'], 'blocked')
+        self.assertEqual(mapped['description'], 'Administrator login failed')
+
+
+class ClientWebhookBulkTests(TestCase):
+    """Tests du webhook bulk"""
+
+    def setUp(self):
+        self.client_obj = Client.objects.create(
+            name='Acme', contact_email='soc@acme.test', contact_phone='+33123456789'
+        )
+        self.integration = ClientIntegration.objects.create(
+            client=self.client_obj,
+            integration_type='webhook',
+            name='Acme webhook',
+            api_token='bulk-test-token',
+            is_active=True,
+        )
+        self.api = APIClient()
+
+    def _alert(self, external_id):
+        return {
+            'external_id': external_id,
+            'title': 'Suspicious login',
+            'description': 'Multiple failed login attempts',
+            'severity': 'high',
+            'alert_type': 'intrusion',
+            'source_ip': '10.0.0.1',
+            'destination_ip': '10.0.0.2',
+            'timestamp': '2026-10-16T10:00:00Z',
+        }
+
+    def _post(self, alerts):
+        return self.api.post(
+            '/api/integrations/webhook/bulk/', alerts, format='json',
+            HTTP_X_CLIENT_TOKEN='bulk-test-token'
+        )
+
+    def test_duplicate_alert_id_in_batch_is_rejected(self):
+        response = self._post([self._alert('DUP-1'), self._alert('DUP-1'), self._alert('DUP-2')])
+
+        self.assertEqual(response.status_code, 201)
+        data = response.json()
+        self.assertEqual(data['created'], 2)
+        self.assertEqual([error['index'] for error in data['errors']], [1])
+        self.assertEqual(Alert.objects.filter(client=self.client_obj).count(), 2)
+
+        self.integration.refresh_from_db()
+        self.assertEqual(self.integration.alerts_received_24h, 2)
+        self.assertEqual(self.integration.error_count_24h, 1)
+
+        log = IntegrationLog.objects.get(
+            integration=self.integration, log_type='alert_processed', message__startswith='Lot traité'
+        )
+        self.assertEqual(sorted(log.details['alert_ids']), ['DUP-1', 'DUP-2'])
+
+    def test_bulk_alerts_are_scored(self):
+        self._post([self._alert('SCORE-1'), self._alert('SCORE-2')])
+
+        for alert in Alert.objects.filter(alert_id__in=['SCORE-1', 'SCORE-2']):
+            self.assertGreater(alert.risk_score, 0.0)
+            self.assertIn('components', alert.risk_factors)
+
+    def test_already_known_alert_id_is_rejected(self):
+        self._post([self._alert('KNOWN-1')])
+
+        response = self._post([self._alert('KNOWN-1'), self._alert('NEW-1')])
+
+        data = response.json()
+        self.assertEqual(data['created'], 1)
+        self.assertEqual([error['index'] for error in data['errors']], [0])
+        self.assertEqual(Alert.objects.filter(alert_id='KNOWN-1').count(), 1)
+
+
+class IntegrationLogSamplingTests(TestCase):
+    """Tests de l'échantillonnage des logs par alerte"""
+
+    def setUp(self):
+        cache.clear()
+        client = Client.objects.create(
+            name='Acme', contact_email='soc@acme.test', contact_phone='+33123456789'
+        )
+        self.integration = ClientIntegration.objects.create(
+            client=client,
+            integration_type='webhook',
+            name='Acme webhook',
+            api_token='sampling-test-token',
+            is_active=True,
+        )
+        self.api = APIClient()
+
+    def _post_alerts(self, count):
+        for i in range(count):
+            self.api.post('/api/integrations/webhook/', {
+                'external_id': f'SMP-{i}',
+                'title': 'Suspicious login',
+                'description': 'Multiple failed login attempts',
+                'severity': 'high',
+                'alert_type': 'intrusion',
+                'source_ip': '10.0.0.1',
+                'destination_ip': '10.0.0.2',
+                'timestamp': '2026-10-16T10:00:00Z',
+            }, format='json', HTTP_X_CLIENT_TOKEN='sampling-test-token')
+
+    @override_settings(INTEGRATION_LOG_SAMPLE_RATE=10)
+    def test_single_webhook_logs_are_sampled_per_alert(self):
+        # Même minute pour tout le lot : un seul compteur
+        with mock.patch('apps.integrations.mappers.timezone.now', return_value=timezone.now()):
+            self._post_alerts(10)
+
+        self.assertEqual(Alert.objects.filter(alert_id__startswith='SMP-').count(), 10)
+        logs = IntegrationLog.objects.filter(integration=self.integration)
+        self.assertEqual(logs.filter(log_type='alert_received').count(), 1)
+        self.assertEqual(logs.filter(log_type='alert_processed').count(), 2)
+
+    def test_every_alert_is_logged_without_sampling(self):
+        self._post_alerts(3)
+
+        logs = IntegrationLog.objects.filter(integration=self.integration)
+        self.assertEqual(logs.filter(log_type='alert_received').count(), 3)
+        self.assertEqual(logs.filter(log_type='alert_processed').count(), 6)
+
+    def test_rollup_is_skipped_without_sampling(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(rollup_processed_alert_logs(), 0)
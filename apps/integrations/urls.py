@@ -1,14 +1,10 @@
-from django.urls import path, include
-from rest_framework.routers import DefaultRouter
+from django.urls import path
 from . import views, webhooks
 
-# Router pour les vues basées sur les ViewSets
-router = DefaultRouter()
-router.register(r'integrations', views.ClientIntegrationListCreateView, basename='integration')
-
 urlpatterns = [
     # Webhooks (pas d'authentification requise)
     path('webhook/', webhooks.client_webhook, name='client_webhook'),
+    path('webhook/bulk/', webhooks.client_webhook_bulk, name='client_webhook_bulk'),
     path('webhook/status/', webhooks.webhook_status, name='webhook_status'),
     path('webhook/test/', webhooks.test_webhook, name='test_webhook'),
     
@@ -2,6 +2,7 @@ from rest_framework import generics, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from django.db.models import Count, Q, Sum
 from django.shortcuts import get_object_or_404
 from .models import ClientIntegration, IntegrationLog, AlertMappingTemplate
 from .serializers import (
@@ -20,9 +21,9 @@ class ClientIntegrationListCreateView(generics.ListCreateAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.role in ['admin', 'soc_analyst']:
-            return ClientIntegration.objects.all()
+            return ClientIntegration.objects.select_related('client')
         elif user.role == 'client' and hasattr(user, 'client'):
-            return ClientIntegration.objects.filter(client=user.client)
+            return ClientIntegration.objects.filter(client=user.client).select_related('client')
         return ClientIntegration.objects.none()
 
 
@@ -34,9 +35,9 @@ class ClientIntegrationDetailView(generics.RetrieveUpdateDestroyAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.role in ['admin', 'soc_analyst']:
-            return ClientIntegration.objects.all()
+            return ClientIntegration.objects.select_related('client')
         elif user.role == 'client' and hasattr(user, 'client'):
-            return ClientIntegration.objects.filter(client=user.client)
+            return ClientIntegration.objects.filter(client=user.client).select_related('client')
         return ClientIntegration.objects.none()
 
 
@@ -48,10 +49,17 @@ class IntegrationLogListView(generics.ListAPIView):
     def get_queryset(self):
         user = self.request.user
         if user.role in ['admin', 'soc_analyst']:
-            return IntegrationLog.objects.all()
+            queryset = IntegrationLog.objects.all()
         elif user.role == 'client' and hasattr(user, 'client'):
-            return IntegrationLog.objects.filter(integration__client=user.client)
-        return IntegrationLog.objects.none()
+            queryset = IntegrationLog.objects.filter(integration__client=user.client)
+        else:
+            return IntegrationLog.objects.none()
+        
+        # Columns read by IntegrationLogSerializer only
+        return queryset.select_related('integration__client').only(
+            'id', 'integration', 'log_type', 'message', 'details', 'timestamp',
+            'integration__name', 'integration__client__name'
+        )
 
 
 class AlertMappingTemplateListView(generics.ListAPIView):
@@ -102,26 +110,28 @@ def sync_integration_alerts(request, integration_id):
     if user.role == 'client' and hasattr(user, 'client') and integration.client != user.client:
         return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
     
+    # Les logs de la synchronisation sont écrits ensemble à la fin
+    logs = []
     try:
         # TODO: Implémenter la synchronisation selon le type d'intégration
         # Pour l'instant, on simule une synchronisation réussie
         
-        IntegrationLog.objects.create(
+        logs.append(IntegrationLog(
             integration=integration,
             log_type='sync_started',
             message='Synchronization started',
             details={'requested_by': user.email}
-        )
+        ))
         
         # Simulation d'une synchronisation
         integration.update_sync_status(success=True)
         
-        IntegrationLog.objects.create(
+        logs.append(IntegrationLog(
             integration=integration,
             log_type='sync_completed',
             message='Synchronization completed successfully',
             details={'alerts_processed': 0}  # À remplacer par le vrai nombre
-        )
+        ))
         
         return Response({
             'success': True,
@@ -130,17 +140,20 @@ def sync_integration_alerts(request, integration_id):
         })
         
     except Exception as e:
-        IntegrationLog.objects.create(
+        logs.append(IntegrationLog(
             integration=integration,
             log_type='error',
             message=f'Synchronization failed: {str(e)}',
             details={'error': str(e)}
-        )
+        ))
         
         return Response({
             'success': False,
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    
+    finally:
+        IntegrationLog.objects.bulk_create(logs)
 
 
 @api_view(['GET'])
@@ -156,26 +169,35 @@ def integration_statistics(request):
     else:
         return Response({'error': 'Permission denied'}, status=status.HTTP_403_FORBIDDEN)
     
+    totals = integrations.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+        error=Count('id', filter=Q(status='error')),
+        alerts_24h=Sum('alerts_received_24h'),
+        errors_24h=Sum('error_count_24h'),
+    )
     stats = {
-        'total_integrations': integrations.count(),
-        'active_integrations': integrations.filter(is_active=True).count(),
-        'error_integrations': integrations.filter(status='error').count(),
-        'total_alerts_24h': sum(integration.alerts_received_24h for integration in integrations),
-        'total_errors_24h': sum(integration.error_count_24h for integration in integrations),
+        'total_integrations': totals['total'],
+        'active_integrations': totals['active'],
+        'error_integrations': totals['error'],
+        'total_alerts_24h': totals['alerts_24h'] or 0,
+        'total_errors_24h': totals['errors_24h'] or 0,
         'integrations_by_type': {},
         'recent_logs': []
     }
     
-    # Statistiques par type
+    # Statistiques par type (un seul GROUP BY, dans l'ordre de INTEGRATION_TYPES)
+    counts_by_type = dict(
+        integrations.order_by().values_list('integration_type').annotate(count=Count('id'))
+    )
     for integration_type, _ in ClientIntegration.INTEGRATION_TYPES:
-        count = integrations.filter(integration_type=integration_type).count()
-        if count > 0:
-            stats['integrations_by_type'][integration_type] = count
+        if counts_by_type.get(integration_type):
+            stats['integrations_by_type'][integration_type] = counts_by_type[integration_type]
     
     # Logs récents
     recent_logs = IntegrationLog.objects.filter(
         integration__in=integrations
-    ).order_by('-timestamp')[:10]
+    ).select_related('integration__client').order_by('-timestamp')[:10]
     
     stats['recent_logs'] = IntegrationLogSerializer(recent_logs, many=True).data
     
@@ -5,17 +5,20 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils.decorators import method_decorator
 from django.views import View
+from asgiref.sync import async_to_sync
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from rest_framework import status
-from .models import ClientIntegration, IntegrationLog
+from .models import ClientIntegration, get_active_integration_by_token
 from .mappers import ClientAlertMapper
-from .serializers import WebhookAlertSerializer
-from apps.alerts.models import Alert
-from apps.alerts.serializers import AlertCreateSerializer
+from .serializers import WebhookAlertSerializer, WebhookMappedAlertSerializer
+from apps.alerts.models import Alert, compute_raw_data_size
+from apps.analytics.services import RiskScoringService, invalidate_risk_stats_cache
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +45,8 @@ def client_webhook(request):
         "raw_data": {...}
     }
     """
+    # Les logs de la requête sont écrits ensemble à la fin du traitement
+    mapper = None
     try:
         # Récupération du token client
         client_token = request.headers.get('X-Client-Token')
@@ -53,10 +58,7 @@ def client_webhook(request):
         
         # Recherche de l'intégration correspondante
         try:
-            integration = ClientIntegration.objects.get(
-                api_token=client_token,
-                is_active=True
-            )
+            integration = get_active_integration_by_token(client_token)
         except ClientIntegration.DoesNotExist:
             return Response(
                 {'error': 'Invalid or inactive client token'}, 
@@ -72,18 +74,22 @@ def client_webhook(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        mapper = ClientAlertMapper(integration)
+        
+        # Une seule décision d'échantillonnage pour tous les logs de cette alerte
+        keep_logs = mapper.sample_alert_logs()
+        
         # Log de l'alerte reçue
-        IntegrationLog.objects.create(
-            integration=integration,
-            log_type='alert_received',
-            message=f"Alerte reçue: {raw_data.get('external_id', 'unknown')}",
-            details={'raw_data_keys': list(raw_data.keys())}
-        )
+        if keep_logs:
+            mapper.add_log(
+                log_type='alert_received',
+                message=f"Alerte reçue: {raw_data.get('external_id', 'unknown')}",
+                details={'raw_data_keys': list(raw_data.keys())}
+            )
         
         # Mapping des données
         try:
-            mapper = ClientAlertMapper(integration)
-            mapped_data = mapper.map_alert(raw_data)
+            mapped_data = mapper.map_alert(raw_data, keep_logs=keep_logs)
         except Exception as e:
             logger.error(f"Erreur de mapping pour l'intégration {integration}: {str(e)}")
             integration.increment_error_count()
@@ -94,26 +100,26 @@ def client_webhook(request):
         
         # Création de l'alerte
         try:
-            # Utiliser le serializer existant pour créer l'alerte
-            alert_serializer = AlertCreateSerializer(data=mapped_data)
+            # Le client de l'intégration (déjà chargé) est passé à save()
+            alert_serializer = WebhookMappedAlertSerializer(data=mapped_data)
             if alert_serializer.is_valid():
-                alert = alert_serializer.save()
+                alert = alert_serializer.save(client=integration.client)
                 
                 # Mise à jour des statistiques
                 integration.increment_alert_count()
                 integration.update_sync_status(success=True)
                 
                 # Log de succès
-                IntegrationLog.objects.create(
-                    integration=integration,
-                    log_type='alert_processed',
-                    message=f"Alerte créée avec succès: {alert.alert_id}",
-                    details={
-                        'alert_id': alert.alert_id,
-                        'risk_score': alert.risk_score,
-                        'severity': alert.severity
-                    }
-                )
+                if keep_logs:
+                    mapper.add_log(
+                        log_type='alert_processed',
+                        message=f"Alerte créée avec succès: {alert.alert_id}",
+                        details={
+                            'alert_id': alert.alert_id,
+                            'risk_score': alert.risk_score,
+                            'severity': alert.severity
+                        }
+                    )
                 
                 return Response({
                     'success': True,
@@ -146,6 +152,168 @@ def client_webhook(request):
             {'error': 'Internal server error'}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+    
+    finally:
+        if mapper is not None:
+            try:
+                mapper.flush_logs()
+            except Exception as e:
+                logger.error(f"Error writing integration logs: {str(e)}")
+
+
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def client_webhook_bulk(request):
+    """
+    Webhook bulk : plusieurs alertes d'un client en un seul appel
+    
+    Headers requis:
+    - X-Client-Token: Token d'authentification du client
+    
+    Body JSON: liste d'alertes au format de client_webhook (au plus
+    WEBHOOK_BULK_MAX_ALERTS), par exemple
+    [
+        {"external_id": "ALERT-123", "title": "...", "severity": "high", ...},
+        {"external_id": "ALERT-124", "title": "...", "severity": "low", ...}
+    ]
+    
+    Les alertes valides sont insérées en une transaction (bulk_create) ; les
+    alertes invalides sont retournées avec leur index, y compris les alertes
+    déjà connues et les alert_id répétés dans le lot. Le score de risque est
+    calculé pour tout le lot avant l'insertion (bulk_create n'envoie pas
+    post_save) ; les alertes sont publiées via WebSocket en un seul message
+    de groupe.
+    """
+    mapper = None
+    try:
+        client_token = request.headers.get('X-Client-Token')
+        if not client_token:
+            return Response(
+                {'error': 'X-Client-Token header required'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            integration = get_active_integration_by_token(client_token)
+        except ClientIntegration.DoesNotExist:
+            return Response(
+                {'error': 'Invalid or inactive client token'}, 
+                status=status.HTTP_401_UNAUTHORIZED
+            )
+        
+        raw_alerts = request.data
+        if not isinstance(raw_alerts, list) or not raw_alerts:
+            return Response(
+                {'error': 'A non-empty JSON list of alerts is required'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(raw_alerts) > settings.WEBHOOK_BULK_MAX_ALERTS:
+            return Response(
+                {'error': f'At most {settings.WEBHOOK_BULK_MAX_ALERTS} alerts per call'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        mapper = ClientAlertMapper(integration)
+        mapper.add_log(
+            log_type='alert_received',
+            message=f"Lot reçu: {len(raw_alerts)} alertes",
+            details={'count': len(raw_alerts)}
+        )
+        
+        # Mapping et validation de chaque alerte
+        alerts = []
+        errors = []
+        seen_alert_ids = set()
+        for index, raw_data in enumerate(raw_alerts):
+            try:
+                if not isinstance(raw_data, dict):
+                    raise ValueError('alert must be a JSON object')
+                mapped_data = mapper.map_alert(raw_data)
+            except Exception as e:
+                errors.append({'index': index, 'error': f'Mapping error: {str(e)}'})
+                continue
+            
+            alert_serializer = WebhookMappedAlertSerializer(data=mapped_data)
+            if not alert_serializer.is_valid():
+                errors.append({'index': index, 'error': alert_serializer.errors})
+                continue
+            
+            validated_data = alert_serializer.validated_data
+            if validated_data['alert_id'] in seen_alert_ids:
+                errors.append({'index': index, 'error': {'alert_id': ['Duplicate alert_id in batch']}})
+                continue
+            seen_alert_ids.add(validated_data['alert_id'])
+            alerts.append(Alert(
+                client=integration.client,
+                status='in_progress',
+                raw_data_size=compute_raw_data_size(validated_data.get('raw_data')),
+                **validated_data
+            ))
+        
+        if alerts:
+            # Score du lot en une passe, à la place du signal post_save
+            for alert, (score, factors) in zip(alerts, RiskScoringService().score_many(alerts)):
+                alert.risk_score = score
+                alert.risk_factors = factors
+            
+            try:
+                with transaction.atomic():
+                    alerts = Alert.objects.bulk_create(alerts, batch_size=500)
+            except IntegrityError:
+                # Alerte insérée par un autre appel entre la validation et l'insertion
+                return Response(
+                    {'error': 'Some alerts were created concurrently, retry the batch'}, 
+                    status=status.HTTP_409_CONFLICT
+                )
+            
+            # bulk_create n'envoie pas post_save
+            invalidate_risk_stats_cache(integration.client_id)
+            _publish_alerts(alerts)
+            integration.increment_alert_count(len(alerts))
+            integration.update_sync_status(success=True)
+            mapper.add_log(
+                log_type='alert_processed',
+                message=f"Lot traité: {len(alerts)} alertes créées, {len(errors)} rejetées",
+                details={
+                    'alert_ids': [alert.alert_id for alert in alerts],
+                    'rejected': len(errors)
+                }
+            )
+        if errors:
+            logger.error(f"Bulk webhook for {integration}: {len(errors)} alerts rejected")
+            integration.increment_error_count(len(errors))
+        
+        return Response({
+            'success': bool(alerts),
+            'received': len(raw_alerts),
+            'created': len(alerts),
+            'errors': errors
+        }, status=status.HTTP_201_CREATED if alerts else status.HTTP_400_BAD_REQUEST)
+    
+    except Exception as e:
+        logger.error(f"Unexpected error in bulk webhook: {str(e)}")
+        return Response(
+            {'error': 'Internal server error'}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    
+    finally:
+        if mapper is not None:
+            try:
+                mapper.flush_logs()
+            except Exception as e:
+                logger.error(f"Error writing integration logs: {str(e)}")
+
+
+def _publish_alerts(alerts):
+    """Publie un lot d'alertes via WebSocket (optionnel)"""
+    try:
+        from apps.integrations.streaming import alert_streaming_service
+        async_to_sync(alert_streaming_service.publish_alerts)(alerts)
+    except ImportError:
+        logger.info("WebSocket not available (channels not installed)")
+    except Exception as e:
+        logger.error(f"Error publishing alerts via WebSocket: {str(e)}")
 
 
 @api_view(['GET'])
@@ -192,7 +360,10 @@ def test_webhook(request):
         }
         
         mapper = ClientAlertMapper(integration)
-        mapped_data = mapper.map_alert(test_data)
+        try:
+            mapped_data = mapper.map_alert(test_data)
+        finally:
+            mapper.flush_logs()
         
         return Response({
             'success': True,
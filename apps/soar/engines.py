@@ -365,7 +365,7 @@ class AssignAlertEngine(BaseActionEngine):
             user = User.objects.get(id=user_id)
             
             alert.assigned_to = user
-            alert.save()
+            alert.save(update_fields=['assigned_to', 'updated_at'])
             
             return {'assigned': True, 'alert_id': alert_id, 'user_id': user_id}
             
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-16 14:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('threat_intelligence', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='threatindicator',
+            index=models.Index(condition=models.Q(('threat_type__isnull', True)), fields=['id'], name='ti_unclassified_idx'),
+        ),
+    ]
@@ -106,6 +106,8 @@ class ThreatIndicator(models.Model):
             models.Index(fields=['confidence']),
             models.Index(fields=['first_seen']),
             models.Index(fields=['is_active']),
+            # Indicators still waiting for classification (classify_threat_indicators)
+            models.Index(fields=['id'], name='ti_unclassified_idx', condition=models.Q(threat_type__isnull=True)),
         ]
         unique_together = ['source', 'indicator_type', 'value']
     
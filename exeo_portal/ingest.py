@@ -0,0 +1,115 @@
+"""
+Buffered bulk writes shared by the apps that log high-volume rows
+(analytics events, integration logs).
+
+Rows are queued in a process-local ring buffer and written with a single
+multi-row INSERT as soon as the buffer reaches `threshold` rows; a daemon
+timer thread, started by the first emit() in each process, writes whatever
+is left every `interval` seconds so an idle process does not hold rows back.
+Async callers (WebSocket consumers) use aemit(), which only leaves the event
+loop when the threshold is reached. Remaining rows are flushed at
+interpreter exit. When the buffer is full the oldest rows are dropped and
+the drop is logged at the next flush.
+
+Note that auto_now_add timestamps are set when the batch is written, not
+when emit() is called.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+
+class BufferedWriter:
+    """Ring buffer of unsaved model instances written with bulk_create"""
+
+    def __init__(self, model, threshold, interval, buffer_size=10_000):
+        self.model = model
+        self.threshold = threshold
+        self.interval = interval  # seconds
+        self.buffer = deque(maxlen=buffer_size)
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._timer_pid = None
+        # flush() is guarded by its own lock, so it does not need the single
+        # thread-sensitive executor shared with the rest of the sync code.
+        self._aflush = sync_to_async(self._flush_and_close, thread_sensitive=False)
+        atexit.register(self.flush)
+
+    def _append(self, instance):
+        if len(self.buffer) == self.buffer.maxlen:
+            self.dropped += 1
+        self.buffer.append(instance)
+
+        # Threads do not survive fork: each worker process starts its own timer
+        if self._timer_pid != os.getpid():
+            self._start_timer()
+
+    def _start_timer(self):
+        with self._lock:
+            if self._timer_pid == os.getpid():
+                return
+            self._timer_pid = os.getpid()
+        threading.Thread(
+            target=self._run_timer, name=f'{self.model.__name__}-flush', daemon=True
+        ).start()
+
+    def _run_timer(self):
+        while True:
+            time.sleep(self.interval)
+            if self.buffer:
+                self._flush_and_close()
+
+    def emit(self, **kwargs):
+        """Queue an instance built from kwargs, flushing when the threshold is reached."""
+        self._append(self.model(**kwargs))
+
+        if len(self.buffer) >= self.threshold:
+            self.flush()
+
+    async def aemit(self, **kwargs):
+        """Async variant of emit(): the flush, when due, runs in a worker thread."""
+        self._append(self.model(**kwargs))
+
+        if len(self.buffer) >= self.threshold:
+            await self._aflush()
+
+    def flush(self) -> int:
+        """Write every buffered instance with bulk_create. Returns the number of rows written."""
+        with self._lock:
+            rows = []
+            while self.buffer:
+                try:
+                    rows.append(self.buffer.popleft())
+                except IndexError:
+                    break
+            dropped, self.dropped = self.dropped, 0
+
+        if dropped:
+            logger.warning(f"Dropped {dropped} {self.model.__name__} rows: buffer full")
+
+        if not rows:
+            return 0
+
+        try:
+            self.model.objects.bulk_create(rows, batch_size=self.threshold)
+        except Exception as e:
+            logger.error(f"Error flushing {len(rows)} {self.model.__name__} rows: {str(e)}")
+            return 0
+
+        return len(rows)
+
+    def _flush_and_close(self) -> int:
+        """flush() for worker threads, which do not get Django's request-end connection cleanup."""
+        close_old_connections()
+        try:
+            return self.flush()
+        finally:
+            close_old_connections()
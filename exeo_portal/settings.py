@@ -137,6 +137,16 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    # msgspec-backed JSON encoding and decoding of every API request/response
+    'DEFAULT_RENDERER_CLASSES': [
+        'apps.analytics.renderers.MsgspecJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'apps.analytics.parsers.MsgspecJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
@@ -166,6 +176,51 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    'refresh-metric-rollup': {
+        'task': 'apps.analytics.tasks.refresh_metric_rollup',
+        'schedule': 300.0,  # every 5 minutes
+    },
+    'rollup-processed-alert-logs': {
+        'task': 'apps.integrations.tasks.rollup_processed_alert_logs',
+        'schedule': 60.0,
+    },
+}
+
+# Risk scoring configuration
+# Extra IPs flagged as malicious on top of active ThreatIndicator IPs, and
+# critical asset IPs (comma-separated). Both are reloaded every
+# RISK_SCORING_THREAT_INTEL_TTL seconds.
+RISK_SCORING_MALICIOUS_IPS = config('RISK_SCORING_MALICIOUS_IPS', default='').split(',')
+RISK_SCORING_CRITICAL_ASSETS = config('RISK_SCORING_CRITICAL_ASSETS', default='').split(',')
+RISK_SCORING_THREAT_INTEL_TTL = config('RISK_SCORING_THREAT_INTEL_TTL', default=300, cast=int)
+# Rows per INSERT/UPDATE statement when persisting batch risk scores
+RISK_SCORE_BATCH_SIZE = config('RISK_SCORE_BATCH_SIZE', default=500, cast=int)
+# Alerts per score_alerts_chunk task when calculate_risk_scores fans out
+RISK_SCORING_CHUNK_SIZE = config('RISK_SCORING_CHUNK_SIZE', default=200, cast=int)
+# Lifetime (seconds) of the cached dashboard risk statistics
+RISK_STATS_CACHE_TTL = config('RISK_STATS_CACHE_TTL', default=60, cast=int)
+# Lifetime (seconds) of the cached incident dashboard statistics
+INCIDENT_STATS_CACHE_TTL = config('INCIDENT_STATS_CACHE_TTL', default=30, cast=int)
+
+# Maximum number of alerts accepted by one call of the bulk webhook
+WEBHOOK_BULK_MAX_ALERTS = config('WEBHOOK_BULK_MAX_ALERTS', default=1000, cast=int)
+# Lifetime (seconds) of the cached integration lookup by webhook token
+INTEGRATION_TOKEN_CACHE_TTL = config('INTEGRATION_TOKEN_CACHE_TTL', default=60, cast=int)
+# Keep one alert_processed integration log out of N per integration and minute;
+# all of them are counted in a per-minute alert_batch log (1 keeps every log).
+# The counters live in the cache: values above 1 need a shared CACHE_BACKEND
+INTEGRATION_LOG_SAMPLE_RATE = config('INTEGRATION_LOG_SAMPLE_RATE', default=1, cast=int)
+
+# Cache Configuration
+# Use django.core.cache.backends.redis.RedisCache with a redis:// location to
+# share cached results between processes
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
 
 # Email Configuration
 EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'